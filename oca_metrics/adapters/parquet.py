@@ -1,3 +1,4 @@
+from pathlib import Path
 from typing import Any, Dict, List, Optional, Sequence
 
 import duckdb
@@ -13,6 +14,7 @@ from oca_metrics.utils.parquet import (
     extract_yearly_citation_columns,
     get_valid_level_column,
     is_multilingual_scielo_merge_record,
+    list_manifest_fragments,
 )
 
 
@@ -27,15 +29,25 @@ class ParquetAdapter(BaseAdapter):
         self.table_name = table_name
 
         try:
-            self.con.execute(f"CREATE VIEW {self.table_name} AS SELECT * FROM read_parquet('{parquet_path}', union_by_name=True)")
-            self.table_columns = self._get_table_columns()
+            source = f"'{parquet_path}', union_by_name=True"
+            fragments = list_manifest_fragments(parquet_path) if Path(parquet_path).is_dir() else None
+            if fragments is not None:
+                # Output of the parallel integration: exactly the fragments of its manifest
+                source = f"{[str(p) for p in fragments]}, union_by_name=True"
+            elif Path(parquet_path).is_dir():
+                # Directory of Parquet files, e.g. the publication_year=YYYY/ partitions of a clustered layout
+                source = f"'{Path(parquet_path) / '**' / '*.parquet'}', union_by_name=True, hive_partitioning=True"
+
+            self.con.execute(f"CREATE VIEW {self.table_name} AS SELECT * FROM read_parquet({source})")
+            self.table_column_types = self._get_table_column_types()
+            self.table_columns = list(self.table_column_types)
             self.yearly_citation_cols = extract_yearly_citation_columns(self.table_columns)
         except Exception as e:
             logger.error(f"Failed to load parquet file at {parquet_path}: {e}")
             raise
 
-    def _get_table_columns(self) -> List[str]:
-        return [row[0] for row in self.con.execute(f"DESCRIBE {self.table_name}").fetchall()]
+    def _get_table_column_types(self) -> Dict[str, str]:
+        return {row[0]: row[1] for row in self.con.execute(f"DESCRIBE {self.table_name}").fetchall()}
 
     def get_yearly_citation_columns(self) -> List[str]:
         try:
@@ -89,6 +101,9 @@ class ParquetAdapter(BaseAdapter):
 
         level_col = get_valid_level_column(level, self.table_columns)
 
+        if self.table_column_types["oa_individual_works"].endswith("[]"):
+            return self._compute_multilingual_flag_from_work_list(year, level_col, cat_id)
+
         query = f"""
         SELECT
             journal_id,
@@ -115,6 +130,26 @@ class ParquetAdapter(BaseAdapter):
             .astype({"is_journal_multilingual": "int64"})
         )
 
+    def _compute_multilingual_flag_from_work_list(self, year: int, level_col: str, cat_id: str) -> pd.DataFrame:
+        """Multilingual flag computed in DuckDB when `oa_individual_works` is the typed list of work structs."""
+        languages = (
+            "list_distinct(list_transform(list_filter(oa_individual_works, w -> w.language <> ''), "
+            "w -> lower(trim(w.language))))"
+        )
+        query = f"""
+        SELECT
+            journal_id,
+            MAX(CASE WHEN COALESCE(is_merged::BOOLEAN, false) AND len({languages}) > 1 THEN 1 ELSE 0 END)::BIGINT as is_journal_multilingual
+        FROM {self.table_name}
+        WHERE publication_year = ? AND {level_col} = ? AND journal_id IS NOT NULL
+        GROUP BY journal_id
+        """
+        try:
+            return self.con.execute(query, [year, cat_id]).df()
+        except duckdb.Error as e:
+            logger.warning(f"Could not compute the multilingual flag from oa_individual_works: {e}")
+            return pd.DataFrame(columns=["journal_id", "is_journal_multilingual"])
+
     def get_categories(self, year: int, level: str, category_id: Optional[str] = None) -> List[str]:
         level_col = get_valid_level_column(level, self.table_columns)
         query = f"SELECT DISTINCT {level_col} FROM {self.table_name} WHERE publication_year = ? AND {level_col} IS NOT NULL"
@@ -26,7 +26,7 @@ def parse_args():
     parser = argparse.ArgumentParser(
         description="Compute journal-level bibliometrics from data source."
     )
-    parser.add_argument("--parquet", help="Path to metrics parquet file.", required=True)
+    parser.add_argument("--parquet", help="Path to metrics parquet file (or directory of year partitions).", required=True)
     parser.add_argument("--global-xlsx", help="Path to global metrics excel file.")
     
     parser.add_argument("--year", type=int, default=None)
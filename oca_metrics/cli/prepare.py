@@ -1,25 +1,147 @@
+from pathlib import Path
+
 import argparse
 import datetime
-import json
 import logging
 import sys
+import tempfile
 
 from oca_metrics.preparation.extract import run_extraction
 from oca_metrics.preparation.integration import (
+    MATCH_KEYS,
+    SECONDARY_KEY_COLUMNS,
     generate_merged_parquet,
+    integrate_scielo_columns,
+    integrate_scielo_openalex,
+    integrate_scielo_parallel,
     match_scielo_with_openalex,
 )
+from oca_metrics.preparation.layout import (
+    LAYOUT_ROW_GROUP_SIZE,
+    log_pruning_report,
+    pruning_report,
+    write_clustered_layout,
+)
 from oca_metrics.preparation.scielo import (
-    load_bson_scl,
-    load_raw_scl,
+    iter_bson_scl,
+    iter_mongo_scl,
+    iter_raw_scl,
     merge_scielo_documents,
 )
+from oca_metrics.preparation.scielo_duckdb import merge_scielo_documents_duckdb
+from oca_metrics.preparation.scielo_io import (
+    INTEGRATION_COLUMNS,
+    read_merged_scielo,
+    read_scielo_columns,
+    write_merged_scielo,
+)
+from oca_metrics.preparation.scielo_state import (
+    export_merged_state,
+    merge_scielo_incremental,
+)
 
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 
+def iter_scielo_source(args):
+    """Yields chunks of SciELO documents from the prepare-scielo source (JSONL or BSON dump, or MongoDB)."""
+    if args.format == "mongo":
+        return iter_mongo_scl(
+            args.mongo_uri,
+            collection=args.collection,
+            database=args.mongo_database,
+            start_year=args.start_year,
+            end_year=args.end_year,
+            num_cores=args.num_cores,
+            extractor=args.extractor,
+        )
+
+    iter_scl = iter_raw_scl if args.format == "jsonl" else iter_bson_scl
+    return iter_scl(args.input, args.start_year, args.end_year, num_cores=args.num_cores, extractor=args.extractor)
+
+
+def run_integrate(args, output_path):
+    """Runs the integrate command (two-pass, single-pass, streaming or parallel), writing the merged Parquet to output_path."""
+    scielo_path = args.scielo_parquet or args.scielo_jsonl
+    scielo_format = "parquet" if args.scielo_parquet else "jsonl"
+    logger.info(f"Reading SciELO documents from {scielo_path}")
+
+    if args.parallel:
+        scl_table = read_scielo_columns(scielo_path, start_year=args.start_year, end_year=args.end_year, fmt=scielo_format)
+        integrate_scielo_parallel(
+            scl_table,
+            args.oa_parquet_dir,
+            output_path,
+            start_year=args.start_year,
+            end_year=args.end_year,
+            num_workers=args.num_workers,
+            work_dir=args.work_dir,
+            individual_works_json=args.individual_works_json,
+            state_dir=args.state_dir,
+        )
+        return
+
+    if args.streaming:
+        # The secondary match keys read the SciELO fields they need besides the integration columns
+        columns = list(INTEGRATION_COLUMNS)
+        if args.match_keys != ["doi"]:
+            columns += list(SECONDARY_KEY_COLUMNS)
+        scl_table = read_scielo_columns(scielo_path, start_year=args.start_year, end_year=args.end_year, fmt=scielo_format, columns=columns)
+        integrate_scielo_columns(
+            scl_table,
+            args.oa_parquet_dir,
+            output_path,
+            start_year=args.start_year,
+            end_year=args.end_year,
+            individual_works_json=args.individual_works_json,
+            checkpoint_dir=args.checkpoint_dir,
+            resume=args.resume,
+            match_keys=tuple(args.match_keys),
+        )
+        return
+
+    scl_docs = read_merged_scielo(
+        scielo_path,
+        start_year=args.start_year,
+        end_year=args.end_year,
+        fmt=scielo_format,
+    )
+
+    if args.single_pass:
+        integrate_scielo_openalex(
+            scl_docs,
+            args.oa_parquet_dir,
+            output_path,
+            start_year=args.start_year,
+            end_year=args.end_year,
+            work_dir=args.work_dir,
+            individual_works_json=args.individual_works_json,
+        )
+        return
+
+    scl_oa_merged, unified_schema = match_scielo_with_openalex(
+        scl_docs, 
+        args.oa_parquet_dir,
+        start_year=args.start_year,
+        end_year=args.end_year,
+        match_keys=tuple(args.match_keys),
+    )
+
+    generate_merged_parquet(
+        scl_oa_merged,
+        args.oa_parquet_dir,
+        output_path,
+        unified_schema,
+        start_year=args.start_year,
+        end_year=args.end_year,
+        individual_works_json=args.individual_works_json,
+        checkpoint_dir=args.checkpoint_dir,
+        resume=args.resume,
+    )
+
+
 def main():
     parser = argparse.ArgumentParser(description="Data preparation tools for oca-metrics.")
     subparsers = parser.add_subparsers(dest="command", help="Available commands")
@@ -31,24 +153,63 @@ def main():
     parser_oa.add_argument("--start-year", type=int, default=2018)
     parser_oa.add_argument("--end-year", type=int, default=datetime.datetime.now().year)
     parser_oa.add_argument("--batch-size", type=int, default=500000)
+    parser_oa.add_argument("--partition-by-year", action="store_true", help="Write output into publication_year=YYYY/ partitions")
+    parser_oa.add_argument("--incremental", action="store_true", help="Extract only updated_date folders missing from the manifest; newest version of each work wins")
 
     # Command: prepare-scielo
     parser_scl = subparsers.add_parser("prepare-scielo", help="Load and merge SciELO documents")
-    parser_scl.add_argument("--input", required=True, help="Path to SciELO file (JSONL or BSON)")
-    parser_scl.add_argument("--format", choices=["jsonl", "bson"], default="jsonl")
-    parser_scl.add_argument("--output-jsonl", required=True, help="Path to save merged documents")
+    parser_scl.add_argument("--input", help="Path to SciELO file (JSONL or BSON)")
+    parser_scl.add_argument("--format", choices=["jsonl", "bson", "mongo"], default="jsonl", help="Input format; mongo reads the ArticleMeta collection directly")
+    parser_scl.add_argument("--mongo-uri", help="MongoDB URI of the ArticleMeta database (with --format mongo)")
+    parser_scl.add_argument("--mongo-database", help="ArticleMeta database name (default: the database of --mongo-uri)")
+    parser_scl.add_argument("--collection", default="articles", help="ArticleMeta collection name (with --format mongo)")
+    scl_output = parser_scl.add_mutually_exclusive_group(required=True)
+    scl_output.add_argument("--output-jsonl", help="Path to save merged documents as JSONL")
+    scl_output.add_argument("--output-parquet", help="Path to save merged documents as Parquet")
     parser_scl.add_argument("--start-year", type=int, default=2018)
     parser_scl.add_argument("--end-year", type=int, default=datetime.datetime.now().year)
     parser_scl.add_argument("--audit-log", help="Path to merge audit log")
-    parser_scl.add_argument("--strategies", nargs="+", choices=["doi", "pid", "title"], default=["doi", "pid", "title"], help="Merge strategies to use")
+    parser_scl.add_argument("--audit-pairs", action="store_true", help="Write one audit entry per compared pair instead of one summary per DOI bucket")
+    parser_scl.add_argument("--num-cores", type=int, default=None, help="Worker processes used to parse the input and to run the per-year PID/title merges (default: CPU count - 2)")
+    parser_scl.add_argument("--extractor", choices=["direct", "xylose", "parity"], default="direct", help="ArticleMeta field extractor: direct raw-field reads, xylose Article, or parity (runs both, logs mismatches and keeps the xylose output)")
+    parser_scl.add_argument("--strategies", nargs="+", choices=["doi", "pid", "title", "fuzzy_title"], default=["doi", "pid", "title"], help="Merge strategies to use (fuzzy_title: near-duplicate titles via MinHash/LSH, in-memory merge only)")
+    parser_scl.add_argument("--merge-engine", choices=["memory", "duckdb"], default="memory", help="Merge in memory or out of core with DuckDB (for collections larger than memory)")
+    parser_scl.add_argument("--work-dir", help="Directory for the DuckDB staging files and spills (default: system temp directory)")
+    parser_scl.add_argument("--memory-limit", help="DuckDB memory limit for the out-of-core merge (e.g., 8GB)")
+    parser_scl.add_argument("--incremental", action="store_true", help="Merge only new or updated records into the state kept in --state-dir")
+    parser_scl.add_argument("--state-dir", help="Directory of the incremental merge state")
 
     # Command: integrate
     parser_int = subparsers.add_parser("integrate", help="Cross SciELO with OpenAlex and generate merged Parquet")
-    parser_int.add_argument("--scielo-jsonl", required=True, help="JSONL file of merged SciELO articles")
+    int_input = parser_int.add_mutually_exclusive_group(required=True)
+    int_input.add_argument("--scielo-jsonl", help="JSONL file of merged SciELO articles")
+    int_input.add_argument("--scielo-parquet", help="Parquet file of merged SciELO articles")
     parser_int.add_argument("--oa-parquet-dir", required=True, help="Directory with OpenAlex Parquet files")
     parser_int.add_argument("--output-parquet", required=True, help="Path for the final merged Parquet file")
-    parser_int.add_argument("--start-year", type=int, default=2018)
-    parser_int.add_argument("--end-year", type=int, default=datetime.datetime.now().year)
+    parser_int.add_argument("--start-year", type=int, default=None, help="First publication year of the OpenAlex works matched and written (default: match from 2018 and write every year)")
+    parser_int.add_argument("--end-year", type=int, default=None, help="Last publication year of the OpenAlex works matched and written (default: match up to the current year and write every year)")
+    int_mode = parser_int.add_mutually_exclusive_group()
+    int_mode.add_argument("--single-pass", action="store_true", help="Read the OpenAlex dataset once, matching and writing in the same scan")
+    int_mode.add_argument("--streaming", action="store_true", help="Stream the SciELO input into a column store instead of loading every document")
+    int_mode.add_argument("--parallel", action="store_true", help="Integrate each publication year in a process pool; --output-parquet is then a directory of year fragments with a manifest")
+    parser_int.add_argument("--num-workers", type=int, default=None, help="Worker processes for --parallel (default: CPU count - 2)")
+    parser_int.add_argument("--state-dir", help="Directory of cached year matches for an incremental --parallel run: only the year fragments whose inputs changed are rewritten")
+    parser_int.add_argument("--match-keys", nargs="+", choices=list(MATCH_KEYS), default=["doi"], help="Match keys applied in cascade, each to the SciELO articles still unmatched (two-pass and --streaming; title_year_issn: normalized title + year + ISSN)")
+    parser_int.add_argument("--checkpoint-dir", help="Write the merged Parquet in committed fragments with a progress manifest in this directory (two-pass and --streaming)")
+    parser_int.add_argument("--resume", action="store_true", help="Continue the run interrupted in --checkpoint-dir from its last committed fragment")
+    parser_int.add_argument("--individual-works-json", action="store_true", help="Write oa_individual_works as JSON text (as in earlier versions) instead of a list of structs")
+    parser_int.add_argument("--work-dir", help="Directory for the single-pass side store of matched works and the unclustered output (default: system temp directory)")
+    parser_int.add_argument("--clustered", action="store_true", help="Sort the output by year, taxonomy and journal, in sized row groups, for row group pruning")
+    parser_int.add_argument("--row-group-size", type=int, default=LAYOUT_ROW_GROUP_SIZE, help="Rows per Parquet row group of the clustered output")
+    parser_int.add_argument("--partition-by-year", action="store_true", help="Write the clustered output as publication_year=YYYY/ partitions (implies --clustered)")
+
+    # Command: layout
+    parser_lay = subparsers.add_parser("layout", help="Rewrite a merged Parquet clustered by year, taxonomy and journal, and report row group pruning")
+    parser_lay.add_argument("--input", required=True, help="Merged Parquet file (or directory) to rewrite")
+    parser_lay.add_argument("--output", required=True, help="Path for the clustered Parquet file (a directory with --partition-by-year)")
+    parser_lay.add_argument("--row-group-size", type=int, default=LAYOUT_ROW_GROUP_SIZE, help="Rows per Parquet row group")
+    parser_lay.add_argument("--partition-by-year", action="store_true", help="Write publication_year=YYYY/ partitions")
+    parser_lay.add_argument("--memory-limit", help="DuckDB memory limit for the sort (e.g., 8GB)")
 
     args = parser.parse_args()
 
@@ -62,40 +223,88 @@ def main():
             output_dir=args.output_dir,
             start_year=args.start_year,
             end_year=args.end_year,
-            batch_size=args.batch_size
+            batch_size=args.batch_size,
+            partition_by_year=args.partition_by_year,
+            incremental=args.incremental,
         )
 
     elif args.command == "prepare-scielo":
-        if args.format == "jsonl":
-            docs = load_raw_scl(args.input, args.start_year, args.end_year)
-        else:
-            docs = load_bson_scl(args.input, args.start_year, args.end_year)
-        
-        merged = merge_scielo_documents(docs, audit_log_path=args.audit_log, strategies=tuple(args.strategies))
+        output_path = args.output_parquet or args.output_jsonl
+        output_format = "parquet" if args.output_parquet else "jsonl"
+
+        if args.format == "mongo" and not args.mongo_uri:
+            parser.error("--format mongo requires --mongo-uri")
+
+        if args.format != "mongo" and not args.input:
+            parser.error(f"--format {args.format} requires --input")
+
+        if args.incremental:
+            if not args.state_dir:
+                parser.error("--incremental requires --state-dir")
+
+            if args.merge_engine != "memory":
+                parser.error("--incremental is only available with --merge-engine memory")
+
+            merge_scielo_incremental(
+                iter_scielo_source(args),
+                args.state_dir,
+                audit_log_path=args.audit_log,
+                strategies=tuple(args.strategies),
+                audit_pairs=args.audit_pairs,
+                num_cores=args.num_cores,
+            )
+            total = export_merged_state(args.state_dir, output_path, output_format)
+            logger.info(f"Saved {total} merged documents to {output_path}")
+            return
+
+        if args.merge_engine == "duckdb":
+            if args.audit_pairs:
+                parser.error("--audit-pairs is only available with --merge-engine memory")
+
+            merge_scielo_documents_duckdb(
+                iter_scielo_source(args),
+                output_path,
+                audit_log_path=args.audit_log,
+                strategies=tuple(args.strategies),
+                work_dir=args.work_dir,
+                memory_limit=args.memory_limit,
+                output_format=output_format,
+            )
+            return
+
+        docs = [doc for chunk_docs in iter_scielo_source(args) for doc in chunk_docs]
+
+        merged = merge_scielo_documents(docs, audit_log_path=args.audit_log, strategies=tuple(args.strategies), audit_pairs=args.audit_pairs, num_cores=args.num_cores)
         
-        logger.info(f"Saving {len(merged)} merged documents to {args.output_jsonl}")
-        with open(args.output_jsonl, "w") as f:
-            for doc in merged:
-                f.write(json.dumps(doc) + "\n")
-                
+        logger.info(f"Saving {len(merged)} merged documents to {output_path}")
+        write_merged_scielo((merged[i:i + 100_000] for i in range(0, len(merged), 100_000)), output_path, output_format)
+
     elif args.command == "integrate":
-        logger.info(f"Reading SciELO documents from {args.scielo_jsonl}")
-        with open(args.scielo_jsonl, "r") as f:
-            scl_docs = [json.loads(line) for line in f]
-            
-        scl_oa_merged, unified_schema = match_scielo_with_openalex(
-            scl_docs, 
-            args.oa_parquet_dir,
-            start_year=args.start_year,
-            end_year=args.end_year
-        )
-        
-        generate_merged_parquet(
-            scl_oa_merged,
-            args.oa_parquet_dir,
-            args.output_parquet,
-            unified_schema
-        )
+        if args.state_dir and (not args.parallel or args.clustered or args.partition_by_year):
+            parser.error("--state-dir is only available with --parallel, without --clustered or --partition-by-year")
+        if args.checkpoint_dir and (args.single_pass or args.parallel):
+            parser.error("--checkpoint-dir is only available in the two-pass and --streaming modes")
+        if args.match_keys != ["doi"] and (args.single_pass or args.parallel):
+            parser.error("--match-keys other than doi is only available in the two-pass and --streaming modes")
+        if args.resume and not args.checkpoint_dir:
+            parser.error("--resume requires --checkpoint-dir")
+
+        if not (args.clustered or args.partition_by_year):
+            run_integrate(args, args.output_parquet)
+            return
+
+        with tempfile.TemporaryDirectory(dir=args.work_dir, prefix="oca_layout_") as tmp_dir:
+            unclustered_path = Path(tmp_dir) / "merged.parquet"
+            run_integrate(args, unclustered_path)
+            write_clustered_layout(unclustered_path, args.output_parquet, args.row_group_size, args.partition_by_year, work_dir=tmp_dir)
+
+        log_pruning_report(pruning_report(args.output_parquet), "Clustered output")
+
+    elif args.command == "layout":
+        log_pruning_report(pruning_report(args.input), "Input")
+        write_clustered_layout(args.input, args.output, args.row_group_size, args.partition_by_year, memory_limit=args.memory_limit)
+        log_pruning_report(pruning_report(args.output), "Clustered output")
+
     else:
         parser.print_help()
 
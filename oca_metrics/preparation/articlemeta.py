@@ -0,0 +1,208 @@
+"""
+Direct ArticleMeta Field Extraction
+-----------------------------------
+
+`prepare-scielo` only needs about ten fields from each ArticleMeta record. Building a xylose `Article` for every
+record and going through its properties (`doi_and_lang`, `original_title()`, `translated_titles()`, `journal.*_issn`)
+is the most expensive step of loading a dump, so `extract_article_doc` reads those fields directly from the raw
+record using the same legacy ISIS tags and rules as xylose:
+
+- `collection`: `collection`, falling back to `article.v992` and `title.v992`;
+- `pid_v2`: `article.v880`;
+- `doi`: `article.v237` (or the top-level `doi`), kept only when it matches `DOI_REGEX` exactly once;
+- `doi_with_lang`: `article.v337` entries, plus the main DOI in the original language (`article.v40`);
+- `titles`: `article.v12`, the first title of the original language and the first title of each other language;
+- `document_type`: `article.v71` mapped through xylose's article type choices;
+- `journal_title`: `title.v100`;
+- `journal_issns`: `title.v400` plus the print/electronic ISSNs from `title.v435` or `title.v35`/`v935`/`v400`.
+
+The xylose-based `transform_article_to_doc` is kept as the reference implementation; `diff_docs` compares the
+output of both extractors for the parity mode of the loaders. `RECORD_FIELDS` lists the raw fields read here, so
+that sources able to project fields (MongoDB) only fetch those.
+
+Known divergence: records without an original language (`article.v40`) make xylose raise, so the reference
+extractor drops them or loses their titles, while the direct extractor keeps them.
+"""
+
+from xylose.choices import article_types
+from xylose.scielodocument import (
+    DOI_REGEX,
+    html_decode,
+)
+
+from oca_metrics.utils.normalization import (
+    stz_doi,
+    stz_title,
+)
+
+
+DOC_FIELDS = (
+    "collection",
+    "pid_v2",
+    "publication_year",
+    "doi_with_lang",
+    "doi",
+    "titles",
+    "document_type",
+    "journal_title",
+    "journal_issns",
+)
+
+# Raw record fields read by extract_article_doc (dotted paths, as in a MongoDB projection)
+RECORD_FIELDS = (
+    "collection",
+    "publication_year",
+    "doi",
+    "article.v12",
+    "article.v237",
+    "article.v337",
+    "article.v40",
+    "article.v71",
+    "article.v880",
+    "article.v992",
+    "title.v100",
+    "title.v35",
+    "title.v400",
+    "title.v435",
+    "title.v935",
+    "title.v992",
+)
+
+
+def _first_value(data, tag):
+    values = data.get(tag)
+    if not values:
+        return None
+
+    return values[0].get("_")
+
+def _collection(record, article, journal):
+    if "collection" in record:
+        return record["collection"]
+
+    for data in (article, journal):
+        if "v992" in data:
+            value = data["v992"]
+            return value[0]["_"] if isinstance(value, list) else value
+
+    return None
+
+def _match_doi(raw_doi):
+    if not raw_doi:
+        return None
+
+    doi = DOI_REGEX.findall(raw_doi)
+    if len(doi) == 1:
+        return doi[0]
+
+    return None
+
+def _title_text(title):
+    text = (title.get("_") or "").strip()
+    if not text:
+        text = (title.get("t") or "").strip()
+
+    return html_decode(text)
+
+def _titles(article, original_language):
+    original = None
+    translated = {}
+    for title in article.get("v12", []):
+        if "l" not in title:
+            continue
+
+        if title["l"] == original_language:
+            if original is None:
+                original = _title_text(title)
+
+        elif title["l"] not in translated:
+            translated[title["l"]] = _title_text(title)
+
+    titles = set()
+    for title in [original, *translated.values()]:
+        if title:
+            titles.add(stz_title(title))
+
+    return sorted(titles)
+
+def _journal_issns(journal):
+    print_issn = electronic_issn = None
+    scielo_issn = _first_value(journal, "v400")
+
+    if "v435" in journal:
+        for item in journal["v435"]:
+            if item.get("t") == "PRINT":
+                print_issn = item.get("_")
+            if item.get("t") == "ONLIN":
+                electronic_issn = item.get("_")
+
+    elif "v35" in journal:
+        is_print = _first_value(journal, "v35") == "PRINT"
+        main_issn = _first_value(journal, "v935") if "v935" in journal else scielo_issn
+        other_issn = scielo_issn if main_issn != scielo_issn else None
+        if is_print:
+            print_issn, electronic_issn = main_issn, other_issn
+        else:
+            print_issn, electronic_issn = other_issn, main_issn
+
+    return sorted({issn.strip() for issn in (scielo_issn, electronic_issn, print_issn) if issn and issn.strip()})
+
+def extract_article_doc(record, pub_year):
+    """
+    Builds the SciELO document of an ArticleMeta record without instantiating xylose objects.
+    Returns None when the record has neither a valid DOI nor language-specific DOIs.
+    """
+    article = record.get("article") or {}
+    journal = record.get("title") or {}
+
+    raw_doi = record.get("doi")
+    if "v237" in article:
+        raw_doi = _first_value(article, "v237")
+    doi = _match_doi(raw_doi)
+
+    original_language = _first_value(article, "v40")
+
+    doi_and_lang = [
+        (item.get("l"), item.get("d"))
+        for item in article.get("v337") or []
+        if _match_doi(item.get("d"))
+    ]
+    if doi and original_language and (original_language, doi) not in doi_and_lang:
+        doi_and_lang.insert(0, (original_language, doi))
+
+    if not doi and not doi_and_lang:
+        return None
+
+    doi_with_lang = {}
+    for lang, lang_doi in doi_and_lang:
+        doi_stz = stz_doi(lang_doi)
+        if doi_stz:
+            doi_with_lang[lang] = doi_stz
+
+    document_type = article_types.get(_first_value(article, "v71"), article_types["nd"]) if "v71" in article else article_types["nd"]
+
+    return {
+        "collection": _collection(record, article, journal),
+        "pid_v2": _first_value(article, "v880"),
+        "publication_year": pub_year,
+        "doi_with_lang": doi_with_lang,
+        "doi": stz_doi(doi) if doi else "",
+        "titles": _titles(article, original_language),
+        "document_type": document_type,
+        "journal_title": (_first_value(journal, "v100") or "").strip(),
+        "journal_issns": _journal_issns(journal),
+    }
+
+def diff_docs(direct_doc, xylose_doc):
+    """Returns {field: (direct_value, xylose_value)} for the fields where both extractors disagree."""
+    if direct_doc is None or xylose_doc is None:
+        if direct_doc is xylose_doc:
+            return {}
+
+        return {"document": (direct_doc is not None, xylose_doc is not None)}
+
+    return {
+        field: (direct_doc.get(field), xylose_doc.get(field))
+        for field in DOC_FIELDS
+        if direct_doc.get(field) != xylose_doc.get(field)
+    }
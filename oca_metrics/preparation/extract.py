@@ -4,32 +4,97 @@ from tqdm import tqdm
 import datetime
 import duckdb
 import gzip
+import json
 import logging
 import multiprocessing
+import numpy as np
 import orjson
-import pandas as pd
+import os
 import pathlib
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import re
+
+from oca_metrics.preparation.openalex_fields import (
+    OPENALEX_FIELDS,
+    compile_extractor,
+    msgspec,
+)
+from oca_metrics.utils.parquet import (
+    build_year_partition_name,
+    list_parquet_files,
+)
 
 
 logger = logging.getLogger(__name__)
 
+MANIFEST_FILE_NAME = "extraction_manifest.json"
+METRICS_FILE_DATE_PATTERN = re.compile(r"^metrics_(.+?)_(?:part_\d+|empty)\.parquet$")
+
+# A work whose type is "article" always contains this token; escaped quotes inside strings never match it
+ARTICLE_TYPE_TOKEN = b'"article"'
+
+# The "id" of a work is the only "id" key holding a work URL (related and referenced works are plain lists)
+WORK_ID_PATTERN = re.compile(rb'"id"\s*:\s*"(https://openalex\.org/W\d+)"')
+TOMBSTONE_FILE_PATTERN = re.compile(r"^tombstones_(.+?)_part_\d+\.arrow$")
+TOMBSTONE_SCHEMA = pa.schema([pa.field("work_id", pa.string())])
+
+# Per-file sorted work ID numbers written next to each metrics file (not `.parquet`, so readers ignore them)
+WORK_INDEX_SUFFIX = ".work_ids.npy"
+WORK_ID_PREFIX = "https://openalex.org/W"
+WORK_ID_KEY_PATTERN = r"^https://openalex\.org/W\d{1,18}$"
+
 
-def process_chunk(lines, start_year=2018, end_year=None):
+def decode_work(line, decoder=None):
+    """
+    Decodes an OpenAlex work line, returning the work dict and whether it was decoded with the typed schema.
+    With a msgspec decoder only the fields declared by the extraction spec are decoded; lines that do not
+    fit the declared types fall back to a full orjson parse.
+    """
+    if decoder is not None:
+        try:
+            return decoder.decode(line), True
+        except msgspec.ValidationError:
+            pass
+
+    return orjson.loads(line), False
+
+
+def process_chunk(lines, start_year=2018, end_year=None, fields=OPENALEX_FIELDS, return_rejected=False):
+    """
+    Extracts the works of lines that are journal articles in the year range. With return_rejected, also returns the
+    work IDs of the other works (as (results, rejected_ids)), so that an incremental extraction can retract their
+    earlier versions.
+    """
     if end_year is None:
         end_year = datetime.datetime.now().year
 
+    extractor = compile_extractor(fields)
+
     batch_results = []
+    rejected = []
     for line in lines:
         try:
-            src = orjson.loads(line)
+            # Cheap rejection of non-articles before parsing
+            if isinstance(line, bytes) and ARTICLE_TYPE_TOKEN not in line:
+                if return_rejected:
+                    match = WORK_ID_PATTERN.search(line)
+                    if match:
+                        rejected.append(match.group(1).decode())
+                continue
+
+            src, typed = decode_work(line, extractor.decoder)
             
             # Remove documents that are not articles or are XPAC
             if src.get("type") != "article" or src.get("is_xpac") is True:
+                rejected.append(src.get("id"))
                 continue
 
             # Remove documents that are not in the specified year range
             pub_year = src.get("publication_year")
             if not (pub_year and start_year <= pub_year <= end_year):
+                rejected.append(src.get("id"))
                 continue
 
             # Collect journal information
@@ -45,73 +110,263 @@ def process_chunk(lines, start_year=2018, end_year=None):
                         break
 
             if not journal:
+                rejected.append(src.get("id"))
                 continue
 
             pt = src.get("primary_topic") or {}
-            journal_is_oa = journal.get("is_oa")
-
-            res = {
-                "work_id": src.get("id"),
-                "publication_year": pub_year,
-                "language": src.get("language"),
-                "doi": src.get("doi"),
-                "journal_id": journal.get("id"),
-                "journal_issn_l": journal.get("issn_l"),
-                "is_journal_oa": int(bool(journal_is_oa)) if journal_is_oa is not None else 0,
-                "domain": pt.get("domain", {}).get("display_name"),
-                "field": pt.get("field", {}).get("display_name"),
-                "subfield": pt.get("subfield", {}).get("display_name"),
-                "topic": pt.get("display_name"),
-                "topic_score": pt.get("score"),
-                "citations_total": src.get("cited_by_count", 0),
-            }
-
-            # Citations
-            w2, w3, w5 = 0, 0, 0
-            counts = src.get("counts_by_year", [])
-            
-            if isinstance(counts, list):
-                for cy in counts:
-                    y = cy.get("year")
-                    tot = cy.get("cited_by_count", 0)
-                    if not y:
-                        continue
-                    
-                    res[f"citations_{y}"] = tot
-
-                    if y > pub_year:
-                        if y <= pub_year + 2: w2 += tot
-                        if y <= pub_year + 3: w3 += tot
-                        if y <= pub_year + 5: w5 += tot
-
-            res.update({
-                "citations_window_2y": w2,
-                "citations_window_3y": w3,
-                "citations_window_5y": w5,
-                "has_citation_window_2y": 1 if w2 > 0 else 0,
-                "has_citation_window_3y": 1 if w3 > 0 else 0,
-                "has_citation_window_5y": 1 if w5 > 0 else 0
-            })
-            
+
+            res = extractor.extract(src, journal, pt, pub_year)
+            if not typed:
+                extractor.coerce(res)
+
             batch_results.append(res)
         except:
             continue
 
+    if return_rejected:
+        return batch_results, [work_id for work_id in rejected if work_id]
+
     return batch_results
 
 def load_processed_ids(output_dir):
-    parquet_files = list(pathlib.Path(output_dir).glob("metrics_*.parquet"))
+    parquet_files = [p for p in list_parquet_files(output_dir) if p.name.startswith("metrics_")]
     if not parquet_files:
         return set()
     
     logger.info(f"Retrieving IDs from {len(parquet_files)} existing files...")
 
     con = duckdb.connect()
-    ids = con.execute(f"SELECT work_id FROM read_parquet('{output_dir}/*.parquet')").fetchall()
+    ids = con.execute(
+        "SELECT work_id FROM read_parquet(?, hive_partitioning=false)",
+        [[str(p) for p in parquet_files]],
+    ).fetchall()
 
     return set(i[0] for i in ids)
 
-def run_extraction(base_dir, output_dir, start_year=2018, end_year=None, batch_size=500_000, num_cores=None):
+def load_manifest(output_dir):
+    """Loads the extraction manifest (processed `updated_date` folders) from output_dir."""
+    manifest_path = pathlib.Path(output_dir) / MANIFEST_FILE_NAME
+    if not manifest_path.exists():
+        return None
+
+    with open(manifest_path) as f:
+        return json.load(f)
+
+def save_manifest(output_dir, processed_dates):
+    manifest_path = pathlib.Path(output_dir) / MANIFEST_FILE_NAME
+    tmp_path = manifest_path.with_suffix(".json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump({
+            "processed_dates": sorted(processed_dates),
+            "updated_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        }, f, indent=2)
+
+    os.replace(tmp_path, manifest_path)
+
+def _dates_from_files(output_dir):
+    dates = set()
+    for p in pathlib.Path(output_dir).rglob("metrics_*.parquet"):
+        match = METRICS_FILE_DATE_PATTERN.match(p.name)
+        if match:
+            dates.add(match.group(1))
+
+    return dates
+
+def load_processed_dates(output_dir):
+    """
+    Returns the `updated_date` folders already extracted into output_dir.
+    The manifest is authoritative; output written before manifests existed is recognized by its file names.
+    """
+    manifest = load_manifest(output_dir)
+    if manifest is None:
+        return _dates_from_files(output_dir)
+
+    return set(manifest.get("processed_dates", []))
+
+def _write_tombstones(work_ids, output_dir, date_str, part_counter):
+    """Writes the IDs of works rejected in an `updated_date` folder (Arrow IPC, so Parquet readers ignore them)."""
+    table = pa.table({"work_id": pa.array(work_ids, type=pa.string())}, schema=TOMBSTONE_SCHEMA)
+    with pa.ipc.new_file(output_dir / f"tombstones_{date_str}_part_{part_counter}.arrow", TOMBSTONE_SCHEMA) as writer:
+        writer.write_table(table)
+
+def _load_tombstones(output_dir, dates=None):
+    """(work_id, version) table of the works rejected by incremental extractions, optionally only of the given dates."""
+    tables = []
+    for p in sorted(pathlib.Path(output_dir).glob("tombstones_*.arrow")):
+        match = TOMBSTONE_FILE_PATTERN.match(p.name)
+        if match and (dates is None or match.group(1) in dates):
+            table = pa.ipc.open_file(p).read_all()
+            tables.append(table.append_column("version", pa.array([match.group(1)] * table.num_rows, type=pa.string())))
+
+    if not tables:
+        return pa.table({"work_id": pa.array([], type=pa.string()), "version": pa.array([], type=pa.string())})
+
+    return pa.concat_tables(tables)
+
+def _work_index_path(path):
+    return pathlib.Path(path).with_suffix(WORK_INDEX_SUFFIX)
+
+def _work_id_keys(work_ids):
+    """Sorted unique numbers of OpenAlex work IDs (the digits after `W`), or None if some ID has another form."""
+    work_ids = pc.drop_null(work_ids)
+    if len(work_ids) == 0:
+        return np.array([], dtype=np.int64)
+
+    if not pc.all(pc.match_substring_regex(work_ids, WORK_ID_KEY_PATTERN)).as_py():
+        return None
+
+    keys = pc.cast(pc.utf8_slice_codeunits(work_ids, len(WORK_ID_PREFIX)), pa.int64())
+    return np.unique(keys.to_numpy())
+
+def _write_work_index(path, work_ids):
+    """Writes the sorted work ID numbers of an extracted file next to it, so compaction can skip unrelated files."""
+    index_path = _work_index_path(path)
+    keys = _work_id_keys(work_ids)
+    if keys is None:
+        index_path.unlink(missing_ok=True)
+        return None
+
+    tmp_path = index_path.with_name(f"{index_path.name}.tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, keys)
+
+    os.replace(tmp_path, index_path)
+    return keys
+
+def _load_work_index(path):
+    """Work ID numbers of an extracted file; files written before the index existed get it built on first use."""
+    index_path = _work_index_path(path)
+    if index_path.exists():
+        return np.load(index_path, mmap_mode="r")
+
+    return _write_work_index(path, pq.read_table(path, columns=["work_id"])["work_id"])
+
+def _contains_any(sorted_keys, keys):
+    if len(sorted_keys) == 0 or len(keys) == 0:
+        return False
+
+    positions = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    return bool(np.any(sorted_keys[positions] == keys))
+
+def compact_extraction(output_dir, dates=None):
+    """
+    Rewrites extracted files so that only the newest version of each work_id survives.
+    The version of a row is the `updated_date` in its file name. Tombstones (works rejected in a newer folder, e.g.
+    no longer articles) are versions without a row, so they retract the older rows of their works. When dates is
+    given, only works that appear in files or tombstones of those dates are considered, and older files are read
+    only when their work ID index (`*.work_ids.npy`) holds one of those works, which keeps a monthly refresh
+    proportional to its delta rather than to the whole dataset. Returns the number of superseded rows removed.
+    """
+    file_versions = {}
+    for p in list_parquet_files(output_dir):
+        match = METRICS_FILE_DATE_PATTERN.match(p.name)
+        if match:
+            file_versions[str(p)] = match.group(1)
+
+    if not file_versions:
+        return 0
+
+    tombstones = _load_tombstones(output_dir, dates)
+    new_files = [f for f, version in file_versions.items() if dates is None or version in dates]
+    new_work_ids = {f: pq.read_table(f, columns=["work_id"])["work_id"].cast(pa.string()) for f in new_files}
+    candidates = pa.chunked_array(
+        [chunk for column in new_work_ids.values() for chunk in column.chunks] + tombstones["work_id"].chunks,
+        type=pa.string(),
+    )
+    candidate_set = pc.unique(candidates)
+    candidate_keys = _work_id_keys(candidates) if dates is not None else None
+
+    versions = []
+    for filename, version in file_versions.items():
+        if filename in new_work_ids:
+            work_ids = new_work_ids[filename]
+
+        else:
+            if candidate_keys is not None:
+                keys = _load_work_index(filename)
+                if keys is not None and not _contains_any(keys, candidate_keys):
+                    continue
+
+            work_ids = pq.read_table(filename, columns=["work_id"])["work_id"]
+            work_ids = work_ids.filter(pc.is_in(work_ids, value_set=candidate_set))
+
+        versions.append(pa.table({
+            "work_id": work_ids.cast(pa.string()),
+            "filename": pa.array([filename] * len(work_ids), type=pa.string()),
+            "version": pa.array([version] * len(work_ids), type=pa.string()),
+        }))
+
+    con = duckdb.connect()
+    con.register("versions", pa.concat_tables(versions))
+    con.register("tombstones", tombstones)
+    superseded = con.execute(
+        """
+        WITH all_versions AS (
+            SELECT work_id, version FROM versions
+            UNION ALL
+            SELECT work_id, version FROM tombstones
+        ),
+        latest AS (
+            SELECT work_id, MAX(version) AS version
+            FROM all_versions
+            GROUP BY work_id
+        )
+        SELECT v.filename, LIST(v.work_id) AS work_ids
+        FROM versions v JOIN latest l USING (work_id)
+        WHERE v.version < l.version
+        GROUP BY v.filename
+        """
+    ).fetchall()
+    con.close()
+
+    removed = 0
+    for filename, work_ids in superseded:
+        table = pq.read_table(filename)
+        keep = pc.invert(pc.is_in(table["work_id"], value_set=pa.array(work_ids, type=table.schema.field("work_id").type)))
+        table = table.filter(keep)
+        removed += len(work_ids)
+
+        if table.num_rows == 0:
+            os.remove(filename)
+            _work_index_path(filename).unlink(missing_ok=True)
+            continue
+
+        tmp_path = f"{filename}.tmp"
+        pq.write_table(table, tmp_path, compression="snappy")
+        os.replace(tmp_path, filename)
+        _write_work_index(filename, table["work_id"])
+
+    logger.info(f"Compaction removed {removed} superseded rows from {len(superseded)} files.")
+    return removed
+
+def _write_results(results, output_dir, date_str, part_counter, schema, partition_by_year=False):
+    """Writes a batch of extracted works, optionally split into `publication_year=YYYY/` partitions."""
+    table = pa.Table.from_pylist(results, schema=schema)
+    file_name = f"metrics_{date_str}_part_{part_counter}.parquet"
+
+    if not partition_by_year:
+        pq.write_table(table, output_dir / file_name, compression="snappy")
+        _write_work_index(output_dir / file_name, table["work_id"])
+        return
+
+    for year in sorted(pc.unique(table["publication_year"]).to_pylist()):
+        partition_dir = output_dir / build_year_partition_name(year)
+        partition_dir.mkdir(exist_ok=True)
+        table_year = table.filter(pc.equal(table["publication_year"], year))
+        pq.write_table(table_year, partition_dir / file_name, compression="snappy")
+        _write_work_index(partition_dir / file_name, table_year["work_id"])
+
+def run_extraction(base_dir, output_dir, start_year=2018, end_year=None, batch_size=500_000, num_cores=None, partition_by_year=False, incremental=False, fields=OPENALEX_FIELDS):
+    """
+    Extracts OpenAlex works from `updated_date=*` folders into Parquet files.
+
+    By default a work is kept only in the first (newest) folder where it is seen, and folders that already
+    have output files are skipped. With incremental=True only folders missing from the manifest are extracted,
+    and a compaction step then removes older versions of the re-extracted works, so the newest version wins; the
+    works a folder rejects (`tombstones_<date>_part_N.arrow`) also remove their older versions.
+
+    The output columns and their Arrow schema come from the `fields` spec (see `openalex_fields`).
+    """
     if end_year is None:
         end_year = datetime.datetime.now().year
 
@@ -119,7 +374,10 @@ def run_extraction(base_dir, output_dir, start_year=2018, end_year=None, batch_s
     output_dir = pathlib.Path(output_dir)
     output_dir.mkdir(exist_ok=True, parents=True)
 
-    seen_ids = load_processed_ids(output_dir)
+    processed_dates = load_processed_dates(output_dir)
+    seen_ids = set() if incremental else load_processed_ids(output_dir)
+    schema = compile_extractor(fields).schema
+    new_dates = set()
     
     folders = sorted(base_dir.glob("updated_date=*"), reverse=True)
     if num_cores is None:
@@ -131,14 +389,27 @@ def run_extraction(base_dir, output_dir, start_year=2018, end_year=None, batch_s
         for folder in folders:
             date_str = folder.name.split("=")[1]
 
-            existing = list(output_dir.glob(f"metrics_{date_str}*.parquet"))
-            if existing:
-                logger.info(f"Date {date_str} already has files. Skipping...")
-                continue
+            if incremental:
+                if date_str in processed_dates:
+                    continue
+
+                # Leftovers of an interrupted run for this date are replaced
+                for p in output_dir.rglob(f"metrics_{date_str}_*"):
+                    p.unlink()
+                for p in output_dir.glob(f"tombstones_{date_str}_*.arrow"):
+                    p.unlink()
+
+            else:
+                existing = list(output_dir.rglob(f"metrics_{date_str}*.parquet"))
+                if existing:
+                    logger.info(f"Date {date_str} already has files. Skipping...")
+                    continue
             
             files = sorted(folder.glob("part_*.gz"))
             day_results = []
+            day_rejected = []
             part_counter = 0
+            tombstone_counter = 0
             
             pbar = tqdm(files, desc=f"Processing {date_str}", unit="file")
             for f_path in pbar:
@@ -149,29 +420,46 @@ def run_extraction(base_dir, output_dir, start_year=2018, end_year=None, batch_s
                     continue
                 
                 chunk_size = max(1, len(lines) // num_cores)
-                futures = [executor.submit(process_chunk, lines[i:i + chunk_size], start_year, end_year) 
+                futures = [executor.submit(process_chunk, lines[i:i + chunk_size], start_year, end_year, fields, incremental) 
                            for i in range(0, len(lines), chunk_size)]
                 
                 for future in futures:
-                    for item in future.result():
+                    results, rejected = future.result() if incremental else (future.result(), [])
+                    for item in results:
                         if item["work_id"] not in seen_ids:
                             seen_ids.add(item["work_id"])
                             day_results.append(item)
+
+                    # A rejected newest version also hides the versions of older folders
+                    for work_id in rejected:
+                        if work_id not in seen_ids:
+                            seen_ids.add(work_id)
+                            day_rejected.append(work_id)
+
+                if len(day_rejected) >= batch_size:
+                    _write_tombstones(day_rejected, output_dir, date_str, tombstone_counter)
+                    day_rejected = []
+                    tombstone_counter += 1
                 
                 if len(day_results) >= batch_size:
-                    df = pd.DataFrame(day_results)
-                    output_file = output_dir / f"metrics_{date_str}_part_{part_counter}.parquet"
-                    df.to_parquet(output_file, index=False, engine="pyarrow", compression="snappy")
+                    _write_results(day_results, output_dir, date_str, part_counter, schema, partition_by_year)
                     
                     day_results = []
                     part_counter += 1
                     pbar.set_postfix({"status": f"Saved part_{part_counter-1}"})
 
             if day_results:
-                df = pd.DataFrame(day_results)
-
-                output_file = output_dir / f"metrics_{date_str}_part_{part_counter}.parquet"
-                df.to_parquet(output_file, index=False, engine="pyarrow", compression="snappy")
+                _write_results(day_results, output_dir, date_str, part_counter, schema, partition_by_year)
 
             elif part_counter == 0:
                 (output_dir / f"metrics_{date_str}_empty.parquet").touch()
+
+            if day_rejected:
+                _write_tombstones(day_rejected, output_dir, date_str, tombstone_counter)
+
+            processed_dates.add(date_str)
+            new_dates.add(date_str)
+            save_manifest(output_dir, processed_dates)
+
+    if incremental and new_dates:
+        compact_extraction(output_dir, new_dates)
@@ -11,160 +11,461 @@ This module implements two main merging/consolidation processes:
    - Individual OpenAlex work details are preserved for reference.
    - The taxonomy fields (domain, field, subfield, topic) are consolidated from all matched works.
    - No OpenAlex-OpenAlex merging is performed at this stage; only grouping under SciELO articles.
+   - The matching is a single DuckDB hash join between an exploded (doi, scl_idx) table and the OpenAlex Parquet files; the resulting columnar match table is aggregated by scl_idx.
 
 2. OpenAlex-OpenAlex Consolidation (generate_merged_parquet):
    - In the final Parquet, all OpenAlex works that matched a single SciELO article are consolidated into a single record (the 'survivor'), with all metrics aggregated.
    - The 'all_work_ids' field lists all OpenAlex work IDs that were merged.
    - The 'is_merged' flag indicates if the record is a result of merging multiple OpenAlex works.
-   - The 'oa_individual_works' field stores the details of each original OpenAlex work in JSON format.
+   - The 'oa_individual_works' field stores the details of each original OpenAlex work as a list of structs
+     (work_id, language, journal_id, is_journal_oa, total_citations, citation windows and yearly citations), which
+     DuckDB can query with UNNEST/list functions; JSON text, as in earlier versions, is only written on request.
    - OpenAlex works not matched to any SciELO article are kept as-is, with 'is_merged' set to False.
    - This ensures that each article is uniquely represented, with all versions and citations consolidated, avoiding double counting.
 
 This two-step process ensures robust deduplication and accurate metric computation for articles published in multiple languages or with metadata variations.
+
+integrate_scielo_columns runs both steps from the SciELO column store of `read_scielo_columns` (collections, PIDs,
+year and DOIs as Arrow columns) instead of document dicts, with the same output.
+
+With a checkpoint directory, both write the consolidated batches to numbered fragment files, committing after each
+fragment a progress manifest with the input position and the survivors already emitted; an interrupted run resumes
+from the last committed fragment and the merged file is only published (atomically) once every fragment is written.
+
+Matching is by DOI unless other match keys are requested: the normalized title + year + ISSN key is applied in
+cascade to the articles left unmatched, one join over the OpenAlex files per key (_match_cascade).
 """
 
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from tqdm import tqdm
 
 import datetime
-import gc
+import duckdb
+import hashlib
 import json
 import logging
+import multiprocessing
+import numpy as np
+import os
 import pandas as pd
 import pyarrow as pa
+import pyarrow.compute as pc
 import pyarrow.dataset as ds
 import pyarrow.parquet as pq
+import tempfile
 
-from oca_metrics.utils.constants import TAXONOMY_FIELDS
+from oca_metrics.utils.constants import (
+    TAXONOMY_FIELDS,
+    YEARLY_CITATIONS_FIRST_YEAR,
+)
 from oca_metrics.utils.normalization import (
     safe_int,
     stz_binary_flag,
-    stz_doi,
+    stz_doi_batch,
+)
+from oca_metrics.utils.parquet import (
+    PARALLEL_MANIFEST_FILE_NAME,
+    extract_partition_year,
+    list_parquet_files,
+    load_parallel_manifest,
 )
 
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_MATCH_START_YEAR = 2018
+
+
+def _match_year_range(start_year, end_year):
+    """Year range of the OpenAlex works matched: start_year/end_year, or 2018 up to the current year where not given."""
+    if start_year is None:
+        start_year = DEFAULT_MATCH_START_YEAR
+    if end_year is None:
+        end_year = datetime.datetime.now().year
+
+    return start_year, end_year
+
+
+def _discover_openalex_files(oa_parquet_dir, start_year=None, end_year=None):
+    """Lists OpenAlex Parquet files, pruning `publication_year=YYYY` partitions outside the year range."""
+    parquet_files = list_parquet_files(oa_parquet_dir, start_year, end_year)
+    if not parquet_files:
+        raise FileNotFoundError(f"No Parquet files found in {oa_parquet_dir} for years {start_year}-{end_year}")
+
+    logger.info(f"Found {len(parquet_files)} OpenAlex Parquet files in {oa_parquet_dir}.")
+    return parquet_files
+
+
+def _unify_openalex_schema(parquet_files):
+    """Unifies the schemas of all OpenAlex Parquet files (yearly citation columns vary between files)."""
+    schemas = [pq.read_schema(p) for p in parquet_files]
+    return pa.unify_schemas(schemas, promote_options="permissive")
+
+
+def _year_filter(start_year, end_year):
+    expr = None
+    if start_year is not None:
+        expr = ds.field("publication_year") >= start_year
+    if end_year is not None:
+        upper = ds.field("publication_year") <= end_year
+        expr = upper if expr is None else expr & upper
+
+    return expr
+
 
-def _get_doi_to_scl_idx(scl_docs):
-    """Maps SciELO DOIs (including language variants) to their article index."""
-    doi_to_scl_idx = {}
+def _get_scl_doi_table(scl_docs):
+    """
+    Exploded (doi, scl_idx) table of the SciELO DOIs (including language variants).
+    A DOI shared by several articles belongs to the last one, as in a DOI -> index mapping.
+    """
+    dois, indices = [], []
     for idx, doc in enumerate(scl_docs):
-        if doc.get('doi'):
-            doi_to_scl_idx[doc['doi']] = idx
+        for doi in [doc.get('doi'), *doc.get('doi_with_lang', {}).values()]:
+            if doi:
+                dois.append(doi)
+                indices.append(idx)
+
+    table = pa.table({"doi": pa.array(dois, type=pa.string()), "scl_idx": pa.array(indices, type=pa.int64())})
+    return table.group_by("doi", use_threads=False).aggregate([("scl_idx", "max")]).rename_columns(["doi", "scl_idx"])
+
+
+def _scl_doi_table_from_columns(scl_table):
+    """_get_scl_doi_table for the SciELO column store of read_scielo_columns (`doi` and `doi_with_lang` columns)."""
+    doi = scl_table["doi"].combine_chunks()
+    # Map arrays have no list kernels; as a list of (key, value) structs they do
+    doi_with_lang = scl_table["doi_with_lang"].combine_chunks().cast(
+        pa.list_(pa.struct([pa.field("key", pa.string()), pa.field("value", pa.string())]))
+    )
+
+    table = pa.table({
+        "doi": pa.concat_arrays([doi, pc.struct_field(pc.list_flatten(doi_with_lang), "value")]),
+        "scl_idx": pa.concat_arrays([
+            pa.array(np.arange(scl_table.num_rows, dtype=np.int64)),
+            pc.list_parent_indices(doi_with_lang).cast(pa.int64()),
+        ]),
+    })
+    table = table.filter(pc.fill_null(pc.not_equal(table["doi"], ""), False))
+
+    return table.group_by("doi", use_threads=False).aggregate([("scl_idx", "max")]).rename_columns(["doi", "scl_idx"])
+
+
+def _match_openalex_works(parquet_files, scl_dois, columns_to_load, start_year, end_year, with_position=False, matched_work_ids=None):
+    """
+    Joins the OpenAlex Parquet files with the SciELO DOI table in DuckDB (a single hash join over all files).
+    DOIs are matched on `doi_stz`, or on `stz_doi(doi)` for extractions made before `doi_stz` existed.
+    Returns the columnar match table (scl_idx plus the loaded OpenAlex columns), with one row per (scl_idx, work_id),
+    keeping the last row read for a work, sorted by scl_idx and work_id. With with_position, the file and row
+    number of each match are kept as `_filename` and `_file_row_number`. The works in matched_work_ids (matched by
+    an earlier key of the cascade) are skipped.
+    """
+    con = duckdb.connect()
+    try:
+        con.create_function("stz_doi", stz_doi_batch, ["VARCHAR"], "VARCHAR", type="arrow")
+        con.register("scl_dois", scl_dois)
+
+        doi_key = "coalesce(oa.doi_stz, stz_doi(oa.doi))" if "doi_stz" in columns_to_load else "stz_doi(oa.doi)"
+        selected = ", ".join(f'oa."{c}"' for c in columns_to_load if c != "doi_stz")
+        if with_position:
+            selected += ", oa.filename AS _filename, oa.file_row_number AS _file_row_number"
+
+        conditions = []
+        params = [[str(p) for p in parquet_files]]
+        if start_year is not None:
+            conditions.append("oa.publication_year >= ?")
+            params.append(start_year)
+        if end_year is not None:
+            conditions.append("oa.publication_year <= ?")
+            params.append(end_year)
+        if matched_work_ids is not None and len(matched_work_ids):
+            con.register("matched_works", pa.table({"work_id": matched_work_ids}))
+            conditions.append("oa.work_id NOT IN (SELECT work_id FROM matched_works)")
+
+        matches = con.execute(
+            f"""
+            SELECT d.scl_idx, {selected}
+            FROM read_parquet(?, union_by_name=true, hive_partitioning=false, filename=true, file_row_number=true) oa
+            JOIN scl_dois d ON d.doi = {doi_key}
+            WHERE oa.work_id IS NOT NULL AND oa.work_id <> ''
+            {"".join(f" AND {c}" for c in conditions)}
+            QUALIFY row_number() OVER (PARTITION BY d.scl_idx, oa.work_id ORDER BY oa.filename DESC, oa.file_row_number DESC) = 1
+            ORDER BY d.scl_idx, oa.work_id
+            """,
+            params,
+        ).to_arrow_table()
+
+    finally:
+        con.close()
+
+    return matches
+
+
+# Keys matching SciELO articles to OpenAlex works, applied in cascade (see _match_cascade): the OpenAlex columns
+# each key reads, and its SQL expression over them
+MATCH_KEYS = {
+    "doi": ((), None),
+    "title_year_issn": (("title_stz", "journal_issn_l"), "oa.title_stz || '|' || CAST(oa.publication_year AS VARCHAR) || '|' || upper(trim(oa.journal_issn_l))"),
+}
+DEFAULT_MATCH_KEYS = ("doi",)
 
-        for lang_doi in doc.get('doi_with_lang', {}).values():
-            if lang_doi:
-                doi_to_scl_idx[lang_doi] = idx
+# SciELO columns read by the secondary keys, besides publication_year
+SECONDARY_KEY_COLUMNS = ("titles", "journal_issns")
 
-    return doi_to_scl_idx
 
+def _scl_key_columns(scl_docs):
+    """Column table of the SciELO document fields used by the secondary match keys."""
+    return pa.table({
+        "publication_year": pa.array([doc.get("publication_year") for doc in scl_docs], type=pa.int64()),
+        "titles": pa.array([doc.get("titles") or [] for doc in scl_docs], type=pa.list_(pa.string())),
+        "journal_issns": pa.array([doc.get("journal_issns") or [] for doc in scl_docs], type=pa.list_(pa.string())),
+    })
 
-def _scan_openalex_for_matches(ds_oa, doi_to_scl_idx, columns_to_load, start_year, end_year):
-    """Scans OpenAlex dataset for works matching SciELO DOIs."""
-    oa_matches = defaultdict(list)
-    scanner = ds_oa.scanner(
-        columns=columns_to_load,
-        filter=(ds.field("publication_year") >= start_year) & (ds.field("publication_year") <= end_year),
-        batch_size=100_000,
+
+def _scl_title_key_table(scl_columns, candidates):
+    """
+    (key, scl_idx) table of the title + year + ISSN key for the SciELO articles in candidates (an array of indices),
+    or None when the SciELO columns lack titles or ISSNs. Keys shared by several articles are dropped: unlike DOIs,
+    they do not identify an article.
+    """
+    if scl_columns is None or "titles" not in scl_columns.column_names or "journal_issns" not in scl_columns.column_names:
+        return None
+
+    rows = scl_columns.take(candidates)
+    titles = rows["titles"].combine_chunks()
+    issns = rows["journal_issns"].combine_chunks()
+    title_table = pa.table({
+        "pos": pc.list_parent_indices(titles).cast(pa.int64()),
+        "title": pc.list_flatten(titles),
+    })
+    issn_table = pa.table({
+        "pos": pc.list_parent_indices(issns).cast(pa.int64()),
+        "issn": pc.utf8_upper(pc.utf8_trim_whitespace(pc.list_flatten(issns))),
+    })
+    pairs = title_table.join(issn_table, "pos", join_type="inner")
+    positions = pairs["pos"].combine_chunks()
+    year = rows["publication_year"].combine_chunks().take(positions).cast(pa.string())
+    table = pa.table({
+        "key": pc.binary_join_element_wise(pairs["title"], year, pairs["issn"], "|"),
+        "scl_idx": candidates.take(positions),
+    })
+    table = table.filter(pc.and_(
+        pc.fill_null(pc.not_equal(pairs["title"], ""), False),
+        pc.fill_null(pc.not_equal(pairs["issn"], ""), False),
+    ))
+
+    table = table.filter(pc.fill_null(pc.not_equal(table["key"], ""), False))
+    table = table.group_by(["key", "scl_idx"], use_threads=False).aggregate([])
+    counts = table.group_by("key", use_threads=False).aggregate([("scl_idx", "count")])
+    unique_keys = counts.filter(pc.equal(counts["scl_idx_count"], 1))["key"]
+
+    return table.filter(pc.is_in(table["key"], value_set=unique_keys.combine_chunks()))
+
+
+def _match_openalex_key(parquet_files, scl_keys, key_expr, columns_to_load, start_year, end_year, matched_work_ids):
+    """
+    _match_openalex_works for a secondary key: a single hash join of the OpenAlex files with the (key, scl_idx) table
+    on key_expr, skipping the works in matched_work_ids. Keys held by several OpenAlex works are dropped.
+    """
+    con = duckdb.connect()
+    try:
+        con.register("scl_keys", scl_keys)
+        con.register("matched_works", pa.table({"work_id": matched_work_ids}))
+
+        selected = ", ".join(f'oa."{c}"' for c in columns_to_load if c != "doi_stz")
+        columns = ", ".join(f'"{c}"' for c in columns_to_load if c != "doi_stz")
+
+        year_conditions = []
+        params = [[str(p) for p in parquet_files]]
+        if start_year is not None:
+            year_conditions.append("oa.publication_year >= ?")
+            params.append(start_year)
+        if end_year is not None:
+            year_conditions.append("oa.publication_year <= ?")
+            params.append(end_year)
+
+        return con.execute(
+            f"""
+            SELECT scl_idx, {columns}
+            FROM (
+                SELECT k.key, k.scl_idx, {selected}
+                FROM read_parquet(?, union_by_name=true, hive_partitioning=false, filename=true, file_row_number=true) oa
+                JOIN scl_keys k ON k.key = {key_expr}
+                WHERE oa.work_id IS NOT NULL AND oa.work_id <> ''
+                AND oa.work_id NOT IN (SELECT work_id FROM matched_works)
+                {"".join(f" AND {c}" for c in year_conditions)}
+                QUALIFY row_number() OVER (PARTITION BY k.key, oa.work_id ORDER BY oa.filename DESC, oa.file_row_number DESC) = 1
+            )
+            QUALIFY count(*) OVER (PARTITION BY key) = 1
+            ORDER BY scl_idx, work_id
+            """,
+            params,
+        ).to_arrow_table()
+
+    finally:
+        con.close()
+
+
+def _match_cascade(parquet_files, unified_schema, scl_dois, scl_columns, num_articles, columns_to_load, start_year, end_year, match_keys=DEFAULT_MATCH_KEYS):
+    """
+    Matches the SciELO articles to OpenAlex works with each key of match_keys in turn, each key only for the
+    articles left unmatched by the previous ones (and only with works not matched yet), in one join pass per key.
+    Returns the match table of _match_openalex_works and, per key, the number and rate of the articles it matched.
+    """
+    unknown = [key for key in match_keys if key not in MATCH_KEYS]
+    if unknown:
+        raise ValueError(f"Unknown match keys: {unknown}. Expected some of {list(MATCH_KEYS)}")
+
+    all_idx = pa.array(np.arange(num_articles, dtype=np.int64))
+    tables = []
+    stats = {}
+    for key in match_keys:
+        matched_idx = pa.concat_arrays([pa.array([], type=pa.int64())] + [t["scl_idx"].combine_chunks().cast(pa.int64()) for t in tables])
+        candidates = all_idx.filter(pc.invert(pc.is_in(all_idx, value_set=matched_idx)))
+
+        oa_columns, key_expr = MATCH_KEYS[key]
+        missing = [c for c in oa_columns if c not in unified_schema.names]
+        if key == "doi":
+            key_table = scl_dois.filter(pc.is_in(scl_dois["scl_idx"], value_set=candidates))
+        else:
+            key_table = None if missing else _scl_title_key_table(scl_columns, candidates)
+
+        if key_table is None:
+            logger.warning(f"Match key {key} skipped: {f'OpenAlex columns {missing}' if missing else 'its SciELO fields are'} not available.")
+            stats[key] = {"articles": 0, "rate": 0.0, "available": False}
+            continue
+
+        matched_work_ids = pa.concat_arrays([pa.array([], type=pa.string())] + [t["work_id"].combine_chunks().cast(pa.string()) for t in tables])
+        if key == "doi":
+            table = _match_openalex_works(parquet_files, key_table, columns_to_load, start_year, end_year, matched_work_ids=matched_work_ids)
+        else:
+            table = _match_openalex_key(parquet_files, key_table, key_expr, columns_to_load, start_year, end_year, matched_work_ids)
+
+        articles = len(pc.unique(table["scl_idx"]))
+        stats[key] = {"articles": articles, "rate": articles / num_articles if num_articles else 0.0, "available": True}
+        logger.info(f"Match key {key}: {articles} SciELO articles ({stats[key]['rate']:.1%}) with {table.num_rows} OpenAlex works.")
+        tables.append(table)
+
+    if len(tables) == 1:
+        return tables[0], stats
+
+    if not tables:
+        columns = [c for c in columns_to_load if c != "doi_stz"]
+        return pa.table(
+            [pa.array([], type=pa.int64())] + [pa.array([], type=unified_schema.field(c).type) for c in columns],
+            names=["scl_idx", *columns],
+        ), stats
+
+    matches = pa.concat_tables(tables, promote_options="permissive")
+    return matches.sort_by([("scl_idx", "ascending"), ("work_id", "ascending")]), stats
+
+
+def _journal_oa_flags(matches):
+    return matches.append_column(
+        "journal_oa_flag",
+        pa.array([stz_binary_flag(v) for v in matches["is_journal_oa"].to_pylist()], type=pa.int64()),
     )
 
-    for rb in tqdm(scanner.to_batches(), desc="Searching for matches in OpenAlex", unit="batch"):
-        df_batch = rb.to_pandas()
-        df_batch["doi_stz"] = df_batch["doi"].apply(stz_doi)
 
-        mask = df_batch["doi_stz"].isin(doi_to_scl_idx)
-        df_matched = df_batch[mask]
+def _work_details(w, yearly_columns):
+    """Details of a matched OpenAlex work kept in `oa_individual_works`."""
+    work_metrics = {
+        "language": w["language"],
+        "journal_id": w["journal_id"],
+        "is_journal_oa": w["journal_oa_flag"],
+        "total_citations": safe_int(w["citations_total"]),
+        "citations_window_2y": safe_int(w["citations_window_2y"]),
+        "citations_window_3y": safe_int(w["citations_window_3y"]),
+        "citations_window_5y": safe_int(w["citations_window_5y"]),
+    }
+    for col in yearly_columns:
+        work_metrics[col] = safe_int(w[col])
 
-        for _, row in df_matched.iterrows():
-            scl_idx = doi_to_scl_idx[row["doi_stz"]]
-            oa_matches[scl_idx].append(row.to_dict())
+    return work_metrics
 
-        del df_batch
-        gc.collect()
-    
-    return oa_matches
 
+def _consolidate_scl_oa_results(scl_docs, matches, yearly_columns):
+    """
+    Consolidates OpenAlex matches and metrics for each SciELO article.
+    matches is the columnar match table of _match_openalex_works; the global totals come from a group-by on scl_idx.
+    """
+    metric_columns = ["citations_total", "citations_window_2y", "citations_window_3y", "citations_window_5y", *yearly_columns]
+    matches = _journal_oa_flags(matches)
 
-def _consolidate_scl_oa_results(scl_docs, oa_matches):
-    """Consolidates OpenAlex matches and metrics for each SciELO article."""
-    scl_oa_merged = []
+    totals = matches.group_by("scl_idx", use_threads=False).aggregate(
+        [(c, "sum") for c in metric_columns] + [("journal_oa_flag", "max"), ("work_id", "list")]
+    ).to_pylist()
+    totals_by_idx = {t["scl_idx"]: t for t in totals}
+
+    # Per-work details and taxonomy, read column-wise once (matches are sorted by scl_idx)
+    details_columns = ["scl_idx", "work_id", "language", "journal_id", "journal_oa_flag", *metric_columns, *TAXONOMY_FIELDS]
+    works_by_idx = defaultdict(list)
+    for values in zip(*(matches[c].to_pylist() for c in details_columns)):
+        works_by_idx[values[0]].append(dict(zip(details_columns, values)))
 
+    scl_oa_merged = []
     for idx, scl_doc in enumerate(scl_docs):
         merged_entry = scl_doc.copy()
-        matches = oa_matches.get(idx, [])
+        works = works_by_idx.get(idx)
 
-        if not matches:
+        if not works:
             merged_entry["oa_metrics"] = None
             merged_entry["has_oa_match"] = False
-        else:
-            unique_oa_records = {}
-            for m in matches:
-                wid = m.get("work_id")
-                if wid:
-                    unique_oa_records[wid] = m
-
-            global_agg = {
-                "total_citations": 0,
-                "citations_window_2y": 0,
-                "citations_window_3y": 0,
-                "citations_window_5y": 0,
-            }
-            works_detailed = {}
-            found_taxonomy = {field: set() for field in TAXONOMY_FIELDS}
-            has_journal_oa = False
-
-            for wid, m in unique_oa_records.items():
-                journal_is_oa = bool(stz_binary_flag(m.get("is_journal_oa")))
-
-                work_metrics = {
-                    "language": m.get("language"),
-                    "journal_id": m.get("journal_id"),
-                    "is_journal_oa": int(journal_is_oa),
-                    "total_citations": safe_int(m.get("citations_total")),
-                    "citations_window_2y": safe_int(m.get("citations_window_2y")),
-                    "citations_window_3y": safe_int(m.get("citations_window_3y")),
-                    "citations_window_5y": safe_int(m.get("citations_window_5y")),
-                }
-                has_journal_oa = has_journal_oa or journal_is_oa
-
-                global_agg["total_citations"] += work_metrics["total_citations"]
-                global_agg["citations_window_2y"] += work_metrics["citations_window_2y"]
-                global_agg["citations_window_3y"] += work_metrics["citations_window_3y"]
-                global_agg["citations_window_5y"] += work_metrics["citations_window_5y"]
-
-                for y in range(2012, datetime.datetime.now().year + 1):
-                    col = f"citations_{y}"
-                    if col in m:
-                        val = safe_int(m.get(col))
-                        work_metrics[col] = val
-                        global_agg[col] = global_agg.get(col, 0) + val
-
-                works_detailed[wid] = work_metrics
-                for field in TAXONOMY_FIELDS:
-                    val = m.get(field)
-                    if pd.notna(val) and val:
-                        found_taxonomy[field].add(str(val))
-
-            global_agg["is_journal_oa"] = int(has_journal_oa)
-
-            merged_entry["oa_metrics"] = {
-                "work_ids": sorted(list(unique_oa_records.keys())),
-                "match_count": len(unique_oa_records),
-                "global_totals": global_agg,
-                "individual_works": works_detailed
-            }
-            merged_entry["has_oa_match"] = True
+            scl_oa_merged.append(merged_entry)
+            continue
+
+        group = totals_by_idx[idx]
+        global_agg = {
+            "total_citations": safe_int(group["citations_total_sum"]),
+            "citations_window_2y": safe_int(group["citations_window_2y_sum"]),
+            "citations_window_3y": safe_int(group["citations_window_3y_sum"]),
+            "citations_window_5y": safe_int(group["citations_window_5y_sum"]),
+        }
+        for col in yearly_columns:
+            global_agg[col] = safe_int(group[f"{col}_sum"])
+        global_agg["is_journal_oa"] = int(group["journal_oa_flag_max"])
+
+        works_detailed = {}
+        found_taxonomy = {field: set() for field in TAXONOMY_FIELDS}
+        for w in works:
+            works_detailed[w["work_id"]] = _work_details(w, yearly_columns)
             for field in TAXONOMY_FIELDS:
-                merged_entry[field] = sorted(list(found_taxonomy[field]))
-        
+                if w[field]:
+                    found_taxonomy[field].add(str(w[field]))
+
+        merged_entry["oa_metrics"] = {
+            "work_ids": group["work_id_list"],
+            "match_count": len(works),
+            "global_totals": global_agg,
+            "individual_works": works_detailed
+        }
+        merged_entry["has_oa_match"] = True
+        for field in TAXONOMY_FIELDS:
+            merged_entry[field] = sorted(found_taxonomy[field])
+
         scl_oa_merged.append(merged_entry)
-    
+
     return scl_oa_merged
 
 
-def match_scielo_with_openalex(scl_docs, oa_parquet_dir, start_year=2018, end_year=None):
+def _match_columns(unified_schema):
+    """OpenAlex columns read for the matched works, and the yearly citation columns among them."""
+    columns_to_load = [
+        "work_id", "doi", *(["doi_stz"] if "doi_stz" in unified_schema.names else []),
+        "publication_year", "language", "journal_id",
+        *TAXONOMY_FIELDS,
+        "citations_total", "citations_window_2y",
+        "citations_window_3y", "citations_window_5y",
+        "is_journal_oa",
+    ]
+    specific_years = [f"citations_{y}" for y in range(YEARLY_CITATIONS_FIRST_YEAR, datetime.datetime.now().year + 1)]
+    yearly_columns = [c for c in specific_years if c in unified_schema.names]
+    columns_to_load.extend(yearly_columns)
+
+    return columns_to_load, yearly_columns
+
+
+def match_scielo_with_openalex(scl_docs, oa_parquet_dir, start_year=None, end_year=None, match_keys=DEFAULT_MATCH_KEYS):
     """
     SciELO-OpenAlex Matching
     -----------------------
@@ -174,87 +475,208 @@ def match_scielo_with_openalex(scl_docs, oa_parquet_dir, start_year=2018, end_ye
     - Individual OpenAlex work details are preserved.
     - Taxonomy fields are consolidated from all matched works.
     - No OpenAlex-OpenAlex merging is performed here; only grouping under SciELO articles.
+    - match_keys adds the secondary normalized title + year + ISSN key for the articles the DOIs do not
+      match, in cascade (see _match_cascade); the number and rate of articles matched by each key are logged.
+    - Only OpenAlex works published from start_year (default 2018) to end_year (default: current year) are matched.
     """
-    if end_year is None:
-        end_year = datetime.datetime.now().year
+    start_year, end_year = _match_year_range(start_year, end_year)
 
-    doi_to_scl_idx = _get_doi_to_scl_idx(scl_docs)
-    logger.info(f"Mapped {len(doi_to_scl_idx)} unique DOIs from {len(scl_docs)} SciELO articles.")
+    scl_dois = _get_scl_doi_table(scl_docs)
+    logger.info(f"Mapped {scl_dois.num_rows} unique DOIs from {len(scl_docs)} SciELO articles.")
 
-    oa_path = Path(oa_parquet_dir)
-    parquet_files = sorted(p for p in oa_path.rglob("*") if p.is_file() and p.stat().st_size > 0)
-    datasets = [ds.dataset(p, format="parquet") for p in parquet_files]
+    parquet_files = _discover_openalex_files(oa_parquet_dir, start_year, end_year)
+    unified_schema = _unify_openalex_schema(parquet_files)
 
-    unified_schema = pa.unify_schemas([d.schema for d in datasets], promote_options="permissive")
-    ds_oa = ds.dataset(parquet_files, format="parquet", schema=unified_schema)
+    columns_to_load, yearly_columns = _match_columns(unified_schema)
+    scl_columns = _scl_key_columns(scl_docs) if tuple(match_keys) != ("doi",) else None
+    matches, _ = _match_cascade(parquet_files, unified_schema, scl_dois, scl_columns, len(scl_docs), columns_to_load, start_year, end_year, match_keys)
+    logger.info(f"Found {matches.num_rows} OpenAlex matches for {len(pc.unique(matches['scl_idx']))} SciELO articles.")
 
-    columns_to_load = [
-        "work_id", "doi", "publication_year", "language", "journal_id",
-        *TAXONOMY_FIELDS,
-        "citations_total", "citations_window_2y",
-        "citations_window_3y", "citations_window_5y",
-        "is_journal_oa",
+    scl_oa_merged = _consolidate_scl_oa_results(scl_docs, matches, yearly_columns)
+
+    return scl_oa_merged, unified_schema
+
+
+# Details of each OpenAlex work of a consolidated record; the yearly citation columns are appended as int64 fields
+INDIVIDUAL_WORK_FIELDS = [
+    pa.field("work_id", pa.string()),
+    pa.field("language", pa.string()),
+    pa.field("journal_id", pa.string()),
+    pa.field("is_journal_oa", pa.int64()),
+    pa.field("total_citations", pa.int64()),
+    pa.field("citations_window_2y", pa.int64()),
+    pa.field("citations_window_3y", pa.int64()),
+    pa.field("citations_window_5y", pa.int64()),
+]
+
+
+def individual_works_type(yearly_columns):
+    """Type of the `oa_individual_works` column: a list of structs, one per merged OpenAlex work."""
+    return pa.list_(pa.struct(INDIVIDUAL_WORK_FIELDS + [pa.field(c, pa.int64()) for c in yearly_columns]))
+
+
+def merged_extra_fields(yearly_columns, individual_works_json=False):
+    """Columns added to the OpenAlex schema in the merged Parquet; `oa_individual_works` is JSON text if requested."""
+    return [
+        pa.field("scielo_collection", pa.list_(pa.string())),
+        pa.field("scielo_pid_v2", pa.list_(pa.string())),
+        pa.field("all_work_ids", pa.list_(pa.string())),
+        pa.field("is_merged", pa.bool_()),
+        pa.field("oa_individual_works", pa.string() if individual_works_json else individual_works_type(yearly_columns)),
     ]
-    specific_years = [f"citations_{y}" for y in range(2012, datetime.datetime.now().year + 1)]
-    columns_to_load.extend([c for c in specific_years if c in unified_schema.names])
 
-    oa_matches = _scan_openalex_for_matches(ds_oa, doi_to_scl_idx, columns_to_load, start_year, end_year)
-    logger.info(f"Found OpenAlex matches for {len(oa_matches)} SciELO articles.")
 
-    scl_oa_merged = _consolidate_scl_oa_results(scl_docs, oa_matches)
+def individual_works_to_json(values):
+    """
+    Converts an `oa_individual_works` list-of-structs array to the JSON text of earlier versions
+    (an object keyed by work ID, with the other fields in order).
+    """
+    payloads = []
+    for works in values.to_pylist():
+        if works is None:
+            payloads.append(None)
+            continue
 
-    return scl_oa_merged, unified_schema
+        payloads.append(json.dumps({w.pop("work_id"): w for w in works}))
 
+    return pa.array(payloads, type=pa.string())
 
-def _get_wid_mappings(scl_oa_merged):
-    """Generates mappings for work IDs and their corresponding SciELO article data."""
-    wid_to_merged = {}
-    all_merged_wids = set()
-    survivor_to_merged = {}
 
+def _merged_schema(unified_schema, individual_works_json=False):
+    yearly_columns = _match_columns(unified_schema)[1]
+    return pa.schema(list(unified_schema) + merged_extra_fields(yearly_columns, individual_works_json))
+
+
+def _finish_groups(groups, new_schema):
+    """Casts the survivor table to the merged schema (producing the JSON `oa_individual_works` when requested)."""
+    if new_schema.field("oa_individual_works").type == pa.string():
+        position = groups.schema.get_field_index("oa_individual_works")
+        groups = groups.set_column(position, "oa_individual_works", individual_works_to_json(groups["oa_individual_works"].combine_chunks()))
+
+    return groups
+
+
+def _is_citation_column(name):
+    return name.startswith("citations_") or "window" in name
+
+
+def _build_survivor_table(scl_oa_merged, unified_schema):
+    """
+    Precomputes, for the SciELO articles matched to OpenAlex, the columns of their consolidated rows.
+    Returns (member_work_ids, member_groups, groups): every matched work ID with the index of its survivor (the
+    first work ID of its article) in groups, a table with one row per survivor holding the totals (named as the OpenAlex columns), the extra
+    merged columns and the `fill_<taxonomy>` values used when the emitted row has no taxonomy.
+    """
+    # A work matched to several articles follows the last one, and so does a survivor shared by several articles
+    wid_to_survivor = {}
+    survivor_to_merged = {}
     for data in scl_oa_merged:
-        if data.get("has_oa_match"):
-            wids = data["oa_metrics"]["work_ids"]
-            if not wids:
-                continue
-
-            survivor = wids[0]
-            survivor_to_merged[survivor] = data
-            for wid in wids:
-                all_merged_wids.add(wid)
-                wid_to_merged[wid] = survivor
-    
-    return wid_to_merged, all_merged_wids, survivor_to_merged
-
-
-def _consolidate_row(row, merged_data):
-    """Consolidates an OpenAlex row with merged SciELO metadata and metrics."""
-    new_row = row.to_dict()
-
-    totals = merged_data["oa_metrics"]["global_totals"]
-    for k, v in totals.items():
-        col_name = "citations_total" if k == "total_citations" else k
-        new_row[col_name] = v
-
-    for y in range(2012, datetime.datetime.now().year + 1):
-        col = f"citations_{y}"
-        if col in totals:
-            new_row[col] = totals[col]
-
-    new_row["scielo_collection"] = merged_data.get("collection", [])
-    new_row["scielo_pid_v2"] = merged_data.get("pid_v2", [])
-    new_row["all_work_ids"] = merged_data["oa_metrics"]["work_ids"]
-    new_row["is_merged"] = len(merged_data["oa_metrics"]["work_ids"]) > 1
-    new_row["oa_individual_works"] = json.dumps(merged_data["oa_metrics"]["individual_works"])
+        if not data.get("has_oa_match"):
+            continue
 
-    for tax in TAXONOMY_FIELDS:
-        if (not new_row.get(tax) or pd.isna(new_row.get(tax))) and merged_data.get(tax):
-            new_row[tax] = merged_data[tax][0]
+        wids = data["oa_metrics"]["work_ids"]
+        if not wids:
+            continue
 
-    return new_row
+        survivor_to_merged[wids[0]] = data
+        for wid in wids:
+            wid_to_survivor[wid] = wids[0]
 
+    survivor_groups = {survivor: group for group, survivor in enumerate(survivor_to_merged)}
+    member_work_ids = list(wid_to_survivor)
+    member_groups = [survivor_groups[wid_to_survivor[wid]] for wid in member_work_ids]
 
-def generate_merged_parquet(scl_oa_merged, oa_parquet_dir, output_file, unified_schema):
+    rows = []
+    for data in survivor_to_merged.values():
+        wids = data["oa_metrics"]["work_ids"]
+        row = {}
+        for k, v in data["oa_metrics"]["global_totals"].items():
+            row["citations_total" if k == "total_citations" else k] = v
+
+        row["scielo_collection"] = data.get("collection", [])
+        row["scielo_pid_v2"] = data.get("pid_v2", [])
+        row["all_work_ids"] = wids
+        row["is_merged"] = len(wids) > 1
+        row["oa_individual_works"] = [{"work_id": wid, **work} for wid, work in data["oa_metrics"]["individual_works"].items()]
+        for tax in TAXONOMY_FIELDS:
+            row[f"fill_{tax}"] = data[tax][0] if data.get(tax) else None
+
+        rows.append(row)
+
+    total_columns = [c for c in unified_schema.names if any(c in row for row in rows) and c not in TAXONOMY_FIELDS]
+    fields = [unified_schema.field(c) for c in total_columns] + merged_extra_fields(_match_columns(unified_schema)[1])
+    fields += [pa.field(f"fill_{tax}", pa.string()) for tax in TAXONOMY_FIELDS]
+
+    groups = pa.table({f.name: pa.array([row.get(f.name) for row in rows], type=f.type) for f in fields})
+
+    return pa.array(member_work_ids, type=pa.string()), np.asarray(member_groups, dtype=np.int64), groups
+
+
+def _consolidate_batch(batch, member_work_ids, member_groups, groups, emitted, new_schema):
+    """
+    Consolidates a batch of OpenAlex works column-wise:
+    - unmatched works pass through, with the extra merged columns set to constants;
+    - of the works of a survivor, the first one read (in any batch) is kept and receives the consolidated
+      columns, looked up in groups by the survivor index; the others are dropped.
+    emitted flags the survivors whose consolidated row has already been written.
+    """
+    citation_columns = [c for c in batch.schema.names if _is_citation_column(c)]
+    columns = {
+        name: pc.fill_null(batch.column(name), pa.scalar(0).cast(batch.schema.field(name).type)) if name in citation_columns else batch.column(name)
+        for name in batch.schema.names
+    }
+
+    member_pos = pc.index_in(columns["work_id"], value_set=member_work_ids).to_numpy(zero_copy_only=False)
+    is_member = ~np.isnan(member_pos)
+
+    row_groups = np.full(batch.num_rows, -1, dtype=np.int64)
+    row_groups[is_member] = member_groups[member_pos[is_member].astype(np.int64)]
+
+    # First row read of each survivor not yet emitted
+    keep = ~is_member
+    member_rows = np.flatnonzero(is_member)
+    if len(member_rows):
+        first_groups, first_idx = np.unique(row_groups[member_rows], return_index=True)
+        first_rows = member_rows[first_idx][~emitted[first_groups]]
+        keep[first_rows] = True
+        emitted[first_groups] = True
+
+    keep_mask = pa.array(keep)
+    columns = {name: pc.filter(col, keep_mask) for name, col in columns.items()}
+    kept_groups = row_groups[keep]
+    is_survivor = kept_groups >= 0
+    group_idx = pa.array(np.where(is_survivor, kept_groups, 0), mask=~is_survivor)
+    survivor_mask = pa.array(is_survivor)
+
+    for name in groups.column_names:
+        if name in columns:
+            values = groups.column(name).take(group_idx).cast(columns[name].type)
+            columns[name] = pc.if_else(pc.and_(survivor_mask, pc.is_valid(values)), values, columns[name])
+
+    for tax in TAXONOMY_FIELDS:
+        if tax in columns:
+            fill = groups.column(f"fill_{tax}").take(group_idx).cast(columns[tax].type)
+            missing = pc.or_(pc.is_null(columns[tax]), pc.equal(columns[tax], ""))
+            columns[tax] = pc.if_else(pc.and_(pc.fill_null(missing, True), pc.is_valid(fill)), fill, columns[tax])
+
+    n = len(survivor_mask)
+    work_ids = pa.chunked_array([columns["work_id"]]).combine_chunks().cast(pa.string())
+    own_work_id = pa.ListArray.from_arrays(pa.array(np.arange(n + 1, dtype=np.int32)), work_ids)
+    extra = {
+        "scielo_collection": pa.nulls(n, pa.list_(pa.string())),
+        "scielo_pid_v2": pa.nulls(n, pa.list_(pa.string())),
+        "all_work_ids": own_work_id,
+        "is_merged": pa.array(np.zeros(n, dtype=bool)),
+        "oa_individual_works": pa.nulls(n, new_schema.field("oa_individual_works").type),
+    }
+    for name, default in extra.items():
+        values = groups.column(name).take(group_idx)
+        columns[name] = pc.if_else(survivor_mask, values, default)
+
+    return pa.table([columns[f.name].cast(f.type) for f in new_schema], schema=new_schema)
+
+
+def generate_merged_parquet(scl_oa_merged, oa_parquet_dir, output_file, unified_schema, start_year=None, end_year=None, individual_works_json=False, checkpoint_dir=None, resume=False):
     """
     OpenAlex-OpenAlex Consolidation
     ------------------------------
@@ -262,77 +684,224 @@ def generate_merged_parquet(scl_oa_merged, oa_parquet_dir, output_file, unified_
     - Metrics are aggregated for all merged works.
     - The 'all_work_ids' field lists all OpenAlex work IDs that were merged.
     - The 'is_merged' flag indicates if the record is a result of merging multiple OpenAlex works.
-    - The 'oa_individual_works' field stores the details of each original OpenAlex work in JSON format.
+    - The 'oa_individual_works' field stores the details of each original OpenAlex work as a list of structs
+      (JSON text, as in earlier versions, with individual_works_json).
     - OpenAlex works not matched to any SciELO article are kept as-is.
     - This ensures unique representation and avoids double counting.
+    - When start_year/end_year are given, only OpenAlex works in that range are read (year partitions outside it are pruned).
+    Batches are processed column-wise (see _consolidate_batch), without converting rows to Python objects.
+    With checkpoint_dir, the run is checkpointed (see _write_checkpointed_parquet); resume continues the run
+    interrupted in checkpoint_dir.
+    """
+    member_work_ids, member_groups, groups = _build_survivor_table(scl_oa_merged, unified_schema)
+    parquet_files = _discover_openalex_files(oa_parquet_dir, start_year, end_year)
+
+    _write_merged_parquet(
+        parquet_files, output_file, unified_schema, member_work_ids, member_groups, groups,
+        lambda writer, new_schema: _write_unmatched_scielo(writer, scl_oa_merged, new_schema, unified_schema),
+        start_year, end_year, individual_works_json, checkpoint_dir=checkpoint_dir, resume=resume,
+    )
+
+
+def _write_merged_parquet(parquet_files, output_file, unified_schema, member_work_ids, member_groups, groups, write_unmatched, start_year=None, end_year=None, individual_works_json=False, emitted=None, checkpoint_dir=None, resume=False):
+    """
+    Scans the OpenAlex files, writing their consolidated batches and then the unmatched SciELO articles
+    (write_unmatched, if given). emitted flags the survivors written elsewhere. Returns the number of rows written.
     """
     output_file = Path(output_file)
     output_file.parent.mkdir(parents=True, exist_ok=True)
 
-    wid_to_merged, all_merged_wids, survivor_to_merged = _get_wid_mappings(scl_oa_merged)
+    new_schema = _merged_schema(unified_schema, individual_works_json)
+    groups = _finish_groups(groups, new_schema)
+    if emitted is None:
+        emitted = np.zeros(groups.num_rows, dtype=bool)
+
+    if checkpoint_dir is not None:
+        return _write_checkpointed_parquet(
+            parquet_files, output_file, unified_schema, new_schema, member_work_ids, member_groups, groups, emitted,
+            write_unmatched, start_year, end_year, checkpoint_dir, resume,
+        )
+
+    dataset_original = ds.dataset(parquet_files, format="parquet", schema=unified_schema)
+    scanner = dataset_original.scanner(
+        columns=unified_schema.names,
+        filter=_year_filter(start_year, end_year),
+        batch_size=1_000_000,
+    )
 
-    additional_fields = [
-        pa.field("scielo_collection", pa.list_(pa.string())),
-        pa.field("scielo_pid_v2", pa.list_(pa.string())),
-        pa.field("all_work_ids", pa.list_(pa.string())),
-        pa.field("is_merged", pa.bool_()),
-        pa.field("oa_individual_works", pa.string())
-    ]
-    new_schema = pa.schema(list(unified_schema) + additional_fields)
-    
-    oa_path = Path(oa_parquet_dir)
-    parquet_files = sorted(p for p in oa_path.rglob("*") if p.is_file() and p.stat().st_size > 0)
-    dataset_original = ds.dataset(parquet_files, schema=unified_schema)
-    scanner = dataset_original.scanner(columns=unified_schema.names, batch_size=1_000_000)
-
-    emitted_survivors = set()
     writer = pq.ParquetWriter(output_file, new_schema)
-    
+
     try:
         for batch in tqdm(scanner.to_batches(), desc="Generating Merged Parquet"):
-            df_batch = batch.to_pandas()
-            cit_cols = [c for c in df_batch.columns if c.startswith("citations_") or "window" in c]
-            df_batch[cit_cols] = df_batch[cit_cols].fillna(0)
-            
-            rows_to_keep = []
-            for _, row in df_batch.iterrows():
-                wid = row["work_id"]
-
-                if wid in all_merged_wids:
-                    survivor = wid_to_merged[wid]
-
-                    if survivor not in emitted_survivors:
-                        merged_data = survivor_to_merged[survivor]
-                        rows_to_keep.append(_consolidate_row(row, merged_data))
-                        emitted_survivors.add(survivor)
-
-                else:
-                    new_row = row.to_dict()
-                    new_row["scielo_collection"] = None
-                    new_row["scielo_pid_v2"] = None
-                    new_row["all_work_ids"] = [wid]
-                    new_row["is_merged"] = False
-                    new_row["oa_individual_works"] = None
-                    rows_to_keep.append(new_row)
-            
-            if rows_to_keep:
-                df_out = pd.DataFrame(rows_to_keep)
-                for field in new_schema.names:
-                    if field not in df_out.columns: df_out[field] = None
-
-                df_out = df_out[new_schema.names]
-                table_out = pa.Table.from_pandas(df_out, schema=new_schema)
-                writer.write_table(table_out)
-            del df_batch
-            gc.collect()
+            if batch.num_rows:
+                writer.write_table(_consolidate_batch(batch, member_work_ids, member_groups, groups, emitted, new_schema))
 
         # Add SciELO articles without OpenAlex matches
-        _write_unmatched_scielo(writer, scl_oa_merged, new_schema, unified_schema)
+        if write_unmatched is not None:
+            write_unmatched(writer, new_schema)
 
     finally:
         writer.close()
-    
+
     logger.info(f"Merged dataset saved to {output_file}")
+    return pq.ParquetFile(output_file).metadata.num_rows
+
+
+CHECKPOINT_MANIFEST_FILE_NAME = "generate_progress.json"
+CHECKPOINT_FRAGMENT_ROWS = 5_000_000
+
+
+def _parquet_fingerprint(table):
+    """Fingerprint of a table's content (its Parquet encoding, which does not depend on the values under nulls)."""
+    sink = pa.BufferOutputStream()
+    pq.write_table(table, sink)
+
+    return hashlib.sha256(sink.getvalue()).hexdigest()
+
+
+def _checkpoint_fingerprint(parquet_files, new_schema, member_work_ids, member_groups, groups, start_year, end_year):
+    survivors = pa.table({"work_id": member_work_ids, "group": pa.array(member_groups)})
+
+    return _fingerprint([
+        _files_fingerprint(parquet_files),
+        [str(f) for f in parquet_files],
+        new_schema.to_string(),
+        start_year,
+        end_year,
+        _parquet_fingerprint(survivors),
+        _parquet_fingerprint(groups),
+    ])
+
+
+def _clear_checkpoint(checkpoint_dir):
+    for pattern in ("part_*.parquet*", "emitted_*.npy*", f"{CHECKPOINT_MANIFEST_FILE_NAME}*"):
+        for path in checkpoint_dir.glob(pattern):
+            path.unlink()
+
+
+class _CheckpointWriter:
+    """
+    Writes consolidated tables to numbered fragments (`part_NNNNN.parquet`) in a checkpoint directory. commit moves
+    the open fragment into place, saves the survivors emitted so far (`emitted_NNNNN.npy`) and then the progress
+    manifest, so that the manifest only refers to complete files.
+    """
+    def __init__(self, checkpoint_dir, new_schema, progress):
+        self.checkpoint_dir = Path(checkpoint_dir)
+        self.new_schema = new_schema
+        self.progress = progress
+        self.writer = None
+        self.rows = 0
+
+    def _fragment_path(self):
+        return self.checkpoint_dir / f"part_{len(self.progress['fragments']):05d}.parquet"
+
+    def write_table(self, table):
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self._fragment_path().with_suffix(".parquet.tmp"), self.new_schema)
+        self.writer.write_table(table)
+        self.rows += table.num_rows
+
+    def commit(self, position, emitted, complete=False):
+        if self.writer is not None:
+            self.writer.close()
+            os.replace(self._fragment_path().with_suffix(".parquet.tmp"), self._fragment_path())
+            self.progress["fragments"].append({"path": self._fragment_path().name, "rows": self.rows, "end": position})
+            self.writer = None
+            self.rows = 0
+
+        previous_emitted = self.progress["emitted"]
+        emitted_name = f"emitted_{len(self.progress['fragments']):05d}.npy"
+        with open(self.checkpoint_dir / f"{emitted_name}.tmp", "wb") as f:
+            np.save(f, emitted)
+        os.replace(self.checkpoint_dir / f"{emitted_name}.tmp", self.checkpoint_dir / emitted_name)
+
+        self.progress.update({
+            "position": position,
+            "emitted": emitted_name,
+            "complete": complete,
+            "updated_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        })
+        manifest_path = self.checkpoint_dir / CHECKPOINT_MANIFEST_FILE_NAME
+        tmp_path = manifest_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.progress, f, indent=2)
+        os.replace(tmp_path, manifest_path)
+
+        if previous_emitted and previous_emitted != emitted_name:
+            (self.checkpoint_dir / previous_emitted).unlink(missing_ok=True)
+
+
+def _write_checkpointed_parquet(parquet_files, output_file, unified_schema, new_schema, member_work_ids, member_groups, groups, emitted, write_unmatched, start_year, end_year, checkpoint_dir, resume):
+    """
+    _write_merged_parquet in checkpointed fragments (see _CheckpointWriter). A fragment is committed once it holds
+    `CHECKPOINT_FRAGMENT_ROWS` rows, recording the position of the next input batch (file index and batch index within the file),
+    so that resume continues from the last committed fragment; the unmatched SciELO articles are the last fragment.
+    Once every fragment is committed, they are copied into output_file (through a temporary file, then renamed) and
+    the checkpoint is cleared. A checkpoint written from other inputs (files, schema, year range or survivor table)
+    is not resumed.
+    """
+    checkpoint_dir = Path(checkpoint_dir)
+    checkpoint_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = checkpoint_dir / CHECKPOINT_MANIFEST_FILE_NAME
+    fingerprint = _checkpoint_fingerprint(parquet_files, new_schema, member_work_ids, member_groups, groups, start_year, end_year)
+
+    progress = None
+    if resume and manifest_path.exists():
+        with open(manifest_path) as f:
+            progress = json.load(f)
+        if progress["fingerprint"] != fingerprint:
+            raise ValueError(f"Checkpoint at {checkpoint_dir} was written from different inputs; run without resume to start over")
+
+    if progress is None:
+        _clear_checkpoint(checkpoint_dir)
+        progress = {"fingerprint": fingerprint, "position": {"file": 0, "batch": 0}, "fragments": [], "emitted": None, "complete": False}
+    else:
+        if progress["emitted"]:
+            emitted = np.load(checkpoint_dir / progress["emitted"])
+        logger.info(
+            f"Resuming from {len(progress['fragments'])} committed fragments "
+            f"(file {progress['position']['file']}, batch {progress['position']['batch']} of {len(parquet_files)} files)."
+        )
+
+    writer = _CheckpointWriter(checkpoint_dir, new_schema, progress)
+    if not progress["complete"]:
+        start = progress["position"]
+        for file_idx in range(start["file"], len(parquet_files)):
+            scanner = ds.dataset([parquet_files[file_idx]], format="parquet", schema=unified_schema).scanner(
+                columns=unified_schema.names,
+                filter=_year_filter(start_year, end_year),
+                batch_size=1_000_000,
+            )
+            skip = start["batch"] if file_idx == start["file"] else 0
+            for batch_idx, batch in enumerate(scanner.to_batches()):
+                if batch_idx < skip:
+                    continue
+                if batch.num_rows:
+                    writer.write_table(_consolidate_batch(batch, member_work_ids, member_groups, groups, emitted, new_schema))
+                if writer.rows >= CHECKPOINT_FRAGMENT_ROWS:
+                    writer.commit({"file": file_idx, "batch": batch_idx + 1}, emitted)
+
+            logger.info(f"Consolidated OpenAlex file {file_idx + 1}/{len(parquet_files)}.")
+
+        end = {"file": len(parquet_files), "batch": 0}
+        writer.commit(end, emitted)
+
+        # Add SciELO articles without OpenAlex matches
+        if write_unmatched is not None:
+            write_unmatched(writer, new_schema)
+        writer.commit(end, emitted, complete=True)
+
+    tmp_output = output_file.with_name(f"{output_file.name}.tmp")
+    with pq.ParquetWriter(tmp_output, new_schema) as output_writer:
+        for fragment in progress["fragments"]:
+            fragment_file = pq.ParquetFile(checkpoint_dir / fragment["path"])
+            for rg in range(fragment_file.num_row_groups):
+                output_writer.write_table(fragment_file.read_row_group(rg))
+    os.replace(tmp_output, output_file)
+    _clear_checkpoint(checkpoint_dir)
+
+    logger.info(f"Merged dataset saved to {output_file} ({len(progress['fragments'])} checkpointed fragments)")
+    return sum(fragment["rows"] for fragment in progress["fragments"])
 
 
 def _write_unmatched_scielo(writer, scl_oa_merged, new_schema, unified_schema):
@@ -344,6 +913,8 @@ def _write_unmatched_scielo(writer, scl_oa_merged, new_schema, unified_schema):
 
             row["publication_year"] = data.get("publication_year")
             row["doi"] = data.get("doi")
+            if "doi_stz" in row:
+                row["doi_stz"] = data.get("doi")
             row["work_id"] = f"scielo:{data.get('pid_v2', [''])[0]}"
 
             row["citations_total"] = 0
@@ -384,3 +955,717 @@ def _write_unmatched_scielo(writer, scl_oa_merged, new_schema, unified_schema):
 
         df_out = df_out[new_schema.names]
         writer.write_table(pa.Table.from_pandas(df_out, schema=new_schema))
+
+
+def _int_values(values):
+    """Integer values of a metric column, with nulls (and NaN) as 0, as safe_int."""
+    values = pa.chunked_array([values]) if isinstance(values, pa.Array) else values
+    if pa.types.is_floating(values.type):
+        values = pc.if_else(pc.is_nan(values), None, values)
+
+    return pc.fill_null(values, 0).cast(pa.int64(), safe=False)
+
+
+def _article_individual_works(matches, yearly_columns):
+    """
+    `oa_individual_works` of each matched SciELO article, in scl_idx order: the match rows (sorted by scl_idx and
+    work_id) as a struct array, split into lists at the article boundaries.
+    """
+    works_type = individual_works_type(yearly_columns).value_type
+    sources = {
+        "work_id": matches["work_id"],
+        "language": matches["language"],
+        "journal_id": matches["journal_id"],
+        "is_journal_oa": matches["journal_oa_flag"],
+        "total_citations": _int_values(matches["citations_total"]),
+        **{c: _int_values(matches[c]) for c in ["citations_window_2y", "citations_window_3y", "citations_window_5y", *yearly_columns]},
+    }
+    works = pa.StructArray.from_arrays(
+        [pa.chunked_array([sources[f.name]]).combine_chunks().cast(f.type) for f in works_type],
+        fields=list(works_type),
+    )
+
+    scl_idx = matches["scl_idx"].to_numpy()
+    starts = np.flatnonzero(np.diff(scl_idx, prepend=-1)) if len(scl_idx) else np.zeros(0, dtype=np.int64)
+    offsets = np.append(starts, len(scl_idx)).astype(np.int32)
+
+    return pa.ListArray.from_arrays(pa.array(offsets), works)
+
+
+def _article_taxonomy_fills(matches, articles_idx):
+    """First sorted non-empty value of each taxonomy field for each matched article (articles_idx order)."""
+    fills = {}
+    for tax in TAXONOMY_FIELDS:
+        values = pa.table({"scl_idx": matches["scl_idx"], tax: matches[tax].cast(pa.string())})
+        values = values.filter(pc.fill_null(pc.not_equal(values[tax], ""), False))
+        first = values.group_by("scl_idx", use_threads=False).aggregate([(tax, "min")])
+        fills[tax] = first[f"{tax}_min"].take(pc.index_in(articles_idx, value_set=first["scl_idx"]))
+
+    return fills
+
+
+def _survivor_table_from_matches(scl_table, matches, unified_schema, yearly_columns):
+    """
+    _build_survivor_table computed from the match table and the SciELO column store, without building the
+    consolidated SciELO documents. The same last-wins rules apply: a work matched to several articles follows the
+    one with the highest index, and so does a survivor shared by several articles.
+    """
+    metric_columns = ["citations_total", "citations_window_2y", "citations_window_3y", "citations_window_5y", *yearly_columns]
+    matches = _journal_oa_flags(matches)
+
+    articles = matches.group_by("scl_idx", use_threads=False).aggregate(
+        [(c, "sum") for c in metric_columns] + [("journal_oa_flag", "max"), ("work_id", "list")]
+    ).sort_by("scl_idx")
+    individual_works = _article_individual_works(matches, yearly_columns)
+    fills = _article_taxonomy_fills(matches, articles["scl_idx"])
+
+    survivors = pc.list_element(articles["work_id_list"], 0)
+    winners = pa.table({"survivor": survivors, "scl_idx": articles["scl_idx"]}).group_by("survivor", use_threads=False).aggregate([("scl_idx", "max")])
+    is_winner = pc.is_in(articles["scl_idx"], value_set=winners["scl_idx_max"])
+
+    groups_idx = pa.array(np.flatnonzero(is_winner.to_numpy(zero_copy_only=False)))
+    group_survivors = survivors.take(groups_idx)
+
+    last_article = matches.group_by("work_id", use_threads=False).aggregate([("scl_idx", "max")])
+    article_pos = pc.index_in(last_article["scl_idx_max"], value_set=articles["scl_idx"])
+    member_groups = pc.index_in(survivors.take(article_pos), value_set=group_survivors)
+
+    rows = articles.take(groups_idx)
+    scl_idx = rows["scl_idx"]
+    columns = {}
+    if rows.num_rows:
+        for c in metric_columns:
+            columns[c] = pc.fill_null(rows[f"{c}_sum"], 0)
+        columns["is_journal_oa"] = rows["journal_oa_flag_max"]
+
+    all_work_ids = rows["work_id_list"]
+    columns.update({
+        "scielo_collection": scl_table["collection"].take(scl_idx),
+        "scielo_pid_v2": scl_table["pid_v2"].take(scl_idx),
+        "all_work_ids": all_work_ids,
+        "is_merged": pc.greater(pc.list_value_length(all_work_ids), 1),
+        "oa_individual_works": individual_works.take(groups_idx),
+    })
+    for tax in TAXONOMY_FIELDS:
+        columns[f"fill_{tax}"] = fills[tax].take(groups_idx)
+
+    total_columns = [c for c in unified_schema.names if c in columns and c not in TAXONOMY_FIELDS]
+    fields = [unified_schema.field(c) for c in total_columns] + merged_extra_fields(yearly_columns)
+    fields += [pa.field(f"fill_{tax}", pa.string()) for tax in TAXONOMY_FIELDS]
+    groups = pa.table({f.name: pa.chunked_array([columns[f.name]]).cast(f.type) for f in fields})
+
+    member_work_ids = last_article["work_id"].combine_chunks().cast(pa.string())
+    return member_work_ids, member_groups.to_numpy(zero_copy_only=False).astype(np.int64), groups
+
+
+def _unmatched_scielo_table(scl_table, matched_idx, new_schema):
+    """_write_unmatched_scielo for the SciELO column store: the rows of the articles whose index is not in matched_idx."""
+    unmatched = pc.invert(pc.is_in(pa.array(np.arange(scl_table.num_rows, dtype=np.int64)), value_set=pc.unique(matched_idx)))
+    rows = scl_table.filter(unmatched)
+    n = rows.num_rows
+
+    pid = pc.fill_null(pc.list_element(rows["pid_v2"], 0), "")
+    columns = {
+        "publication_year": rows["publication_year"],
+        "doi": rows["doi"],
+        "doi_stz": rows["doi"],
+        "work_id": pc.binary_join_element_wise("scielo:", pid, ""),
+        "scielo_collection": rows["collection"],
+        "scielo_pid_v2": rows["pid_v2"],
+        "all_work_ids": pa.ListArray.from_arrays(pa.array(np.zeros(n + 1, dtype=np.int32)), pa.array([], type=pa.string())),
+        "is_merged": pa.array(np.zeros(n, dtype=bool)),
+    }
+
+    arrays = []
+    for f in new_schema:
+        if f.name in columns:
+            arrays.append(pa.chunked_array([columns[f.name]]).cast(f.type))
+        elif _is_citation_column(f.name) or f.name == "is_journal_oa":
+            arrays.append(pa.nulls(n, f.type).fill_null(pa.scalar(0).cast(f.type)))
+        else:
+            arrays.append(pa.nulls(n, f.type))
+
+    return pa.table(arrays, schema=new_schema)
+
+
+def integrate_scielo_columns(scl_table, oa_parquet_dir, output_file, start_year=None, end_year=None, individual_works_json=False, checkpoint_dir=None, resume=False, match_keys=DEFAULT_MATCH_KEYS):
+    """
+    Streaming Integration
+    ---------------------
+    match_scielo_with_openalex followed by generate_merged_parquet for the SciELO column store of
+    read_scielo_columns: the DOI table is exploded column-wise, the survivor table is built from the match table,
+    and the unmatched SciELO articles are written from the column store, so no per-document dict is kept.
+    The output is the same as the two-pass integration; checkpoint_dir and resume work as in generate_merged_parquet,
+    and match_keys as in match_scielo_with_openalex (the title key needs the `titles` and `journal_issns` columns in
+    scl_table). As there, the year range of the match defaults to 2018 up to the current year, and only the years
+    given prune the output. Returns the counts of SciELO articles, matched articles and OpenAlex matches, and the
+    match rate of each key.
+    """
+    match_start_year, match_end_year = _match_year_range(start_year, end_year)
+
+    scl_dois = _scl_doi_table_from_columns(scl_table)
+    logger.info(f"Mapped {scl_dois.num_rows} unique DOIs from {scl_table.num_rows} SciELO articles.")
+
+    parquet_files = _discover_openalex_files(oa_parquet_dir, start_year, end_year)
+    unified_schema = _unify_openalex_schema(parquet_files)
+
+    columns_to_load, yearly_columns = _match_columns(unified_schema)
+    matches, key_stats = _match_cascade(parquet_files, unified_schema, scl_dois, scl_table, scl_table.num_rows, columns_to_load, match_start_year, match_end_year, match_keys)
+    matched_articles = len(pc.unique(matches["scl_idx"]))
+    logger.info(f"Found {matches.num_rows} OpenAlex matches for {matched_articles} SciELO articles.")
+
+    member_work_ids, member_groups, groups = _survivor_table_from_matches(scl_table, matches, unified_schema, yearly_columns)
+    _write_merged_parquet(
+        parquet_files, output_file, unified_schema, member_work_ids, member_groups, groups,
+        lambda writer, new_schema: writer.write_table(_unmatched_scielo_table(scl_table, matches["scl_idx"], new_schema)),
+        start_year, end_year, individual_works_json, checkpoint_dir=checkpoint_dir, resume=resume,
+    )
+
+    return {"scielo_articles": scl_table.num_rows, "matched_articles": matched_articles, "matches": matches.num_rows, "match_keys": key_stats}
+
+
+SIDE_STORE_MAX_ROWS = 1_000_000
+
+
+class _MatchedRowStore:
+    """
+    Bounded side store for the OpenAlex rows whose DOI matches a SciELO article: rows are buffered in memory
+    and spilled to Parquet fragments in directory once more than max_rows are buffered.
+    """
+    def __init__(self, directory, max_rows=SIDE_STORE_MAX_ROWS):
+        self.directory = Path(directory)
+        self.max_rows = max_rows
+        self.buffer = []
+        self.buffered_rows = 0
+        self.total_rows = 0
+        self.fragments = []
+
+    def add(self, table):
+        self.buffer.append(table)
+        self.buffered_rows += table.num_rows
+        self.total_rows += table.num_rows
+        if self.buffered_rows > self.max_rows:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+
+        path = self.directory / f"matched_{len(self.fragments):05d}.parquet"
+        pq.write_table(pa.concat_tables(self.buffer), path)
+        self.fragments.append(str(path))
+        self.buffer = []
+        self.buffered_rows = 0
+
+
+def _doi_keys(batch):
+    """Normalized DOIs of a batch of OpenAlex works: `doi_stz`, or `stz_doi(doi)` where it is missing."""
+    if "doi_stz" not in batch.schema.names:
+        return stz_doi_batch(batch.column("doi"))
+
+    doi_stz = batch.column("doi_stz").cast(pa.string())
+    missing = pc.is_null(doi_stz)
+    if not pc.any(missing).as_py():
+        return doi_stz
+
+    # Only the rows without `doi_stz` are normalized
+    normalized = stz_doi_batch(batch.column("doi").filter(missing))
+    return pc.replace_with_mask(doi_stz, missing, normalized)
+
+
+def integrate_scielo_openalex(scl_docs, oa_parquet_dir, output_file, start_year=None, end_year=None, work_dir=None, max_buffered_rows=SIDE_STORE_MAX_ROWS, individual_works_json=False):
+    """
+    Single-pass Integration
+    -----------------------
+    Fuses match_scielo_with_openalex and generate_merged_parquet into one scan of the OpenAlex dataset
+    (listed and schema-unified once):
+    - the SciELO DOI table is held in memory and each batch is probed against it;
+    - works whose DOI matches no SciELO article are written right away;
+    - matched works go to a bounded side store (spilled to Parquet in work_dir), because a group is only complete
+      at the end of the scan (any later row may carry one of its DOIs);
+    - after the scan, the side store is aggregated by SciELO article and its rows are consolidated, in read order,
+      exactly as in generate_merged_parquet; SciELO articles without matches come last.
+    The output holds the same rows as the two-pass integration (in another order) as long as each work ID appears
+    once in the dataset, as written by extract-oa: only the works of the match year range (default: 2018 up to the
+    current year) are matched, and only the years given prune the output. Returns the consolidated SciELO articles,
+    as match_scielo_with_openalex.
+    """
+    match_start_year, match_end_year = _match_year_range(start_year, end_year)
+
+    output_file = Path(output_file)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+
+    scl_dois = _get_scl_doi_table(scl_docs)
+    logger.info(f"Mapped {scl_dois.num_rows} unique DOIs from {len(scl_docs)} SciELO articles.")
+
+    parquet_files = _discover_openalex_files(oa_parquet_dir, start_year, end_year)
+    unified_schema = _unify_openalex_schema(parquet_files)
+    new_schema = _merged_schema(unified_schema, individual_works_json)
+    columns_to_load, yearly_columns = _match_columns(unified_schema)
+
+    scanner = ds.dataset(parquet_files, format="parquet", schema=unified_schema).scanner(
+        columns=unified_schema.names,
+        filter=_year_filter(start_year, end_year),
+        batch_size=1_000_000,
+    )
+
+    no_members = pa.array([], type=pa.string())
+    no_groups = np.zeros(0, dtype=np.int64)
+    empty_groups = _finish_groups(_build_survivor_table([], unified_schema)[2], new_schema)
+
+    with tempfile.TemporaryDirectory(dir=work_dir, prefix="oca_integrate_") as tmp_dir:
+        store = _MatchedRowStore(tmp_dir, max_buffered_rows)
+        writer = pq.ParquetWriter(output_file, new_schema)
+        try:
+            for batch in tqdm(scanner.to_batches(), desc="Integrating OpenAlex", unit="batch"):
+                if not batch.num_rows:
+                    continue
+
+                pos = pc.index_in(_doi_keys(batch), value_set=scl_dois["doi"])
+                year = batch.column("publication_year")
+                in_match_range = pc.and_(pc.greater_equal(year, match_start_year), pc.less_equal(year, match_end_year))
+                matched = pc.and_(pc.is_valid(pos), pc.fill_null(in_match_range, False))
+
+                unmatched = batch.filter(pc.invert(matched))
+                if unmatched.num_rows:
+                    writer.write_table(_consolidate_batch(unmatched, no_members, no_groups, empty_groups, np.zeros(0, dtype=bool), new_schema))
+
+                matched_rows = pa.Table.from_batches([batch.filter(matched)])
+                if matched_rows.num_rows:
+                    seq = np.arange(store.total_rows, store.total_rows + matched_rows.num_rows, dtype=np.int64)
+                    matched_rows = matched_rows.append_column("scl_idx", scl_dois["scl_idx"].take(pos.filter(matched)))
+                    store.add(matched_rows.append_column("_seq", pa.array(seq)))
+
+            store.flush()
+            logger.info(f"Buffered {store.total_rows} matched OpenAlex rows in {len(store.fragments)} side store fragments.")
+
+            con = duckdb.connect()
+            try:
+                if store.fragments:
+                    selected = ", ".join(f'"{c}"' for c in columns_to_load if c != "doi_stz")
+                    matches = con.execute(
+                        f"""
+                        SELECT scl_idx, {selected}
+                        FROM read_parquet(?)
+                        WHERE work_id IS NOT NULL AND work_id <> ''
+                        QUALIFY row_number() OVER (PARTITION BY scl_idx, work_id ORDER BY _seq DESC) = 1
+                        ORDER BY scl_idx, work_id
+                        """,
+                        [store.fragments],
+                    ).to_arrow_table()
+                else:
+                    matches = pa.table(
+                        [pa.array([], type=pa.int64())] + [pa.array([], type=unified_schema.field(c).type) for c in columns_to_load if c != "doi_stz"],
+                        names=["scl_idx"] + [c for c in columns_to_load if c != "doi_stz"],
+                    )
+
+                scl_oa_merged = _consolidate_scl_oa_results(scl_docs, matches, yearly_columns)
+                logger.info(f"Found {matches.num_rows} OpenAlex matches for {len(pc.unique(matches['scl_idx']))} SciELO articles.")
+
+                member_work_ids, member_groups, groups = _build_survivor_table(scl_oa_merged, unified_schema)
+                groups = _finish_groups(groups, new_schema)
+                emitted = np.zeros(groups.num_rows, dtype=bool)
+                if store.fragments:
+                    reader = con.execute(
+                        "SELECT * EXCLUDE (scl_idx, _seq) FROM read_parquet(?) ORDER BY _seq",
+                        [store.fragments],
+                    ).to_arrow_reader()
+                    for batch in reader:
+                        if batch.num_rows:
+                            batch = batch.cast(unified_schema)
+                            writer.write_table(_consolidate_batch(batch, member_work_ids, member_groups, groups, emitted, new_schema))
+
+            finally:
+                con.close()
+
+            _write_unmatched_scielo(writer, scl_oa_merged, new_schema, unified_schema)
+
+        finally:
+            writer.close()
+
+    logger.info(f"Merged dataset saved to {output_file}")
+    return scl_oa_merged
+
+
+UNMATCHED_SCIELO_FRAGMENT_NAME = "merged_scielo_unmatched.parquet"
+
+
+def _year_fragment_name(year, token=None):
+    return f"merged_{year}.parquet" if token is None else f"merged_{year}-{token}.parquet"
+
+
+def _unmatched_fragment_name(token=None):
+    if token is None:
+        return UNMATCHED_SCIELO_FRAGMENT_NAME
+
+    return UNMATCHED_SCIELO_FRAGMENT_NAME.replace(".parquet", f"-{token}.parquet")
+
+
+def _file_year_range(path, base_dir):
+    """
+    (min, max) publication year of an OpenAlex file: its partition year, or the bounds of the publication_year
+    statistics of its row groups. None when the statistics are missing, and (None, None) for a file without rows.
+    """
+    year = extract_partition_year(Path(path).relative_to(base_dir).parent)
+    if year is not None:
+        return year, year
+
+    metadata = pq.ParquetFile(path).metadata
+    names = [metadata.schema.column(i).path for i in range(metadata.num_columns)]
+    if "publication_year" not in names:
+        return None
+
+    lows, highs = [], []
+    for rg in range(metadata.num_row_groups):
+        if metadata.row_group(rg).num_rows == 0:
+            continue
+        stats = metadata.row_group(rg).column(names.index("publication_year")).statistics
+        if stats is None or not stats.has_min_max:
+            return None
+        lows.append(stats.min)
+        highs.append(stats.max)
+
+    return (min(lows), max(highs)) if lows else (None, None)
+
+
+def _files_by_year(oa_parquet_dir, parquet_files, start_year, end_year):
+    """
+    Assigns the OpenAlex files to the publication years they may hold, so that each year task only scans its own
+    files: a file in a `publication_year=YYYY` partition goes to its year, a file outside partitions to the years
+    covered by its publication_year statistics (to every year when it has none).
+    """
+    year_files = {y: [] for y in range(start_year, end_year + 1)}
+    unbounded = 0
+    for f in parquet_files:
+        bounds = _file_year_range(f, oa_parquet_dir)
+        if bounds is None:
+            low, high = start_year, end_year
+            unbounded += 1
+        elif bounds[0] is None:
+            continue
+        else:
+            low, high = max(bounds[0], start_year), min(bounds[1], end_year)
+
+        for y in range(low, high + 1):
+            year_files[y].append(str(f))
+
+    if unbounded:
+        logger.warning(f"{unbounded} OpenAlex files have no publication_year statistics; every year task scans them.")
+
+    return year_files
+
+
+def _match_year(parquet_files, scl_dois_path, columns_to_load, year):
+    """Worker: matches the SciELO DOIs against the OpenAlex works of one publication year."""
+    scl_dois = pq.read_table(scl_dois_path)
+    # The files of a single year may lack some yearly citation columns of the whole dataset
+    year_columns = _unify_openalex_schema(parquet_files).names
+    columns_to_load = [c for c in columns_to_load if c in year_columns]
+
+    return _match_openalex_works(parquet_files, scl_dois, columns_to_load, year, year, with_position=True)
+
+
+def _generate_year(parquet_files, state_dir, unified_schema, year, output_file, individual_works_json):
+    """Worker: writes the merged fragment of one publication year, emitting only the survivors assigned to it."""
+    state_dir = Path(state_dir)
+    members = pq.read_table(state_dir / "members.parquet")
+    groups = pq.read_table(state_dir / "groups.parquet")
+
+    emitted = pc.not_equal(groups["_emit_year"], year).to_numpy(zero_copy_only=False)
+    groups = groups.drop_columns(["_emit_year"])
+
+    return _write_merged_parquet(
+        parquet_files, output_file, unified_schema,
+        members["work_id"].combine_chunks(), members["group"].to_numpy(), groups,
+        None, year, year, individual_works_json, emitted=emitted,
+    )
+
+
+def _run_year_tasks(function, tasks, num_workers):
+    """Runs function over the task argument tuples, in a process pool when there are several workers."""
+    if num_workers <= 1 or len(tasks) <= 1:
+        return [function(*task) for task in tasks]
+
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        return list(executor.map(function, *zip(*tasks)))
+
+
+def _reconcile_year_matches(year_matches, parquet_files):
+    """
+    Cross-partition reconciliation of the per-year match tables: keeps the last row read of each (scl_idx, work_id)
+    as the single-process match does, and replaces the file names by their position in parquet_files.
+    """
+    matches = pa.concat_tables(year_matches, promote_options="permissive")
+    file_idx = pc.index_in(matches["_filename"], value_set=pa.array([str(f) for f in parquet_files]))
+    matches = matches.append_column("_file_idx", file_idx.cast(pa.int64()))
+
+    con = duckdb.connect()
+    try:
+        con.register("year_matches", matches)
+        return con.execute(
+            """
+            SELECT * EXCLUDE (_filename)
+            FROM year_matches
+            QUALIFY row_number() OVER (PARTITION BY scl_idx, work_id ORDER BY _filename DESC, _file_row_number DESC) = 1
+            ORDER BY scl_idx, work_id
+            """
+        ).to_arrow_table()
+
+    finally:
+        con.close()
+
+
+def _empty_year_matches(unified_schema, columns_to_load):
+    """Reconciled match table without rows, with the columns of _reconcile_year_matches."""
+    columns = [c for c in columns_to_load if c != "doi_stz"]
+    return pa.schema(
+        [pa.field("scl_idx", pa.int64())]
+        + [unified_schema.field(c) for c in columns]
+        + [pa.field("_file_row_number", pa.int64()), pa.field("_file_idx", pa.int64())]
+    ).empty_table()
+
+
+def _emit_years(matches, member_work_ids, member_groups, num_groups):
+    """
+    Publication year of the partition writing each survivor: the year of the first member row in the single-process
+    scan order (file, then row). Also returns the number of groups whose works span several years.
+    """
+    groups = member_groups[pc.index_in(matches["work_id"], value_set=member_work_ids).to_numpy(zero_copy_only=False).astype(np.int64)]
+    file_idx = matches["_file_idx"].to_numpy()
+    rows = matches["_file_row_number"].to_numpy()
+    years = matches["publication_year"].to_numpy()
+
+    order = np.lexsort((rows, file_idx, groups))
+    first_groups, first = np.unique(groups[order], return_index=True)
+    emit_years = np.full(num_groups, -1, dtype=np.int64)
+    emit_years[first_groups] = years[order][first]
+
+    group_years = np.unique(np.stack([groups, years]), axis=1)
+    spanning = int(np.count_nonzero(np.bincount(group_years[0], minlength=num_groups) > 1)) if len(groups) else 0
+
+    return emit_years, spanning
+
+
+def _save_parallel_manifest(output_dir, manifest):
+    manifest_path = Path(output_dir) / PARALLEL_MANIFEST_FILE_NAME
+    tmp_path = manifest_path.with_suffix(".json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    os.replace(tmp_path, manifest_path)
+
+
+def _fingerprint(payload):
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _files_fingerprint(parquet_files):
+    """Fingerprint of a list of OpenAlex files (path, size and modification time)."""
+    return _fingerprint([(str(f), os.stat(f).st_size, os.stat(f).st_mtime_ns) for f in sorted(parquet_files)])
+
+
+def _consolidation_fingerprints(years, matches, groups, emit_years):
+    """
+    Per year, a fingerprint of what its fragment takes from the other years: the consolidated records it emits and
+    the member works it holds (dropped unless they are the emitted row).
+    """
+    fingerprints = {}
+    for year in years:
+        emitted_here = groups.filter(pa.array(emit_years == year))
+        emitted_here = emitted_here.take(pc.sort_indices(pc.list_element(emitted_here["all_work_ids"], 0)))
+        members = pc.unique(matches.filter(pc.equal(matches["publication_year"], year))["work_id"]).to_pylist()
+
+        fingerprints[year] = _fingerprint([emitted_here.to_pylist(), sorted(members)])
+
+    return fingerprints
+
+
+def _cached_year_matches(state_dir, year, fingerprints):
+    """The match table cached for year in state_dir, if it was computed from inputs with the same fingerprints."""
+    cache_path = Path(state_dir) / f"matches_{year}.parquet"
+    if not cache_path.exists():
+        return None
+
+    metadata = pq.read_schema(cache_path).metadata or {}
+    if metadata.get(b"oca_fingerprints") != json.dumps(fingerprints, sort_keys=True).encode():
+        return None
+
+    return pq.read_table(cache_path).replace_schema_metadata(None)
+
+
+def _cache_year_matches(state_dir, year, fingerprints, matches):
+    cache_path = Path(state_dir) / f"matches_{year}.parquet"
+    tmp_path = cache_path.with_suffix(".parquet.tmp")
+    pq.write_table(matches.replace_schema_metadata({"oca_fingerprints": json.dumps(fingerprints, sort_keys=True)}), tmp_path)
+    os.replace(tmp_path, cache_path)
+
+
+def _remove_stale_fragments(output_dir, previous_manifest, manifest):
+    """Removes the fragments listed in previous_manifest that manifest no longer lists. Other files are left alone."""
+    listed = {fragment["path"] for fragment in manifest["fragments"]}
+    for fragment in previous_manifest.get("fragments", []):
+        if fragment["path"] not in listed:
+            (output_dir / fragment["path"]).unlink(missing_ok=True)
+
+
+def _remove_previous_fragments(output_dir):
+    manifest = load_parallel_manifest(output_dir)
+    if manifest is None:
+        return
+
+    for fragment in manifest.get("fragments", []):
+        (output_dir / fragment["path"]).unlink(missing_ok=True)
+    (output_dir / PARALLEL_MANIFEST_FILE_NAME).unlink()
+
+
+def integrate_scielo_parallel(scl_table, oa_parquet_dir, output_dir, start_year=None, end_year=None, num_workers=None, work_dir=None, individual_works_json=False, state_dir=None):
+    """
+    Parallel Year-partitioned Integration
+    -------------------------------------
+    integrate_scielo_columns split by OpenAlex publication year, in a process pool:
+    1. each year matches the SciELO DOI table against its works (the files of its `publication_year=YYYY`
+       partition, and the files outside partitions whose publication_year statistics cover it; see _files_by_year);
+    2. the per-year matches are reconciled in the main process: duplicates across years are resolved as in the
+       single-process match, the survivor table is built once (a SciELO group may hold works of several years), and
+       each survivor is assigned to the year of its first row in the single-process scan order;
+    3. each year writes its own fragment (`merged_YYYY.parquet`), consolidating the survivors assigned to it and
+       dropping the other member works; SciELO articles without matches go to `merged_scielo_unmatched.parquet`.
+    The manifest (`integration_manifest.json`) lists the fragments with their row counts. The fragments hold the same
+    rows as the single-process output, as long as each work ID appears once in the dataset. ParquetAdapter reads the
+    output directory. Returns the manifest.
+
+    With state_dir, the integration is incremental. The match table of each year is cached in state_dir and only
+    recomputed when its OpenAlex files (path, size and modification time) or the SciELO DOI table change. Each year
+    fragment records the fingerprints of its inputs: its OpenAlex files, the consolidated records it emits and the
+    member works it drops (which reflect the SciELO changes), and the output schema; it is only rewritten when one of
+    them changes. Rewritten fragments get new file names and the manifest is replaced atomically, so that
+    readers of the manifest see either the previous or the new dataset; the fragments of the previous manifest that
+    the new one no longer lists are removed afterwards.
+
+    The output only holds the works of the year range, which defaults to 2018 up to the current year.
+    """
+    if start_year is None or end_year is None:
+        start_year, end_year = _match_year_range(start_year, end_year)
+        logger.warning(f"The parallel integration writes one fragment per year: OpenAlex works outside {start_year}-{end_year} are not in the output.")
+    if num_workers is None:
+        num_workers = max(1, multiprocessing.cpu_count() - 2)
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    previous_manifest = {}
+    previous = {}
+    token = None
+    if state_dir is None:
+        _remove_previous_fragments(output_dir)
+    else:
+        state_dir = Path(state_dir)
+        state_dir.mkdir(parents=True, exist_ok=True)
+        previous_manifest = load_parallel_manifest(output_dir) or {}
+        previous = {f["publication_year"]: f for f in previous_manifest.get("fragments", []) if "fingerprints" in f}
+        token = os.urandom(4).hex()
+
+    parquet_files = _discover_openalex_files(oa_parquet_dir, start_year, end_year)
+    unified_schema = _unify_openalex_schema(parquet_files)
+    columns_to_load, yearly_columns = _match_columns(unified_schema)
+
+    year_files = _files_by_year(oa_parquet_dir, parquet_files, start_year, end_year)
+    years = [y for y, files in year_files.items() if files]
+
+    with tempfile.TemporaryDirectory(dir=work_dir, prefix="oca_integrate_parallel_") as tmp_dir:
+        tmp_path = Path(tmp_dir)
+
+        scl_dois = _scl_doi_table_from_columns(scl_table)
+        pq.write_table(scl_dois, tmp_path / "scl_dois.parquet")
+        logger.info(f"Mapped {scl_dois.num_rows} unique DOIs from {scl_table.num_rows} SciELO articles; matching {len(years)} years with {num_workers} workers.")
+
+        fingerprints = {}
+        cached = {}
+        if state_dir is not None:
+            scielo_fingerprint = _parquet_fingerprint(scl_dois)
+            schema_fingerprint = _fingerprint([unified_schema.to_string(), individual_works_json])
+            for y in years:
+                fingerprints[y] = {"openalex": _files_fingerprint(year_files[y]), "schema": schema_fingerprint}
+                year_matches = _cached_year_matches(state_dir, y, [fingerprints[y]["openalex"], scielo_fingerprint])
+                if year_matches is not None:
+                    cached[y] = year_matches
+
+        to_match = [y for y in years if y not in cached]
+        year_matches = dict(zip(to_match, _run_year_tasks(
+            _match_year,
+            [(year_files[y], str(tmp_path / "scl_dois.parquet"), columns_to_load, y) for y in to_match],
+            num_workers,
+        )))
+        if state_dir is not None:
+            logger.info(f"Matched {len(to_match)} years; reused the cached matches of {len(cached)}.")
+            for y in to_match:
+                _cache_year_matches(state_dir, y, [fingerprints[y]["openalex"], scielo_fingerprint], year_matches[y])
+        year_matches.update(cached)
+
+        if years:
+            matches = _reconcile_year_matches([year_matches[y] for y in years], parquet_files)
+        else:
+            logger.warning(f"No OpenAlex file covers the years {start_year}-{end_year}; only the SciELO articles are written.")
+            matches = _empty_year_matches(unified_schema, columns_to_load)
+        matched_articles = len(pc.unique(matches["scl_idx"]))
+        logger.info(f"Found {matches.num_rows} OpenAlex matches for {matched_articles} SciELO articles.")
+
+        position_columns = ["_file_idx", "_file_row_number"]
+        member_work_ids, member_groups, groups = _survivor_table_from_matches(
+            scl_table, matches.drop_columns(position_columns), unified_schema, yearly_columns,
+        )
+        emit_years, spanning = _emit_years(matches, member_work_ids, member_groups, groups.num_rows)
+        logger.info(f"{groups.num_rows} consolidated records, {spanning} of them with works in several years.")
+
+        rebuild = years
+        if state_dir is not None:
+            for y, fingerprint in _consolidation_fingerprints(years, matches, groups, emit_years).items():
+                fingerprints[y]["consolidation"] = fingerprint
+            rebuild = [
+                y for y in years
+                if y not in previous or previous[y]["fingerprints"] != fingerprints[y] or not (output_dir / previous[y]["path"]).exists()
+            ]
+            logger.info(f"Rebuilding the fragments of {len(rebuild)} of {len(years)} years.")
+
+        pq.write_table(pa.table({"work_id": member_work_ids, "group": pa.array(member_groups)}), tmp_path / "members.parquet")
+        pq.write_table(groups.append_column("_emit_year", pa.array(emit_years)), tmp_path / "groups.parquet")
+
+        row_counts = dict(zip(rebuild, _run_year_tasks(
+            _generate_year,
+            [(year_files[y], str(tmp_path), unified_schema, y, str(output_dir / _year_fragment_name(y, token)), individual_works_json) for y in rebuild],
+            num_workers,
+        )))
+
+    fragments = []
+    for y in years:
+        if y in row_counts:
+            fragment = {"path": _year_fragment_name(y, token), "publication_year": y, "rows": row_counts[y]}
+        else:
+            fragment = {key: previous[y][key] for key in ("path", "publication_year", "rows")}
+        if state_dir is not None:
+            fragment["fingerprints"] = fingerprints[y]
+        fragments.append(fragment)
+
+    new_schema = _merged_schema(unified_schema, individual_works_json)
+    unmatched = _unmatched_scielo_table(scl_table, matches["scl_idx"], new_schema)
+    pq.write_table(unmatched, output_dir / _unmatched_fragment_name(token))
+    fragments.append({"path": _unmatched_fragment_name(token), "publication_year": None, "rows": unmatched.num_rows})
+
+    manifest = {
+        "start_year": start_year,
+        "end_year": end_year,
+        "fragments": fragments,
+        "rows": sum(f["rows"] for f in fragments),
+        "scielo_articles": scl_table.num_rows,
+        "matched_articles": matched_articles,
+        "matches": matches.num_rows,
+        "cross_year_groups": spanning,
+        "rebuilt_years": rebuild,
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+    _save_parallel_manifest(output_dir, manifest)
+    if state_dir is not None:
+        _remove_stale_fragments(output_dir, previous_manifest, manifest)
+
+    logger.info(f"Merged dataset saved to {output_dir} ({len(fragments)} fragments, {manifest['rows']} rows)")
+    return manifest
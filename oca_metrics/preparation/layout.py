@@ -0,0 +1,246 @@
+"""
+Merged Parquet Layout
+---------------------
+
+`generate_merged_parquet` writes rows in scan order (and SciELO-only rows last), so the `publication_year = ? AND
+<level> = ?` filters of `ParquetAdapter` can rarely skip a row group. `write_clustered_layout` rewrites a merged
+Parquet with DuckDB, sorted by `CLUSTER_COLUMNS` (year, then the taxonomy levels from the broadest, then journal),
+so that each row group covers a narrow range of these columns:
+
+- row groups have `row_group_size` rows (DuckDB rounds it to a multiple of 2048), with min/max statistics for every column and bloom filters for the
+  dictionary-encoded ones (`BLOOM_FILTER_FALSE_POSITIVE_RATIO`), so that readers can skip them;
+- with `partition_by_year`, the output is a directory of `publication_year=YYYY/` partitions (read with hive
+  partitioning, as `ParquetAdapter` does for directories).
+
+The input is a merged Parquet file, a directory of Parquet files, or the output directory of the parallel
+integration, of which only the fragments listed in its manifest are read.
+
+`pruning_report` measures the layout: for every (year, category) filter the adapter issues at each taxonomy level,
+it counts the row groups whose min/max statistics cannot exclude the filter, i.e. the row groups a reader still has
+to scan (bloom filters, which can skip more, are not taken into account).
+"""
+
+from pathlib import Path
+
+import duckdb
+import logging
+import numpy as np
+import os
+import pyarrow.parquet as pq
+import shutil
+
+from oca_metrics.utils.constants import TAXONOMY_FIELDS
+from oca_metrics.utils.parquet import (
+    YEAR_PARTITION_PATTERN,
+    extract_partition_year,
+    list_manifest_fragments,
+    list_parquet_files,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+CLUSTER_COLUMNS = ("publication_year", *TAXONOMY_FIELDS, "journal_id")
+LAYOUT_ROW_GROUP_SIZE = 100_000
+BLOOM_FILTER_FALSE_POSITIVE_RATIO = 0.01
+
+
+def _parquet_files(path):
+    """The Parquet files of a merged Parquet file, of the fragments of a parallel integration manifest, or of a directory."""
+    if not Path(path).is_dir():
+        return [Path(path)]
+
+    fragments = list_manifest_fragments(path)
+    return fragments if fragments is not None else list_parquet_files(path)
+
+
+def _parquet_source(path):
+    """
+    DuckDB table function reading the Parquet files of path (see _parquet_files), and its parameters: the file list is
+    bound to `$files`, so that paths are never interpolated into SQL.
+    """
+    files = [str(f) for f in _parquet_files(path)]
+    if Path(path).is_dir():
+        return "read_parquet($files, union_by_name=true, hive_partitioning=true)", {"files": files}
+
+    return "read_parquet($files)", {"files": files}
+
+
+def _source_columns(con, source, params):
+    return [column[0] for column in con.execute(f"SELECT * FROM {source} LIMIT 0", params).description]
+
+
+def _is_layout_output(path):
+    """Whether the directory at path looks like an earlier partitioned layout output: only `publication_year=*` directories."""
+    return all(child.is_dir() and YEAR_PARTITION_PATTERN.match(child.name) for child in Path(path).iterdir())
+
+
+def _check_layout_output(input_path, output_path):
+    input_path = Path(input_path).resolve()
+    output_path = Path(output_path).resolve()
+    if output_path == input_path or output_path in input_path.parents:
+        raise ValueError(f"The layout output {output_path} is or contains its input {input_path}")
+
+    if output_path.is_dir() and not _is_layout_output(output_path):
+        raise ValueError(f"Refusing to replace {output_path}: it holds files other than publication_year=* partitions")
+
+
+def _swap_in(tmp_output, output_path):
+    """Replaces output_path with tmp_output; a previous output directory is moved aside first and then removed."""
+    if not output_path.is_dir():
+        os.replace(tmp_output, output_path)
+        return
+
+    previous = output_path.with_name(f".{output_path.name}.old-{os.urandom(4).hex()}")
+    os.replace(output_path, previous)
+    os.replace(tmp_output, output_path)
+    shutil.rmtree(previous)
+
+
+def write_clustered_layout(input_path, output_path, row_group_size=LAYOUT_ROW_GROUP_SIZE, partition_by_year=False, work_dir=None, memory_limit=None):
+    """
+    Rewrites the merged Parquet at input_path to output_path sorted by the `CLUSTER_COLUMNS` it has, in row groups
+    of row_group_size rows (a directory of year partitions with partition_by_year). Returns the number of rows.
+    The output is written next to output_path and swapped in once complete. An existing output directory is only
+    replaced when it looks like an earlier layout output (see _is_layout_output), and output_path can be neither
+    input_path nor contain it.
+    """
+    _check_layout_output(input_path, output_path)
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_output = output_path.with_name(f".{output_path.name}.tmp-{os.urandom(4).hex()}")
+
+    con = duckdb.connect()
+    try:
+        if work_dir:
+            con.execute("SET temp_directory = ?", [str(Path(work_dir) / "layout_spill")])
+        if memory_limit:
+            con.execute("SET memory_limit = ?", [memory_limit])
+
+        source, params = _parquet_source(input_path)
+        columns = _source_columns(con, source, params)
+        order = ", ".join(f'"{c}"' for c in CLUSTER_COLUMNS if c in columns)
+
+        options = [
+            "FORMAT parquet",
+            "COMPRESSION zstd",
+            f"ROW_GROUP_SIZE {int(row_group_size)}",
+            f"BLOOM_FILTER_FALSE_POSITIVE_RATIO {float(BLOOM_FILTER_FALSE_POSITIVE_RATIO)}",
+        ]
+        if partition_by_year:
+            options.append("PARTITION_BY (publication_year)")
+
+        total = con.execute(
+            f"COPY (SELECT * FROM {source}{f' ORDER BY {order} NULLS LAST' if order else ''}) TO $output ({', '.join(options)})",
+            {**params, "output": str(tmp_output)},
+        ).fetchone()[0]
+        _swap_in(tmp_output, output_path)
+
+    finally:
+        con.close()
+        if tmp_output.is_dir():
+            shutil.rmtree(tmp_output)
+        tmp_output.unlink(missing_ok=True)
+
+    logger.info(f"Wrote {total} rows clustered by ({', '.join(c for c in CLUSTER_COLUMNS if c in columns)}) to {output_path}")
+    return total
+
+
+def _row_group_bounds(path, columns):
+    """
+    Per row group of the Parquet file or directory at path: {column: (mins, maxs, known)} as arrays, known flagging
+    the row groups with statistics for the column. publication_year comes from the partition directory when it is
+    not stored.
+    """
+    files = _parquet_files(path)
+    bounds = {c: ([], []) for c in columns}
+    total_rows = 0
+
+    for file in files:
+        metadata = pq.ParquetFile(file).metadata
+        names = [metadata.schema.column(i).path for i in range(metadata.num_columns)]
+        partition_year = extract_partition_year(Path(file).relative_to(path).parent) if Path(path).is_dir() else None
+
+        for rg in range(metadata.num_row_groups):
+            row_group = metadata.row_group(rg)
+            total_rows += row_group.num_rows
+            for c in columns:
+                low = high = None
+                if c in names:
+                    stats = row_group.column(names.index(c)).statistics
+                    if stats is not None and stats.has_min_max:
+                        low, high = stats.min, stats.max
+                elif c == "publication_year":
+                    low = high = partition_year
+
+                bounds[c][0].append(low)
+                bounds[c][1].append(high)
+
+    arrays = {}
+    for c, (lows, highs) in bounds.items():
+        known = np.array([low is not None and high is not None for low, high in zip(lows, highs)], dtype=bool)
+        arrays[c] = (np.array(lows, dtype=object), np.array(highs, dtype=object), known)
+
+    return arrays, len(files), total_rows
+
+
+def _may_contain(lows, highs, known, value):
+    """Row groups whose min/max statistics do not exclude value (unknown bounds never exclude)."""
+    result = ~known
+    result[known] = (lows[known] <= value) & (highs[known] >= value)
+
+    return result
+
+
+def pruning_report(path, levels=TAXONOMY_FIELDS):
+    """
+    Row group pruning of the `publication_year = ? AND <level> = ?` filters of `ParquetAdapter` on the merged
+    Parquet file or directory at path. For each level, returns the number of (year, category) filters, the mean
+    number of row groups still read per filter and the fraction of row groups skipped.
+    """
+    con = duckdb.connect()
+    try:
+        source, params = _parquet_source(path)
+        columns = _source_columns(con, source, params)
+        levels = [level for level in levels if level in columns]
+        filters = {
+            level: con.execute(
+                f'SELECT DISTINCT publication_year, "{level}" FROM {source} WHERE publication_year IS NOT NULL AND "{level}" IS NOT NULL',
+                params,
+            ).fetchall()
+            for level in levels
+        }
+
+    finally:
+        con.close()
+
+    bounds, num_files, num_rows = _row_group_bounds(path, ["publication_year", *levels])
+    row_groups = len(bounds["publication_year"][0])
+    report = {"files": num_files, "rows": num_rows, "row_groups": row_groups, "levels": {}}
+
+    for level in levels:
+        year_matches = {}
+        read = 0
+        for year, category in filters[level]:
+            if year not in year_matches:
+                year_matches[year] = _may_contain(*bounds["publication_year"], year)
+            read += int(np.count_nonzero(year_matches[year] & _may_contain(*bounds[level], category)))
+
+        queries = len(filters[level])
+        report["levels"][level] = {
+            "queries": queries,
+            "row_groups_read_mean": read / queries if queries else 0.0,
+            "pruned_fraction": 1 - read / (queries * row_groups) if queries and row_groups else 0.0,
+        }
+
+    return report
+
+
+def log_pruning_report(report, label="Layout"):
+    logger.info(f"{label}: {report['rows']} rows in {report['row_groups']} row groups ({report['files']} files).")
+    for level, stats in report["levels"].items():
+        logger.info(
+            f"{label}: {stats['queries']} year/{level} filters read {stats['row_groups_read_mean']:.1f} row groups on average "
+            f"({stats['pruned_fraction']:.1%} pruned)."
+        )
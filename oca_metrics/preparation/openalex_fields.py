@@ -0,0 +1,326 @@
+"""
+OpenAlex Extraction Field Spec
+------------------------------
+
+The columns written by `extract-oa` are declared in `OPENALEX_FIELDS` instead of being hard-coded in the
+hot loop of `process_chunk`. Each `FieldSpec` names an output column and describes how to obtain it:
+
+- `path`: dotted JSON path starting at one of three roots:
+  - `work`: the OpenAlex work itself (e.g., `work.doi`);
+  - `journal`: the journal source selected for the work (primary location or first journal location);
+  - `topic`: the work's primary topic (e.g., `topic.domain.display_name`).
+- `type`: output type (`string`, `int`, `float` or `bool`), used for the Arrow schema and the decoding schema.
+- `default`: value used when the last key of the path is missing.
+- `derive`: Python expression computing the column. It can reference `value` (the value at `path`),
+  `pub_year`, `counts` (yearly citation counts as `{year: cited_by_count}`), previously declared columns
+  and the helpers in `DERIVE_HELPERS`.
+- `yearly`: expands the column once per citation year, with `{year}` in the name and `year` available to `derive`.
+
+`compile_extractor` turns a spec into a specialized Python function (generated once, so new columns add no
+per-line interpretation overhead), the matching Arrow schema and, when msgspec is installed, a decoder that
+only reads the JSON paths used by the spec.
+"""
+
+from typing import (
+    Any,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    TypedDict,
+)
+
+import datetime
+import functools
+import keyword
+import pyarrow as pa
+
+from oca_metrics.utils.constants import YEARLY_CITATIONS_FIRST_YEAR
+from oca_metrics.utils.normalization import (
+    stz_doi,
+    stz_title,
+)
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+ROOTS = ("work", "journal", "topic")
+RESERVED_NAMES = {"pub_year", "counts", "value", "year", "counts_by_year"}
+
+ARROW_TYPES = {
+    "string": pa.string(),
+    "int": pa.int64(),
+    "float": pa.float64(),
+    "bool": pa.bool_(),
+}
+
+PYTHON_TYPES = {
+    "string": str,
+    "int": int,
+    "float": float,
+    "bool": bool,
+}
+
+
+class FieldSpec(NamedTuple):
+    name: str
+    path: Optional[str] = None
+    type: str = "string"
+    default: Any = None
+    derive: Optional[str] = None
+    yearly: bool = False
+
+
+def counts_by_year(src: Dict[str, Any]) -> Dict[int, Any]:
+    counts = {}
+    entries = src.get("counts_by_year", [])
+    if isinstance(entries, list):
+        for cy in entries:
+            y = cy.get("year")
+            if not y:
+                continue
+
+            counts[y] = cy.get("cited_by_count", 0)
+
+    return counts
+
+
+def citation_window(counts: Dict[int, Any], pub_year: int, window: int) -> int:
+    """Sums citations received in the `window` years after the publication year."""
+    total = 0
+    for y, tot in counts.items():
+        if pub_year < y <= pub_year + window:
+            total += tot
+
+    return total
+
+
+DERIVE_HELPERS = {
+    "citation_window": citation_window,
+    "stz_doi": stz_doi,
+    "stz_title": stz_title,
+}
+
+
+OPENALEX_FIELDS = (
+    FieldSpec("work_id", "work.id"),
+    FieldSpec("publication_year", "work.publication_year", "int"),
+    FieldSpec("language", "work.language"),
+    FieldSpec("doi", "work.doi"),
+    FieldSpec("doi_stz", "work.doi", derive="stz_doi(value)"),
+    FieldSpec("title_stz", "work.title", derive="stz_title(value) or None"),
+    FieldSpec("journal_id", "journal.id"),
+    FieldSpec("journal_issn_l", "journal.issn_l"),
+    FieldSpec("is_journal_oa", "journal.is_oa", "int", derive="int(bool(value)) if value is not None else 0"),
+    FieldSpec("domain", "topic.domain.display_name"),
+    FieldSpec("field", "topic.field.display_name"),
+    FieldSpec("subfield", "topic.subfield.display_name"),
+    FieldSpec("topic", "topic.display_name"),
+    FieldSpec("topic_score", "topic.score", "float"),
+    FieldSpec("citations_total", "work.cited_by_count", "int", default=0),
+    FieldSpec("citations_{year}", type="int", derive="counts.get(year)", yearly=True),
+    FieldSpec("citations_window_2y", type="int", derive="citation_window(counts, pub_year, 2)"),
+    FieldSpec("citations_window_3y", type="int", derive="citation_window(counts, pub_year, 3)"),
+    FieldSpec("citations_window_5y", type="int", derive="citation_window(counts, pub_year, 5)"),
+    FieldSpec("has_citation_window_2y", type="int", derive="1 if citations_window_2y > 0 else 0"),
+    FieldSpec("has_citation_window_3y", type="int", derive="1 if citations_window_3y > 0 else 0"),
+    FieldSpec("has_citation_window_5y", type="int", derive="1 if citations_window_5y > 0 else 0"),
+)
+
+
+# Fields read by process_chunk itself to filter works and select the journal and topic roots
+_FILTER_PATHS = {
+    "work": {
+        "type": "string",
+        "is_xpac": "bool",
+        "publication_year": "int",
+        "counts_by_year": "counts",
+    },
+    "journal": {
+        "type": "string",
+    },
+    "topic": {},
+}
+
+
+class _ExpandedField(NamedTuple):
+    spec: FieldSpec
+    year: Optional[int] = None
+
+
+class CompiledExtractor(NamedTuple):
+    columns: List[str]
+    schema: pa.Schema
+    extract: Any
+    coerce: Any
+    work_type: Any
+    decoder: Any
+
+
+def _expand_fields(fields: Sequence[FieldSpec], first_year: int, last_year: int) -> List[_ExpandedField]:
+    expanded = []
+    for f in fields:
+        if f.type not in ARROW_TYPES:
+            raise ValueError(f"Unsupported type for column {f.name}: {f.type}")
+
+        if f.path is not None and f.path.split(".")[0] not in ROOTS:
+            raise ValueError(f"Path of column {f.name} must start with one of {ROOTS}: {f.path}")
+
+        if not f.yearly:
+            expanded.append(_ExpandedField(f))
+            continue
+
+        for year in range(first_year, last_year + 1):
+            expanded.append(_ExpandedField(f._replace(name=f.name.format(year=year), yearly=False), year))
+
+    names = set()
+    for f, _ in expanded:
+        if (
+            not f.name.isidentifier()
+            or f.name.startswith("_")
+            or keyword.iskeyword(f.name)
+            or f.name in RESERVED_NAMES
+            or f.name in DERIVE_HELPERS
+        ):
+            raise ValueError(f"Invalid column name: {f.name}")
+
+        if f.name in names:
+            raise ValueError(f"Duplicate column name: {f.name}")
+
+        names.add(f.name)
+
+    return expanded
+
+
+def _path_expr(path: str, default: Any) -> str:
+    root, *keys = path.split(".")
+    expr = f"_{root}"
+    for i, key in enumerate(keys):
+        if i < len(keys) - 1:
+            expr = f"({expr}.get({key!r}) or {{}})"
+        elif default is None:
+            expr = f"{expr}.get({key!r})"
+        else:
+            expr = f"{expr}.get({key!r}, {default!r})"
+
+    return expr
+
+
+def _generate_source(fields: List[_ExpandedField]) -> str:
+    uses_counts = any(f.derive and "counts" in f.derive for f, _ in fields)
+
+    lines = ["def extract(_work, _journal, _topic, pub_year):"]
+    if uses_counts:
+        lines.append("    counts = counts_by_year(_work)")
+
+    for f, year in fields:
+        if year is not None:
+            lines.append(f"    year = {year}")
+
+        if f.path is not None and f.derive:
+            lines.append(f"    value = {_path_expr(f.path, f.default)}")
+            lines.append(f"    {f.name} = {f.derive}")
+        elif f.path is not None:
+            lines.append(f"    {f.name} = {_path_expr(f.path, f.default)}")
+        elif f.derive:
+            lines.append(f"    {f.name} = {f.derive}")
+        else:
+            lines.append(f"    {f.name} = {f.default!r}")
+
+    lines.append("    return {" + ", ".join(f"{f.name!r}: {f.name}" for f, _ in fields) + "}")
+    return "\n".join(lines)
+
+
+def _coerce_value(value: Any, py_type: type) -> Any:
+    if value is None or isinstance(value, py_type):
+        return value
+
+    try:
+        return py_type(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _build_coerce(fields: List[_ExpandedField]):
+    """Builds a function that casts path-based values to their declared types (used for lines not decoded with the typed schema)."""
+    checks = [(f.name, PYTHON_TYPES[f.type]) for f, _ in fields if f.path is not None and not f.derive]
+
+    def coerce(row):
+        for name, py_type in checks:
+            row[name] = _coerce_value(row[name], py_type)
+        return row
+
+    return coerce
+
+
+def _build_work_type(fields: List[_ExpandedField]):
+    """Builds the nested TypedDict describing the subset of an OpenAlex work read by the extractor."""
+    tree = {root: dict(paths) for root, paths in _FILTER_PATHS.items()}
+    for f, _ in fields:
+        if f.path is None:
+            continue
+
+        root, *keys = f.path.split(".")
+        node = tree[root]
+        for key in keys[:-1]:
+            node = node.setdefault(key, {})
+            if not isinstance(node, dict):
+                raise ValueError(f"Conflicting path for column {f.name}: {f.path}")
+
+        if isinstance(node.get(keys[-1]), dict):
+            raise ValueError(f"Conflicting path for column {f.name}: {f.path}")
+
+        # Derived columns transform the raw JSON value, so its type is not constrained
+        node[keys[-1]] = "any" if f.derive else f.type
+
+    counter = iter(range(1_000_000))
+
+    def to_type(node):
+        if node == "counts":
+            year_count = TypedDict("_YearCount", {"year": Optional[int], "cited_by_count": Optional[int]}, total=False)
+            return Optional[List[year_count]]
+
+        if node == "any":
+            return Any
+
+        if isinstance(node, str):
+            return Optional[PYTHON_TYPES[node]]
+
+        return Optional[TypedDict(f"_Node{next(counter)}", {k: to_type(v) for k, v in node.items()}, total=False)]
+
+    source = TypedDict("_Source", {k: to_type(v) for k, v in tree["journal"].items()}, total=False)
+    location = TypedDict("_Location", {"source": Optional[source]}, total=False)
+    work_fields = {k: to_type(v) for k, v in tree["work"].items()}
+    work_fields["primary_location"] = Optional[location]
+    work_fields["locations"] = Optional[List[Optional[location]]]
+    work_fields["primary_topic"] = to_type(tree["topic"])
+
+    return TypedDict("_Work", work_fields, total=False)
+
+
+@functools.lru_cache(maxsize=None)
+def compile_extractor(fields: Sequence[FieldSpec] = OPENALEX_FIELDS, first_year: int = YEARLY_CITATIONS_FIRST_YEAR, last_year: Optional[int] = None) -> CompiledExtractor:
+    """Compiles a field spec into an extractor function, its Arrow schema and its decoding schema."""
+    if last_year is None:
+        last_year = datetime.datetime.now().year
+
+    expanded = _expand_fields(fields, first_year, last_year)
+
+    namespace = {"counts_by_year": counts_by_year, **DERIVE_HELPERS}
+    exec(compile(_generate_source(expanded), "<openalex_extractor>", "exec"), namespace)
+
+    schema = pa.schema([pa.field(f.name, ARROW_TYPES[f.type]) for f, _ in expanded])
+    work_type = _build_work_type(expanded)
+
+    return CompiledExtractor(
+        columns=[f.name for f, _ in expanded],
+        schema=schema,
+        extract=namespace["extract"],
+        coerce=_build_coerce(expanded),
+        work_type=work_type,
+        decoder=msgspec.json.Decoder(work_type) if msgspec is not None else None,
+    )
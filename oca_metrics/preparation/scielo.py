@@ -2,7 +2,7 @@
 SciELO Document Merging Strategies
 ---------------------------------
 
-This module provides three configurable strategies for merging SciELO article records that may represent the same underlying article published in multiple forms or with slight metadata variations. The strategies can be enabled or disabled when calling `merge_scielo_documents`.
+This module provides configurable strategies for merging SciELO article records that may represent the same underlying article published in multiple forms or with slight metadata variations. The strategies can be enabled or disabled when calling `merge_scielo_documents`.
 
 1. DOI-based Merge (merge_by_doi):
    - Articles are considered for merging if they share the same DOI (including any language-variant DOIs).
@@ -23,20 +23,40 @@ This module provides three configurable strategies for merging SciELO article re
    - The journals must match, either by having at least one ISSN in common or by having the same normalized journal title.
    - If all these conditions are met, the articles are merged.
 
+4. Fuzzy Title-based Merge (merge_by_fuzzy_title, optional `fuzzy_title` strategy):
+   - Articles are considered for merging if their normalized titles are near-duplicates (typos, truncation, punctuation differences).
+   - Candidate title pairs come from MinHash signatures of character shingles with LSH banding, and are kept when their estimated similarity is at least 0.8.
+   - As in the title-based merge, the articles must have the same publication year and the same journal.
+
 These strategies are applied in sequence and can be enabled or disabled via the `strategies` parameter in `merge_scielo_documents`. This modular approach allows for flexible and robust deduplication and consolidation of SciELO article metadata.
+
+Instead of comparing every pair of a bucket, each strategy sub-groups the bucket by the keys its conditions require (title; publication year, journal key and title; publication year and journal key) and links each sub-group in a single pass. The links are resolved with a union-find over NumPy arrays, so the merge runs in near-linear time and yields the same groups as the pairwise comparison.
 """
 
-from collections import defaultdict
-from itertools import combinations
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations, islice
 from pathlib import Path
+from pymongo import MongoClient
 from tqdm import tqdm
 from xylose.scielodocument import Article
 
+import ast
 import bson
 import datetime
 import json
 import logging
-
+import multiprocessing
+import numpy as np
+import orjson
+import os
+import zlib
+
+from oca_metrics.preparation.articlemeta import (
+    RECORD_FIELDS,
+    diff_docs,
+    extract_article_doc,
+)
 from oca_metrics.utils.normalization import (
     extract_year,
     stz_doi,
@@ -81,90 +101,425 @@ def transform_article_to_doc(a, pub_year):
     
     return doc_data
 
-def load_raw_scl(path, start_year=2018, end_year=None):
-    if end_year is None:
-        end_year = datetime.datetime.now().year
+MIN_CHUNK_BYTES = 8 * 1024 * 1024
+MIN_CHUNK_RECORDS = 10_000
+MONGO_BATCH_SIZE = 1_000
+IN_FLIGHT_CHUNKS_PER_CORE = 2
+
+EXTRACTORS = ("direct", "xylose", "parity")
+
+
+def _parse_article_field(value):
+    """
+    Parses the 'article' field that some dumps store as the string representation of a dict.
+    JSON is tried first (fast path); Python literals are parsed safely with ast.literal_eval instead of eval.
+    """
+    try:
+        return orjson.loads(value)
+    except orjson.JSONDecodeError:
+        return ast.literal_eval(value)
+
+def _transform_with_xylose(record, pub_year):
+    a = Article(record)
+    try:
+        if not a.doi_and_lang and not a.doi:
+            return None
+
+    except Exception:
+        return None
+
+    return transform_article_to_doc(a, pub_year)
+
+def _transform_record(record, pub_year, extractor="direct"):
+    """
+    Transforms an ArticleMeta record with the selected extractor:
+    - `direct`: reads the raw fields (`extract_article_doc`);
+    - `xylose`: goes through xylose `Article` (`transform_article_to_doc`);
+    - `parity`: runs both, logs the fields where they disagree and keeps the xylose output.
+    """
+    if extractor == "direct":
+        return extract_article_doc(record, pub_year)
+
+    if extractor == "xylose":
+        return _transform_with_xylose(record, pub_year)
+
+    doc = _transform_with_xylose(record, pub_year)
+    try:
+        diff = diff_docs(extract_article_doc(record, pub_year), doc)
+    except Exception as e:
+        diff = {"error": (repr(e), None)}
+
+    if diff:
+        pid = (record.get("article") or {}).get("v880", [{}])[0].get("_")
+        logger.warning(f"Extractor mismatch for {pid}: {diff}")
+
+    return doc
+
+def _split_jsonl_ranges(path, chunk_bytes):
+    """Splits a JSONL file into (start, end) byte ranges aligned to line boundaries."""
+    size = os.path.getsize(path)
+    boundaries = [0]
+    with open(path, "rb") as f:
+        offset = chunk_bytes
+        while offset < size:
+            f.seek(offset)
+            f.readline()
+            boundary = f.tell()
+            if boundary >= size:
+                break
+
+            if boundary > boundaries[-1]:
+                boundaries.append(boundary)
+            offset = boundary + chunk_bytes
+
+    boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+def _split_bson_ranges(path, chunk_bytes):
+    """Splits a BSON file into (start, end) byte ranges aligned to document boundaries, reading only the length headers."""
+    size = os.path.getsize(path)
+    ranges = []
+    start = pos = 0
+    with open(path, "rb") as f:
+        while pos < size:
+            f.seek(pos)
+            header = f.read(4)
+            if len(header) < 4:
+                break
+
+            pos += int.from_bytes(header, "little")
+            if pos - start >= chunk_bytes:
+                ranges.append((start, pos))
+                start = pos
+
+    if pos > start:
+        ranges.append((start, pos))
+
+    return ranges
+
+def _load_jsonl_range(path, start, end, start_year, end_year, extractor="direct"):
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
 
     docs = []
-    with open(path) as fin:
-        for line in tqdm(fin, desc="Loading SciELO JSONL", unit="line"):
-            j_evaluated = json.loads(line)
+    for line in data.splitlines():
+        if not line.strip():
+            continue
 
-            pub_year = int(j_evaluated.get("publication_year"))
-            if pub_year < start_year or pub_year > end_year:
-                continue
+        record = orjson.loads(line)
+
+        pub_year = extract_year(record.get("publication_year"))
+        if not pub_year or pub_year < start_year or pub_year > end_year:
+            continue
+
+        # Fix 'article' field which often comes as string representation in some dumps
+        if isinstance(record.get("article"), str):
+            record["article"] = _parse_article_field(record["article"])
+
+        doc = _transform_record(record, pub_year, extractor)
+        if doc is not None:
+            docs.append(doc)
+
+    return docs
+
+def _load_bson_range(path, start, end, start_year, end_year, extractor="direct"):
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    docs = []
+    for record in bson.decode_iter(data):
+        pub_year = extract_year(record.get("publication_year"))
+        if not pub_year or pub_year < start_year or pub_year > end_year:
+            continue
 
-            # Fix 'article' field which often comes as string representation in some dumps
-            if isinstance(j_evaluated.get("article"), str):
-                j_evaluated["article"] = eval(j_evaluated["article"])
-            
-            a = Article(j_evaluated)
-            
-            try:
-                if not a.doi_and_lang and not a.doi:
-                    continue
-
-            except Exception:
+        doc = _transform_record(record, pub_year, extractor)
+        if doc is not None:
+            docs.append(doc)
+
+    return docs
+
+def _iter_loaded_chunks(load_range, path, ranges, start_year, end_year, num_cores, desc, extractor="direct"):
+    """
+    Yields the transformed documents of each byte range, in file order. At most IN_FLIGHT_CHUNKS_PER_CORE ranges per
+    worker are loading or waiting to be consumed, so a slow consumer does not pile the whole dump up in memory.
+    """
+    pbar = tqdm(total=len(ranges), desc=desc, unit="chunk")
+    if num_cores <= 1 or len(ranges) <= 1:
+        for start, end in ranges:
+            yield load_range(path, start, end, start_year, end_year, extractor)
+            pbar.update(1)
+
+    else:
+        pending = deque()
+        next_ranges = iter(ranges)
+        with ProcessPoolExecutor(max_workers=num_cores) as executor:
+            for start, end in islice(next_ranges, num_cores * IN_FLIGHT_CHUNKS_PER_CORE):
+                pending.append(executor.submit(load_range, path, start, end, start_year, end_year, extractor))
+
+            while pending:
+                chunk_docs = pending.popleft().result()
+                for start, end in islice(next_ranges, 1):
+                    pending.append(executor.submit(load_range, path, start, end, start_year, end_year, extractor))
+
+                yield chunk_docs
+                pbar.update(1)
+
+    pbar.close()
+
+def _mongo_year_query(start_year, end_year):
+    """Server-side publication year filter; ArticleMeta stores the year as a string, but integers are accepted too."""
+    years = list(range(start_year, end_year + 1))
+    return {"publication_year": {"$in": [str(y) for y in years] + years}}
+
+def _mongo_projection(extractor):
+    """Only the fields read by the direct extractor; xylose needs the whole record."""
+    if extractor != "direct":
+        return None
+
+    return {field: 1 for field in RECORD_FIELDS}
+
+def _split_mongo_ranges(collection, chunk_records):
+    """
+    Splits the collection into (lower, upper) `_id` ranges of about chunk_records records each (None means
+    unbounded). The scan has no filter and only projects and sorts `_id`, so it is covered by the `_id` index;
+    the year filter is applied by each range's query (see _load_mongo_range).
+    """
+    boundaries = []
+    cursor = collection.find({}, {"_id": 1}, batch_size=10 * MONGO_BATCH_SIZE).sort("_id", 1)
+    for i, record in enumerate(cursor):
+        if i and i % chunk_records == 0:
+            boundaries.append(record["_id"])
+
+    bounds = [None] + boundaries + [None]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def _open_mongo_collection(source):
+    """source is a collection (in-process reads) or a (uri, database, collection) tuple opened by the worker."""
+    if not isinstance(source, tuple):
+        return source, None
+
+    uri, database, collection = source
+    client = MongoClient(uri)
+    db = client[database] if database else client.get_default_database()
+    return db[collection], client
+
+def _load_mongo_range(source, lower, upper, start_year, end_year, extractor="direct"):
+    collection, client = _open_mongo_collection(source)
+
+    query = _mongo_year_query(start_year, end_year)
+    id_range = {}
+    if lower is not None:
+        id_range["$gte"] = lower
+    if upper is not None:
+        id_range["$lt"] = upper
+    if id_range:
+        query["_id"] = id_range
+
+    docs = []
+    try:
+        for record in collection.find(query, _mongo_projection(extractor), batch_size=MONGO_BATCH_SIZE).sort("_id", 1):
+            pub_year = extract_year(record.get("publication_year"))
+            if not pub_year or pub_year < start_year or pub_year > end_year:
                 continue
 
-            docs.append(transform_article_to_doc(a, pub_year))
+            doc = _transform_record(record, pub_year, extractor)
+            if doc is not None:
+                docs.append(doc)
+
+    finally:
+        if client is not None:
+            client.close()
 
     return docs
 
-def load_bson_scl(path, start_year=2018, end_year=None):
+def _chunk_bytes(path, num_cores):
+    return max(MIN_CHUNK_BYTES, os.path.getsize(path) // (num_cores * 4))
+
+def _resolve_num_cores(num_cores):
+    if num_cores is None:
+        return max(1, multiprocessing.cpu_count() - 2)
+
+    return max(1, num_cores)
+
+def iter_raw_scl(path, start_year=2018, end_year=None, num_cores=None, extractor="direct"):
+    """Yields lists of SciELO documents from an ArticleMeta JSONL dump, one per byte range, in file order."""
+    if extractor not in EXTRACTORS:
+        raise ValueError(f"Unknown extractor: {extractor}. Expected one of {EXTRACTORS}")
+
+    if end_year is None:
+        end_year = datetime.datetime.now().year
+
+    num_cores = _resolve_num_cores(num_cores)
+    ranges = _split_jsonl_ranges(path, _chunk_bytes(path, num_cores))
+
+    yield from _iter_loaded_chunks(_load_jsonl_range, path, ranges, start_year, end_year, num_cores, "Loading SciELO JSONL", extractor)
+
+def iter_bson_scl(path, start_year=2018, end_year=None, num_cores=None, extractor="direct"):
+    """Yields lists of SciELO documents from an ArticleMeta BSON dump, one per byte range, in file order."""
+    if extractor not in EXTRACTORS:
+        raise ValueError(f"Unknown extractor: {extractor}. Expected one of {EXTRACTORS}")
+
     if end_year is None:
         end_year = datetime.datetime.now().year
 
+    num_cores = _resolve_num_cores(num_cores)
+    ranges = _split_bson_ranges(path, _chunk_bytes(path, num_cores))
+
+    yield from _iter_loaded_chunks(_load_bson_range, path, ranges, start_year, end_year, num_cores, "Loading SciELO BSON", extractor)
+
+def iter_mongo_scl(uri=None, collection="articles", database=None, start_year=2018, end_year=None, num_cores=None, extractor="direct", mongo_collection=None):
+    """
+    Yields lists of SciELO documents read directly from an ArticleMeta MongoDB collection, one per `_id` range, in `_id` order.
+    The year filter and the field projection run on the server, and each worker process reads its ranges with its own client.
+    mongo_collection (a pymongo collection or a stand-in with the same `find` interface) is read in-process instead of uri.
+    """
+    if extractor not in EXTRACTORS:
+        raise ValueError(f"Unknown extractor: {extractor}. Expected one of {EXTRACTORS}")
+
+    if end_year is None:
+        end_year = datetime.datetime.now().year
+
+    num_cores = _resolve_num_cores(num_cores)
+    source = mongo_collection if mongo_collection is not None else (uri, database, collection)
+
+    split_collection, client = _open_mongo_collection(source)
+    try:
+        chunk_records = max(MIN_CHUNK_RECORDS, split_collection.count_documents({}) // (num_cores * 4))
+        ranges = _split_mongo_ranges(split_collection, chunk_records)
+    finally:
+        if client is not None:
+            client.close()
+
+    if mongo_collection is not None:
+        num_cores = 1
+
+    yield from _iter_loaded_chunks(_load_mongo_range, source, ranges, start_year, end_year, num_cores, "Loading SciELO MongoDB", extractor)
+
+def load_raw_scl(path, start_year=2018, end_year=None, num_cores=None, extractor="direct"):
+    """Loads SciELO documents from an ArticleMeta JSONL dump, parsing and transforming byte ranges in a process pool."""
     docs = []
-    with open(path, 'rb') as f:
-        for doc in tqdm(bson.decode_file_iter(f), desc="Loading SciELO BSON", unit="doc"):
-            pub_year = extract_year(doc.get("publication_year"))
-            if not pub_year or pub_year < start_year or pub_year > end_year:
-                continue
+    for chunk_docs in iter_raw_scl(path, start_year, end_year, num_cores, extractor):
+        docs.extend(chunk_docs)
 
-            a = Article(doc)
-            try:
-                if not a.doi_and_lang and not a.doi:
-                    continue
+    return docs
 
-            except Exception:
-                continue
+def load_bson_scl(path, start_year=2018, end_year=None, num_cores=None, extractor="direct"):
+    """Loads SciELO documents from an ArticleMeta BSON dump, parsing and transforming byte ranges in a process pool."""
+    docs = []
+    for chunk_docs in iter_bson_scl(path, start_year, end_year, num_cores, extractor):
+        docs.extend(chunk_docs)
+
+    return docs
 
-            docs.append(transform_article_to_doc(a, pub_year))
+def load_mongo_scl(uri=None, collection="articles", database=None, start_year=2018, end_year=None, num_cores=None, extractor="direct", mongo_collection=None):
+    """Loads SciELO documents from an ArticleMeta MongoDB collection, reading `_id` ranges with parallel cursors."""
+    docs = []
+    for chunk_docs in iter_mongo_scl(uri, collection, database, start_year, end_year, num_cores, extractor, mongo_collection):
+        docs.extend(chunk_docs)
 
     return docs
 
-def _merge_by_doi(docs, doi_to_indices, union, f_audit=None):
+GENERIC_TITLES = {"editorial", "errata", "introduction", "introduccion", "introducao",
+                  "prefacio", "preface", "lettertoeditor", "cartaoeditor", "comentario", "commentary"}
+MIN_TITLE_LENGTH = 15
+
+
+def _journal_keys(doc):
+    """Keys under which two documents are considered from the same journal: any common ISSN or the same non-empty title."""
+    keys = [("issn", issn) for issn in set(doc.get('journal_issns', []))]
+    if doc.get('journal_title'):
+        keys.append(("title", doc['journal_title']))
+
+    return keys
+
+def _link_by_key(keyed_indices, union):
+    """Links every index to the first index seen with the same key, so each sub-group is connected in a single pass."""
+    first_by_key = {}
+    for key, idx in keyed_indices:
+        first = first_by_key.setdefault(key, idx)
+        if first != idx:
+            union(first, idx)
+
+def _connected_components(n, edges_src, edges_dst):
+    """
+    Union-find over NumPy arrays (hook and compress).
+    Returns, for each index, the smallest index of its connected component.
+    """
+    labels = np.arange(n, dtype=np.int64)
+    src = np.asarray(edges_src, dtype=np.int64)
+    dst = np.asarray(edges_dst, dtype=np.int64)
+
+    while src.size:
+        root_src, root_dst = labels[src], labels[dst]
+        pending = root_src != root_dst
+        if not pending.any():
+            break
+
+        src, dst = src[pending], dst[pending]
+        root_src, root_dst = root_src[pending], root_dst[pending]
+
+        # Hook the larger root under the smaller one, then compress paths until every label is a root
+        np.minimum.at(labels, np.maximum(root_src, root_dst), np.minimum(root_src, root_dst))
+        while True:
+            compressed = labels[labels]
+            if np.array_equal(compressed, labels):
+                break
+
+            labels = compressed
+
+    return labels
+
+def _merge_by_doi(docs, doi_to_indices, union, f_audit=None, audit_pairs=False):
     """
     DOI-based Merge Strategy
     -----------------------
     Articles are considered for merging if they share the same DOI (including any language-variant DOIs).
     Additionally, the articles must have at least one normalized title in common (case-insensitive, accent-insensitive, whitespace removed).
     If both conditions are met, the articles are merged into a single record.
+
+    Within a DOI bucket, articles are sub-grouped by title, which links the same pairs as comparing every pair.
     """
     for doi, indices in doi_to_indices.items():
         if len(indices) < 2:
             continue
 
-        for i, j in combinations(indices, 2):
-            titles1 = set(docs[i].get('titles', []))
-            titles2 = set(docs[j].get('titles', []))
-            has_title_overlap = bool(titles1 & titles2)
+        title_groups = defaultdict(list)
+        for i in indices:
+            for t in set(docs[i].get('titles', [])):
+                title_groups[t].append(i)
+
+        for group in title_groups.values():
+            for idx in group[1:]:
+                union(group[0], idx)
 
-            if f_audit:
+        if not f_audit:
+            continue
+
+        if audit_pairs:
+            for i, j in combinations(indices, 2):
                 audit_entry = {
                     "doi": doi,
                     "pid1": docs[i].get("pid_v2"),
                     "pid2": docs[j].get("pid_v2"),
-                    "merged": has_title_overlap,
+                    "merged": bool(set(docs[i].get('titles', [])) & set(docs[j].get('titles', []))),
                     "reason": "doi_match"
                 }
                 f_audit.write(json.dumps(audit_entry) + "\n")
 
-            if has_title_overlap:
-                union(i, j)
-
-def _merge_by_pid(docs, pid_to_indices, find, union):
+        else:
+            merged = sorted({i for group in title_groups.values() if len(group) > 1 for i in group})
+            audit_entry = {
+                "doi": doi,
+                "pids": [docs[i].get("pid_v2") for i in indices],
+                "merged_pids": [docs[i].get("pid_v2") for i in merged],
+                "merged": bool(merged),
+                "reason": "doi_match"
+            }
+            f_audit.write(json.dumps(audit_entry) + "\n")
+
+def _merge_by_pid(docs, pid_to_indices, union):
     """
     PID-based Merge Strategy
     -----------------------
@@ -173,31 +528,24 @@ def _merge_by_pid(docs, pid_to_indices, find, union):
     The journals must match, either by having at least one ISSN in common or by having the same normalized journal title.
     The articles must have at least one normalized title in common.
     If all these conditions are met, the articles are merged.
+
+    Within a PID bucket, articles are sub-grouped by (publication year, journal key, title).
     """
     for pid, indices in pid_to_indices.items():
         if len(indices) < 2:
             continue
 
-        for i, j in combinations(indices, 2):
-            if find(i) == find(j):
-                continue
-
-            d1, d2 = docs[i], docs[j]
-            if d1.get('publication_year') != d2.get('publication_year'):
-                continue
-
-            issns1 = set(d1.get('journal_issns', []))
-            issns2 = set(d2.get('journal_issns', []))
-            same_journal = bool(issns1 & issns2) or (d1.get('journal_title') == d2.get('journal_title') and d1.get('journal_title'))
-            if not same_journal:
-                continue
-
-            if not (set(d1.get('titles', [])) & set(d2.get('titles', []))):
-                continue
-
-            union(i, j)
-
-def _merge_by_title(docs, title_to_indices, find, union):
+        _link_by_key(
+            (
+                ((docs[i].get('publication_year'), journal_key, t), i)
+                for i in indices
+                for journal_key in _journal_keys(docs[i])
+                for t in set(docs[i].get('titles', []))
+            ),
+            union,
+        )
+
+def _merge_by_title(docs, title_to_indices, union):
     """
     Title-based Merge Strategy
     -------------------------
@@ -206,57 +554,170 @@ def _merge_by_title(docs, title_to_indices, find, union):
     The articles must have the same publication year.
     The journals must match, either by having at least one ISSN in common or by having the same normalized journal title.
     If all these conditions are met, the articles are merged.
+
+    Within a title bucket, articles are sub-grouped by (publication year, journal key).
     """
-    generic_titles = {"editorial", "errata", "introduction", "introduccion", "introducao",
-                      "prefacio", "preface", "lettertoeditor", "cartaoeditor", "comentario", "commentary"}
     for title, indices in title_to_indices.items():
         if len(indices) < 2:
             continue
 
-        if title in generic_titles or len(title) < 15:
+        if title in GENERIC_TITLES or len(title) < MIN_TITLE_LENGTH:
             continue
 
-        for i, j in combinations(indices, 2):
-            if find(i) == find(j):
-                continue
+        _link_by_key(
+            (
+                ((docs[i].get('publication_year'), journal_key), i)
+                for i in indices
+                for journal_key in _journal_keys(docs[i])
+            ),
+            union,
+        )
+
+FUZZY_SHINGLE_SIZE = 5
+FUZZY_NUM_PERM = 64
+FUZZY_BANDS = 16
+FUZZY_THRESHOLD = 0.8
+FUZZY_ESTIMATE_MARGIN = 0.15
+FUZZY_MAX_BUCKET_SIZE = 100
+FUZZY_HASH_BATCH = 100_000
+
+
+def _shingle_hashes(title, k=FUZZY_SHINGLE_SIZE):
+    if len(title) <= k:
+        return {zlib.crc32(title.encode())}
+
+    return {zlib.crc32(title[i:i + k].encode()) for i in range(len(title) - k + 1)}
+
+def _minhash_signatures(titles, num_perm=FUZZY_NUM_PERM, seed=1):
+    """MinHash signatures (one row per title) of the character shingles of each title, using multiply-shift hashing."""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+
+    signatures = np.empty((len(titles), num_perm), dtype=np.uint64)
+    start = 0
+    while start < len(titles):
+        shingles, offsets, end = [], [], start
+        while end < len(titles) and (end == start or len(shingles) < FUZZY_HASH_BATCH):
+            offsets.append(len(shingles))
+            shingles.extend(_shingle_hashes(titles[end]))
+            end += 1
+
+        # One row per permutation keeps the reduction over contiguous memory
+        x = np.asarray(shingles, dtype=np.uint64)[None, :]
+        hashed = (a[:, None] * x + b[:, None]) >> np.uint64(32)
+        signatures[start:end] = np.minimum.reduceat(hashed, np.asarray(offsets), axis=1).T
+        start = end
+
+    return signatures
+
+def _lsh_candidates(signatures, bands=FUZZY_BANDS, max_bucket_size=FUZZY_MAX_BUCKET_SIZE):
+    """Pairs of rows (i < j) sharing at least one LSH band; buckets larger than max_bucket_size are skipped."""
+    n, rows = signatures.shape[0], signatures.shape[1] // bands
+    pair_codes = []
+    skipped = 0
+    for band in range(bands):
+        band_sig = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        keys = band_sig.view(np.dtype((np.void, band_sig.dtype.itemsize * rows))).ravel()
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+
+        starts = np.flatnonzero(np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1])))
+        sizes = np.diff(np.append(starts, n))
+        skipped += int((sizes > max_bucket_size).sum())
+        keep = (sizes >= 2) & (sizes <= max_bucket_size)
+        if not keep.any():
+            continue
 
-            d1, d2 = docs[i], docs[j]
-            if d1.get('publication_year') != d2.get('publication_year'):
-                continue
+        # Every position of a kept bucket is paired with the positions after it in the same bucket
+        starts, sizes = starts[keep], sizes[keep]
+        positions = np.repeat(starts, sizes) + _ranges(sizes)
+        partners = np.repeat(sizes, sizes) - 1 - _ranges(sizes)
+        left = np.repeat(positions, partners)
+        right = left + 1 + _ranges(partners)
 
-            issns1 = set(d1.get('journal_issns', []))
-            issns2 = set(d2.get('journal_issns', []))
-            same_journal = bool(issns1 & issns2) or (d1.get('journal_title') == d2.get('journal_title') and d1.get('journal_title'))
-            if not same_journal:
-                continue
+        i, j = order[left], order[right]
+        pair_codes.append(np.minimum(i, j) * n + np.maximum(i, j))
 
-            union(i, j)
+    if skipped:
+        logger.info(f"Skipped {skipped} LSH buckets larger than {max_bucket_size} titles.")
 
-def merge_scielo_documents(docs, audit_log_path=None, strategies=("doi", "pid", "title")):
-    parents = list(range(len(docs)))
+    if not pair_codes:
+        return np.empty((0, 2), dtype=np.int64)
 
-    def find(i):
-        while parents[i] != i:
-            parents[i] = parents[parents[i]]
-            i = parents[i]
+    codes = np.unique(np.concatenate(pair_codes))
+    return np.stack([codes // n, codes % n], axis=1)
 
-        return i
+def _ranges(sizes):
+    """Concatenation of arange(size) for each size."""
+    offsets = np.cumsum(sizes) - sizes
+    return np.arange(sizes.sum()) - np.repeat(offsets, sizes)
 
-    def union(i, j):
-        root_i, root_j = find(i), find(j)
-        if root_i != root_j:
-            parents[root_i] = root_j
+def _merge_by_fuzzy_title(docs, title_to_indices, union, threshold=FUZZY_THRESHOLD):
+    """
+    Fuzzy Title-based Merge Strategy
+    --------------------------------
+    Catches near-duplicate titles (typos, truncation, punctuation) that the exact title strategy misses.
+    Distinct normalized titles (not generic, at least 15 characters long) get MinHash signatures of their character
+    shingles, and LSH banding yields candidate title pairs in sub-quadratic time.
+    Candidates whose shingle Jaccard similarity reaches the threshold are verified like the exact title strategy:
+    the articles must have the same publication year and the same journal (a common ISSN or the same normalized journal title).
+    """
+    titles = [t for t in title_to_indices if t not in GENERIC_TITLES and len(t) >= MIN_TITLE_LENGTH]
+    if len(titles) < 2:
+        return
 
-    doi_to_indices = defaultdict(list)
+    signatures = _minhash_signatures(titles)
+    pairs = _lsh_candidates(signatures)
+    if not len(pairs):
+        logger.info("Fuzzy title merge: 0 candidate title pairs.")
+        return
+
+    num_candidates = len(pairs)
+
+    # The signature estimate only filters the candidates; the exact shingle Jaccard similarity decides
+    estimate = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+    pairs = pairs[estimate >= threshold - FUZZY_ESTIMATE_MARGIN]
+
+    shingles = {}
+    similar = []
+    for ti, tj in pairs.tolist():
+        for t in (ti, tj):
+            if t not in shingles:
+                shingles[t] = _shingle_hashes(titles[t])
+
+        if len(shingles[ti] & shingles[tj]) >= threshold * len(shingles[ti] | shingles[tj]):
+            similar.append((ti, tj))
+
+    links = 0
+
+    def count_union(i, j):
+        nonlocal links
+        links += 1
+        union(i, j)
+
+    for ti, tj in similar:
+        _link_by_key(
+            (
+                ((docs[i].get('publication_year'), journal_key), i)
+                for i in title_to_indices[titles[ti]] + title_to_indices[titles[tj]]
+                for journal_key in _journal_keys(docs[i])
+            ),
+            count_union,
+        )
+
+    logger.info(
+        f"Fuzzy title merge: {num_candidates} candidate title pairs, {len(similar)} similar pairs, {links} document links."
+    )
+
+SHARD_FIELDS = ("pid_v2", "publication_year", "titles", "journal_issns", "journal_title")
+
+
+def _index_pids_and_titles(docs):
     pid_to_indices = defaultdict(list)
     title_to_indices = defaultdict(list)
 
     for idx, doc in enumerate(docs):
-        current_dois = {doc.get('doi', '')} | set(doc.get('doi_with_lang', {}).values())
-        current_dois.discard("")
-        for d in current_dois:
-            doi_to_indices[d].append(idx)
-
         pid = doc.get('pid_v2')
         if pid:
             pid_to_indices[pid].append(idx)
@@ -265,6 +726,137 @@ def merge_scielo_documents(docs, audit_log_path=None, strategies=("doi", "pid",
             if t:
                 title_to_indices[t].append(idx)
 
+    return pid_to_indices, title_to_indices
+
+def _index_dois(docs):
+    doi_to_indices = defaultdict(list)
+
+    for idx, doc in enumerate(docs):
+        current_dois = {doc.get('doi', '')} | set(doc.get('doi_with_lang', {}).values())
+        current_dois.discard("")
+        for d in current_dois:
+            doi_to_indices[d].append(idx)
+
+    return doi_to_indices
+
+def _merge_year_shard(indices, shard_docs, strategies):
+    """
+    Runs the PID and title strategies on the documents of a single publication year.
+    Returns the shard components as (global index, global root index) arrays, omitting roots and singletons.
+    """
+    edges_src = []
+    edges_dst = []
+
+    def union(i, j):
+        edges_src.append(i)
+        edges_dst.append(j)
+
+    pid_to_indices, title_to_indices = _index_pids_and_titles(shard_docs)
+    if "pid" in strategies:
+        _merge_by_pid(shard_docs, pid_to_indices, union)
+
+    if "title" in strategies:
+        _merge_by_title(shard_docs, title_to_indices, union)
+
+    labels = _connected_components(len(shard_docs), edges_src, edges_dst)
+    linked = np.flatnonzero(labels != np.arange(len(shard_docs)))
+    indices = np.asarray(indices, dtype=np.int64)
+
+    return indices[linked], indices[labels[linked]]
+
+def _merge_by_year_shards(docs, strategies, num_cores):
+    """
+    PID and title merges require the same publication year, so they run independently per year in a process pool.
+    Each shard returns its components as links to their roots, which the global union-find joins with the DOI links.
+    """
+    shards = defaultdict(list)
+    for idx, doc in enumerate(docs):
+        shards[doc.get('publication_year')].append(idx)
+
+    shard_args = [
+        (indices, [{k: docs[i].get(k) for k in SHARD_FIELDS if k in docs[i]} for i in indices], strategies)
+        for indices in shards.values()
+        if len(indices) > 1
+    ]
+
+    if num_cores <= 1 or len(shard_args) <= 1:
+        results = [_merge_year_shard(*args) for args in shard_args]
+    else:
+        with ProcessPoolExecutor(max_workers=num_cores) as executor:
+            results = list(tqdm(
+                executor.map(_merge_year_shard, *zip(*shard_args)),
+                total=len(shard_args),
+                desc="Merging SciELO year shards",
+                unit="shard",
+            ))
+
+    edges_src = np.concatenate([src for src, _ in results]) if results else np.empty(0, dtype=np.int64)
+    edges_dst = np.concatenate([dst for _, dst in results]) if results else np.empty(0, dtype=np.int64)
+
+    return edges_src, edges_dst
+
+def consolidate_group(group):
+    """Consolidates the documents of a merged group (in input order) into a single record."""
+    if len(group) == 1:
+        doc = group[0].copy()
+
+        doc['collection'] = [doc['collection']]
+        doc['pid_v2'] = [doc['pid_v2']]
+
+        return doc
+
+    m_collections = sorted(list(set(d['collection'] for d in group)))
+    m_pids = sorted(list(set(d['pid_v2'] for d in group)))
+    m_years = sorted(list(set(d['publication_year'] for d in group)))
+
+    m_doi_with_lang = {}
+    for d in group:
+        for lang, val in d.get('doi_with_lang', {}).items():
+            if val: m_doi_with_lang[lang] = val
+
+    m_titles = set()
+    for d in group:
+        m_titles.update(d.get('titles', []))
+
+    m_issns = set()
+    for d in group:
+        m_issns.update(d.get('journal_issns', []))
+
+    m_doc_types = sorted(list(set(d.get('document_type', '') for d in group if d.get('document_type'))))
+    m_journal_titles = sorted(list(set(d.get('journal_title', '') for d in group if d.get('journal_title'))))
+
+    m_doi = next((d.get('doi') for d in group if d.get('doi')), "")
+    if not m_doi and m_doi_with_lang:
+        m_doi = sorted(m_doi_with_lang.values())[0]
+
+    return {
+        "collection": m_collections,
+        "pid_v2": m_pids,
+        "publication_year": m_years[0] if m_years else None,
+        "doi_with_lang": m_doi_with_lang,
+        "doi": m_doi,
+        "titles": sorted(list(m_titles)),
+        "document_type": m_doc_types[0] if m_doc_types else "",
+        "journal_title": m_journal_titles[0] if m_journal_titles else "",
+        "journal_issns": sorted(list(m_issns)),
+    }
+
+def merge_labels(docs, audit_log_path=None, strategies=("doi", "pid", "title"), audit_pairs=False, num_cores=1):
+    """
+    Runs the merge strategies and returns, for each document, the smallest index of its merged group (NumPy array).
+    The audit log has one summary entry per DOI bucket; `audit_pairs` enumerates every pair of the bucket instead.
+    With `num_cores` > 1 (None: CPU count - 2), the PID and title strategies run per publication year in a process pool
+    and the DOI strategy joins the year shards; the merged groups are the same.
+    """
+    edges_src = []
+    edges_dst = []
+
+    def union(i, j):
+        edges_src.append(i)
+        edges_dst.append(j)
+
+    num_cores = _resolve_num_cores(num_cores)
+
     f_audit = None
     if audit_log_path:
         p = Path(audit_log_path)
@@ -273,65 +865,48 @@ def merge_scielo_documents(docs, audit_log_path=None, strategies=("doi", "pid",
 
     try:
         if "doi" in strategies:
-            _merge_by_doi(docs, doi_to_indices, union, f_audit)
+            _merge_by_doi(docs, _index_dois(docs), union, f_audit, audit_pairs)
+    finally:
+        if f_audit: f_audit.close()
 
+    title_to_indices = None
+    if num_cores > 1:
+        shard_src, shard_dst = _merge_by_year_shards(docs, strategies, num_cores)
+
+    else:
+        shard_src = shard_dst = np.empty(0, dtype=np.int64)
+        pid_to_indices, title_to_indices = _index_pids_and_titles(docs)
         if "pid" in strategies:
-            _merge_by_pid(docs, pid_to_indices, find, union)
+            _merge_by_pid(docs, pid_to_indices, union)
 
         if "title" in strategies:
-            _merge_by_title(docs, title_to_indices, find, union)
-    finally:
-        if f_audit: f_audit.close()
+            _merge_by_title(docs, title_to_indices, union)
 
-    components = defaultdict(list)
-    for i in range(len(docs)):
-        components[find(i)].append(docs[i])
+    if "fuzzy_title" in strategies:
+        if title_to_indices is None:
+            _, title_to_indices = _index_pids_and_titles(docs)
 
-    merged_docs = []
-    for group in tqdm(components.values(), desc="Consolidating SciELO groups", unit="group"):
-        if len(group) == 1:
-            doc = group[0].copy()
+        _merge_by_fuzzy_title(docs, title_to_indices, union)
 
-            doc['collection'] = [doc['collection']]
-            doc['pid_v2'] = [doc['pid_v2']]
+    return _connected_components(
+        len(docs),
+        np.concatenate([np.asarray(edges_src, dtype=np.int64), shard_src]),
+        np.concatenate([np.asarray(edges_dst, dtype=np.int64), shard_dst]),
+    )
 
-            merged_docs.append(doc)
-            continue
+def merge_scielo_documents(docs, audit_log_path=None, strategies=("doi", "pid", "title"), audit_pairs=False, num_cores=1):
+    """
+    Merges SciELO documents that represent the same article (see `merge_labels` for the options).
+    Merged records are returned in the order of their first document.
+    """
+    labels = merge_labels(docs, audit_log_path, strategies, audit_pairs, num_cores)
+
+    components = defaultdict(list)
+    for i, root in enumerate(labels.tolist()):
+        components[root].append(docs[i])
 
-        m_collections = sorted(list(set(d['collection'] for d in group)))
-        m_pids = sorted(list(set(d['pid_v2'] for d in group)))
-        m_years = sorted(list(set(d['publication_year'] for d in group)))
-
-        m_doi_with_lang = {}
-        for d in group:
-            for lang, val in d.get('doi_with_lang', {}).items():
-                if val: m_doi_with_lang[lang] = val
-
-        m_titles = set()
-        for d in group:
-            m_titles.update(d.get('titles', []))
-
-        m_issns = set()
-        for d in group:
-            m_issns.update(d.get('journal_issns', []))
-
-        m_doc_types = sorted(list(set(d.get('document_type', '') for d in group if d.get('document_type'))))
-        m_journal_titles = sorted(list(set(d.get('journal_title', '') for d in group if d.get('journal_title'))))
-
-        m_doi = next((d.get('doi') for d in group if d.get('doi')), "")
-        if not m_doi and m_doi_with_lang:
-            m_doi = sorted(m_doi_with_lang.values())[0]
-
-        merged_docs.append({
-            "collection": m_collections,
-            "pid_v2": m_pids,
-            "publication_year": m_years[0] if m_years else None,
-            "doi_with_lang": m_doi_with_lang,
-            "doi": m_doi,
-            "titles": sorted(list(m_titles)),
-            "document_type": m_doc_types[0] if m_doc_types else "",
-            "journal_title": m_journal_titles[0] if m_journal_titles else "",
-            "journal_issns": sorted(list(m_issns)),
-        })
+    merged_docs = []
+    for group in tqdm(components.values(), desc="Consolidating SciELO groups", unit="group"):
+        merged_docs.append(consolidate_group(group))
 
     return merged_docs
@@ -0,0 +1,344 @@
+"""
+Out-of-core SciELO Document Merging
+-----------------------------------
+
+`merge_scielo_documents_duckdb` applies the same DOI, PID and title strategies as `merge_scielo_documents`
+without holding the documents in memory:
+
+1. Documents are staged chunk by chunk into Parquet files and loaded into an on-disk DuckDB database.
+2. DOIs, titles and journal keys (ISSNs and journal title) are exploded into key tables. For each strategy, the
+   documents sharing a key (DOI + title; PID + year + journal key + title; title + year + journal key) are linked
+   to the smallest document index of the key with a window function, which yields the same links as comparing
+   every pair of the bucket.
+3. Connected components are computed iteratively in SQL (hook the larger label under the smaller one, then
+   compress label chains) until every link joins documents with the same label.
+4. Groups are consolidated with `GROUP BY` and list aggregates and streamed to the output (JSONL or Parquet) in input order.
+
+DuckDB spills to the database directory, so the memory limit bounds the stage rather than the collection size.
+"""
+
+from pathlib import Path
+
+import duckdb
+import json
+import logging
+import pyarrow as pa
+import pyarrow.parquet as pq
+import tempfile
+
+from oca_metrics.preparation.scielo import (
+    GENERIC_TITLES,
+    MIN_TITLE_LENGTH,
+)
+from oca_metrics.preparation.scielo_io import (
+    SCIELO_DOCUMENT_SCHEMA,
+    documents_to_table,
+    write_merged_scielo,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+STAGING_SCHEMA = SCIELO_DOCUMENT_SCHEMA.insert(0, pa.field("idx", pa.int64()))
+
+OUTPUT_BATCH_SIZE = 10000
+
+
+def _stage_documents(doc_chunks, staging_dir):
+    """Writes each chunk of documents to a Parquet file with a global, input-ordered `idx` column."""
+    idx = 0
+    for part, chunk in enumerate(doc_chunks):
+        if not chunk:
+            continue
+
+        table = documents_to_table(chunk)
+        table = table.add_column(0, "idx", pa.array(range(idx, idx + len(chunk)), type=pa.int64()))
+        pq.write_table(table, staging_dir / f"docs_{part:06d}.parquet")
+        idx += len(chunk)
+
+    return idx
+
+def _create_key_tables(con):
+    con.execute("CREATE TABLE doc_titles AS SELECT DISTINCT idx, unnest(titles) AS title FROM docs")
+    con.execute(
+        """
+        CREATE TABLE doc_dois AS
+        SELECT DISTINCT idx, doi FROM (
+            SELECT idx, doi FROM docs
+            UNION ALL
+            SELECT idx, unnest(doi_with_lang).doi AS doi FROM docs
+        )
+        WHERE doi IS NOT NULL AND doi <> ''
+        """
+    )
+    con.execute(
+        """
+        CREATE TABLE doc_journals AS
+        SELECT DISTINCT idx, journal_key FROM (
+            SELECT idx, 'issn:' || unnest(journal_issns) AS journal_key FROM docs
+            UNION ALL
+            SELECT idx, 'title:' || journal_title AS journal_key FROM docs WHERE journal_title <> ''
+        )
+        WHERE journal_key IS NOT NULL
+        """
+    )
+
+def _create_links(con, strategies):
+    """Links every document to the smallest index sharing one of the strategy keys."""
+    selects = []
+    if "doi" in strategies:
+        selects.append(
+            """
+            SELECT min(idx) OVER (PARTITION BY d.doi, t.title) AS src, idx AS dst
+            FROM doc_dois d JOIN doc_titles t USING (idx)
+            """
+        )
+
+    if "pid" in strategies:
+        selects.append(
+            """
+            SELECT min(idx) OVER (PARTITION BY d.pid_v2, d.publication_year, j.journal_key, t.title) AS src, idx AS dst
+            FROM docs d JOIN doc_journals j USING (idx) JOIN doc_titles t USING (idx)
+            WHERE d.pid_v2 IS NOT NULL AND d.pid_v2 <> ''
+            """
+        )
+
+    if "title" in strategies:
+        selects.append(
+            f"""
+            SELECT min(idx) OVER (PARTITION BY t.title, d.publication_year, j.journal_key) AS src, idx AS dst
+            FROM doc_titles t JOIN docs d USING (idx) JOIN doc_journals j USING (idx)
+            WHERE t.title <> '' AND length(t.title) >= {MIN_TITLE_LENGTH} AND NOT list_contains($generic_titles, t.title)
+            """
+        )
+
+    if not selects:
+        con.execute("CREATE TABLE links (src BIGINT, dst BIGINT)")
+        return
+
+    con.execute(
+        "CREATE TABLE links AS SELECT DISTINCT src, dst FROM (" + " UNION ALL ".join(selects) + ") WHERE src <> dst",
+        {"generic_titles": sorted(GENERIC_TITLES)} if "title" in strategies else {},
+    )
+
+def _connected_components(con):
+    """
+    Computes, for every document, the smallest index of its connected component (table `labels`).
+    Each iteration hooks the larger label of every pending link under the smaller one and then compresses label chains.
+    """
+    con.execute("CREATE TABLE labels AS SELECT idx, idx AS label FROM docs")
+
+    iterations = 0
+    while True:
+        con.execute(
+            """
+            CREATE OR REPLACE TEMP TABLE hooks AS
+            SELECT greatest(s.label, d.label) AS label, min(least(s.label, d.label)) AS new_label
+            FROM links e
+            JOIN labels s ON s.idx = e.src
+            JOIN labels d ON d.idx = e.dst
+            WHERE s.label <> d.label
+            GROUP BY 1
+            """
+        )
+        if con.execute("SELECT count(*) FROM hooks").fetchone()[0] == 0:
+            break
+
+        iterations += 1
+        con.execute(
+            """
+            CREATE OR REPLACE TABLE labels AS
+            SELECT l.idx, coalesce(h.new_label, l.label) AS label
+            FROM labels l LEFT JOIN hooks h ON h.label = l.label
+            """
+        )
+
+        while True:
+            con.execute(
+                """
+                CREATE OR REPLACE TEMP TABLE compressed AS
+                SELECT l.idx, p.label
+                FROM labels l JOIN labels p ON p.idx = l.label
+                """
+            )
+            changed = con.execute(
+                "SELECT count(*) FROM compressed c JOIN labels l USING (idx) WHERE c.label <> l.label"
+            ).fetchone()[0]
+            con.execute("CREATE OR REPLACE TABLE labels AS SELECT * FROM compressed")
+            if changed == 0:
+                break
+
+    logger.info(f"Connected components converged after {iterations} iterations.")
+
+def _write_audit_log(con, audit_log_path, strategies):
+    """Writes one summary entry per DOI bucket, as `merge_scielo_documents` does by default."""
+    p = Path(audit_log_path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+
+    if "doi" not in strategies:
+        p.write_text("")
+        return
+
+    result = con.execute(
+        """
+        WITH buckets AS (
+            SELECT doi FROM doc_dois GROUP BY doi HAVING count(*) > 1
+        ),
+        merged AS (
+            SELECT DISTINCT doi, idx FROM (
+                SELECT d.doi, d.idx, count(*) OVER (PARTITION BY d.doi, t.title) AS n
+                FROM doc_dois d JOIN buckets b USING (doi) JOIN doc_titles t USING (idx)
+            )
+            WHERE n > 1
+        )
+        SELECT
+            d.doi,
+            list(docs.pid_v2 ORDER BY d.idx) AS pids,
+            coalesce(list(docs.pid_v2 ORDER BY d.idx) FILTER (WHERE m.idx IS NOT NULL), []) AS merged_pids
+        FROM doc_dois d
+        JOIN buckets b USING (doi)
+        JOIN docs USING (idx)
+        LEFT JOIN merged m ON m.doi = d.doi AND m.idx = d.idx
+        GROUP BY d.doi
+        ORDER BY min(d.idx)
+        """
+    )
+
+    with open(p, "w") as f_audit:
+        while True:
+            rows = result.fetchmany(OUTPUT_BATCH_SIZE)
+            if not rows:
+                break
+
+            for doi, pids, merged_pids in rows:
+                audit_entry = {
+                    "doi": doi,
+                    "pids": pids,
+                    "merged_pids": merged_pids,
+                    "merged": bool(merged_pids),
+                    "reason": "doi_match"
+                }
+                f_audit.write(json.dumps(audit_entry) + "\n")
+
+def _consolidate(row):
+    (_, size, collection, pid_v2, publication_year, doi_with_lang, doi, titles, document_type, journal_title, journal_issns,
+     m_collections, m_pids, m_year, m_titles, m_doc_type, m_journal_title, m_issns, m_doi) = row
+
+    if size == 1:
+        return {
+            "collection": [collection],
+            "pid_v2": [pid_v2],
+            "publication_year": publication_year,
+            "doi_with_lang": {item["lang"]: item["doi"] for item in doi_with_lang[0]},
+            "doi": doi,
+            "titles": titles,
+            "document_type": document_type,
+            "journal_title": journal_title,
+            "journal_issns": journal_issns,
+        }
+
+    m_doi_with_lang = {}
+    for items in doi_with_lang:
+        for item in items:
+            if item["doi"]:
+                m_doi_with_lang[item["lang"]] = item["doi"]
+
+    if not m_doi and m_doi_with_lang:
+        m_doi = sorted(m_doi_with_lang.values())[0]
+
+    return {
+        "collection": m_collections,
+        "pid_v2": m_pids,
+        "publication_year": m_year,
+        "doi_with_lang": m_doi_with_lang,
+        "doi": m_doi or "",
+        "titles": m_titles,
+        "document_type": m_doc_type or "",
+        "journal_title": m_journal_title or "",
+        "journal_issns": m_issns,
+    }
+
+def _write_merged(con, output_path, output_format=None):
+    result = con.execute(
+        """
+        SELECT
+            l.label,
+            count(*) AS size,
+            any_value(d.collection),
+            any_value(d.pid_v2),
+            any_value(d.publication_year),
+            list(d.doi_with_lang ORDER BY d.idx),
+            any_value(d.doi),
+            any_value(d.titles),
+            any_value(d.document_type),
+            any_value(d.journal_title),
+            any_value(d.journal_issns),
+            list_sort(list_distinct(list(d.collection))),
+            list_sort(list_distinct(list(d.pid_v2))),
+            min(d.publication_year),
+            list_sort(list_distinct(flatten(list(d.titles)))),
+            min(d.document_type) FILTER (WHERE d.document_type <> ''),
+            min(d.journal_title) FILTER (WHERE d.journal_title <> ''),
+            list_sort(list_distinct(flatten(list(d.journal_issns)))),
+            arg_min(d.doi, d.idx) FILTER (WHERE d.doi <> '')
+        FROM docs d JOIN labels l USING (idx)
+        GROUP BY l.label
+        ORDER BY l.label
+        """
+    )
+
+    def batches():
+        while True:
+            rows = result.fetchmany(OUTPUT_BATCH_SIZE)
+            if not rows:
+                break
+
+            yield [_consolidate(row) for row in rows]
+
+    return write_merged_scielo(batches(), output_path, output_format)
+
+def merge_scielo_documents_duckdb(doc_chunks, output_path, audit_log_path=None, strategies=("doi", "pid", "title"), work_dir=None, memory_limit=None, output_format=None):
+    """
+    Merges SciELO documents out of core and writes the merged documents to output_path (JSONL or Parquet, see `write_merged_scielo`).
+    doc_chunks is an iterable of document lists (e.g., `iter_raw_scl`); the merged groups and their order are the same
+    as in `merge_scielo_documents`. Returns the number of merged documents.
+    """
+    if "fuzzy_title" in strategies:
+        raise ValueError("The fuzzy_title strategy is only available in the in-memory merge")
+
+    with tempfile.TemporaryDirectory(dir=work_dir, prefix="scielo_merge_") as tmp_dir:
+        tmp_path = Path(tmp_dir)
+        staging_dir = tmp_path / "docs"
+        staging_dir.mkdir()
+
+        total_docs = _stage_documents(doc_chunks, staging_dir)
+        logger.info(f"Staged {total_docs} SciELO documents in {staging_dir}")
+
+        con = duckdb.connect(str(tmp_path / "merge.duckdb"))
+        try:
+            con.execute("SET temp_directory = ?", [str(tmp_path / "spill")])
+            if memory_limit:
+                con.execute("SET memory_limit = ?", [memory_limit])
+
+            con.execute("SET preserve_insertion_order = false")
+
+            if total_docs:
+                con.execute("CREATE TABLE docs AS SELECT * FROM read_parquet(?)", [str(staging_dir / "*.parquet")])
+            else:
+                con.register("empty_docs", STAGING_SCHEMA.empty_table())
+                con.execute("CREATE TABLE docs AS SELECT * FROM empty_docs")
+
+            _create_key_tables(con)
+            _create_links(con, strategies)
+            _connected_components(con)
+
+            if audit_log_path:
+                _write_audit_log(con, audit_log_path, strategies)
+
+            total = _write_merged(con, output_path, output_format)
+        finally:
+            con.close()
+
+    logger.info(f"Saved {total} merged documents to {output_path}")
+    return total
@@ -0,0 +1,197 @@
+"""
+Merged SciELO Documents I/O
+---------------------------
+
+`prepare-scielo` writes the merged SciELO documents either as JSONL (one document per line, kept for compatibility)
+or as Parquet, with list columns for `collection`, `pid_v2`, `titles` and `journal_issns` and a map column for
+`doi_with_lang`. `integrate` reads either format back into the same document dicts; Parquet is read column-wise
+and the publication year range is pushed down to the reader.
+
+Unless given explicitly, the format is inferred from the file suffix (`.parquet` for Parquet, anything else for JSONL).
+
+`read_scielo_columns` streams either format into an Arrow table with only the columns used by the integration
+(`INTEGRATION_COLUMNS`, plus any other merged column requested, e.g. for secondary match keys), so that no
+per-document dict outlives its read batch.
+"""
+
+from pathlib import Path
+
+import orjson
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+
+MERGED_SCIELO_SCHEMA = pa.schema([
+    pa.field("collection", pa.list_(pa.string())),
+    pa.field("pid_v2", pa.list_(pa.string())),
+    pa.field("publication_year", pa.int64()),
+    pa.field("doi_with_lang", pa.map_(pa.string(), pa.string())),
+    pa.field("doi", pa.string()),
+    pa.field("titles", pa.list_(pa.string())),
+    pa.field("document_type", pa.string()),
+    pa.field("journal_title", pa.string()),
+    pa.field("journal_issns", pa.list_(pa.string())),
+])
+
+# Documents before merging (one per ArticleMeta record); doi_with_lang keeps its order and null languages
+SCIELO_DOCUMENT_SCHEMA = pa.schema([
+    pa.field("collection", pa.string()),
+    pa.field("pid_v2", pa.string()),
+    pa.field("publication_year", pa.int64()),
+    pa.field("doi_with_lang", pa.list_(pa.struct([pa.field("lang", pa.string()), pa.field("doi", pa.string())]))),
+    pa.field("doi", pa.string()),
+    pa.field("titles", pa.list_(pa.string())),
+    pa.field("document_type", pa.string()),
+    pa.field("journal_title", pa.string()),
+    pa.field("journal_issns", pa.list_(pa.string())),
+])
+
+# Columns of the merged SciELO documents used to match and write the integrated dataset
+INTEGRATION_COLUMNS = ("collection", "pid_v2", "publication_year", "doi", "doi_with_lang")
+
+WRITE_BUFFER_BYTES = 8 * 1024 * 1024
+READ_BATCH_SIZE = 100_000
+
+
+def _is_parquet(path, fmt=None):
+    if fmt is None:
+        return Path(path).suffix == ".parquet"
+
+    if fmt not in ("jsonl", "parquet"):
+        raise ValueError(f"Unknown format: {fmt}. Expected 'jsonl' or 'parquet'")
+
+    return fmt == "parquet"
+
+def _in_year_range(year, start_year, end_year):
+    if start_year is not None and (year is None or year < start_year):
+        return False
+
+    if end_year is not None and (year is None or year > end_year):
+        return False
+
+    return True
+
+def merged_documents_to_table(docs):
+    columns = {name: [] for name in MERGED_SCIELO_SCHEMA.names}
+    for doc in docs:
+        for name in MERGED_SCIELO_SCHEMA.names:
+            columns[name].append(doc.get(name))
+
+    # Map keys cannot be null; JSONL stores a null language as the "null" key, so Parquet does the same
+    columns["doi_with_lang"] = [
+        [("null" if lang is None else lang, doi) for lang, doi in (value or {}).items()]
+        for value in columns["doi_with_lang"]
+    ]
+
+    return pa.Table.from_pydict(columns, schema=MERGED_SCIELO_SCHEMA)
+
+def merged_table_to_documents(table):
+    columns = {name: table.column(name).to_pylist() for name in MERGED_SCIELO_SCHEMA.names if name in table.column_names}
+    if "doi_with_lang" in columns:
+        columns["doi_with_lang"] = [dict(value) if value is not None else {} for value in columns["doi_with_lang"]]
+
+    return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+def documents_to_table(docs):
+    """Converts SciELO documents (before merging) to an Arrow table with `SCIELO_DOCUMENT_SCHEMA`."""
+    columns = {name: [] for name in SCIELO_DOCUMENT_SCHEMA.names}
+    for doc in docs:
+        for name in SCIELO_DOCUMENT_SCHEMA.names:
+            columns[name].append(doc.get(name))
+
+    columns["doi_with_lang"] = [
+        [{"lang": lang, "doi": doi} for lang, doi in (value or {}).items()]
+        for value in columns["doi_with_lang"]
+    ]
+
+    return pa.Table.from_pydict(columns, schema=SCIELO_DOCUMENT_SCHEMA)
+
+def table_to_documents(table):
+    """Converts an Arrow table with the `SCIELO_DOCUMENT_SCHEMA` columns back to SciELO documents."""
+    columns = {name: table.column(name).to_pylist() for name in SCIELO_DOCUMENT_SCHEMA.names}
+    columns["doi_with_lang"] = [{item["lang"]: item["doi"] for item in value or []} for value in columns["doi_with_lang"]]
+
+    return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+def write_merged_scielo(doc_batches, path, fmt=None):
+    """Writes batches of merged SciELO documents to JSONL or Parquet (fmt, or the suffix). Returns the number of documents."""
+    total = 0
+    if _is_parquet(path, fmt):
+        with pq.ParquetWriter(path, MERGED_SCIELO_SCHEMA) as writer:
+            for docs in doc_batches:
+                if docs:
+                    writer.write_table(merged_documents_to_table(docs))
+                    total += len(docs)
+
+        return total
+
+    with open(path, "wb", buffering=WRITE_BUFFER_BYTES) as f:
+        for docs in doc_batches:
+            if docs:
+                f.write(b"".join(orjson.dumps(doc, option=orjson.OPT_NON_STR_KEYS) + b"\n" for doc in docs))
+                total += len(docs)
+
+    return total
+
+def read_merged_scielo(path, start_year=None, end_year=None, fmt=None):
+    """Reads merged SciELO documents from JSONL or Parquet (fmt, or the suffix), keeping those within the publication year range."""
+    if not _is_parquet(path, fmt):
+        with open(path, "rb") as f:
+            docs = (orjson.loads(line) for line in f if line.strip())
+            return [d for d in docs if _in_year_range(d.get("publication_year"), start_year, end_year)]
+
+    filters = []
+    if start_year is not None:
+        filters.append(("publication_year", ">=", start_year))
+    if end_year is not None:
+        filters.append(("publication_year", "<=", end_year))
+
+    table = pq.read_table(path, filters=filters or None)
+
+    return merged_table_to_documents(table)
+
+def iter_scielo_column_batches(path, start_year=None, end_year=None, fmt=None, batch_size=READ_BATCH_SIZE, columns=INTEGRATION_COLUMNS):
+    """Yields Arrow tables with the given columns (`INTEGRATION_COLUMNS` by default) of the merged SciELO documents within the publication year range."""
+    columns = list(columns)
+    schema = pa.schema([MERGED_SCIELO_SCHEMA.field(name) for name in columns])
+
+    if _is_parquet(path, fmt):
+        year = ds.field("publication_year")
+        expression = None
+        if start_year is not None:
+            expression = year >= start_year
+        if end_year is not None:
+            expression = (year <= end_year) if expression is None else expression & (year <= end_year)
+
+        dataset = ds.dataset(path, format="parquet")
+        for batch in dataset.to_batches(columns=columns, filter=expression, batch_size=batch_size):
+            if batch.num_rows:
+                yield pa.Table.from_batches([batch]).cast(schema)
+
+        return
+
+    with open(path, "rb") as f:
+        docs = []
+        for line in f:
+            if not line.strip():
+                continue
+
+            doc = orjson.loads(line)
+            if not _in_year_range(doc.get("publication_year"), start_year, end_year):
+                continue
+
+            docs.append(doc)
+            if len(docs) >= batch_size:
+                yield merged_documents_to_table(docs).select(columns)
+                docs = []
+
+        if docs:
+            yield merged_documents_to_table(docs).select(columns)
+
+def read_scielo_columns(path, start_year=None, end_year=None, fmt=None, batch_size=READ_BATCH_SIZE, columns=INTEGRATION_COLUMNS):
+    """Reads the given columns (`INTEGRATION_COLUMNS` by default) of the merged SciELO documents (JSONL or Parquet) into a single Arrow table."""
+    schema = pa.schema([MERGED_SCIELO_SCHEMA.field(name) for name in columns])
+    tables = list(iter_scielo_column_batches(path, start_year, end_year, fmt, batch_size, columns))
+
+    return pa.concat_tables(tables).combine_chunks() if tables else schema.empty_table()
@@ -0,0 +1,331 @@
+"""
+Incremental SciELO Merge State
+------------------------------
+
+`merge_scielo_incremental` keeps the result of `prepare-scielo` in a state directory so that a later run only
+re-merges what changed:
+
+- `documents.parquet`: one row per ArticleMeta record (`record_id` = collection/PID), with its transformed document,
+  the sequence number of its first ingestion (`seq`) and its merged group (`component`);
+- `keys.parquet`: the DOI, PID and title keys of each record (`key`, `record_id`), used to find the groups a new or
+  updated record can join;
+- `merged.parquet`: one consolidated record per component, with the `seq` of its first document;
+- `state_manifest.json`: strategies, counters, the statistics of the last run and the current generation.
+
+The three tables of a run are written to a new `generation_N/` directory, and the manifest, replaced atomically,
+then names it as the current generation: an interrupted run leaves the previous generation in place, so the tables
+are always read together. Generations the manifest no longer names are removed.
+
+A run compares the incoming records with the stored ones and keeps only new or updated records. The affected
+components are those holding a previous version of an updated record or sharing a key with a changed record;
+only their documents are merged again (links never cross component boundaries otherwise), and only their
+consolidated records are replaced. Records that disappear from the input are not removed.
+
+On the first run (empty state) every record is new and the result matches `merge_scielo_documents`. Afterwards,
+records keep the position of their first ingestion, which defines the output order and the order of documents
+within a group.
+"""
+
+from pathlib import Path
+
+import datetime
+import json
+import logging
+import os
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import shutil
+
+from oca_metrics.preparation.scielo import (
+    consolidate_group,
+    merge_labels,
+)
+from oca_metrics.preparation.scielo_io import (
+    MERGED_SCIELO_SCHEMA,
+    SCIELO_DOCUMENT_SCHEMA,
+    documents_to_table,
+    merged_documents_to_table,
+    merged_table_to_documents,
+    table_to_documents,
+    write_merged_scielo,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+DOCUMENTS_FILE_NAME = "documents.parquet"
+KEYS_FILE_NAME = "keys.parquet"
+MERGED_FILE_NAME = "merged.parquet"
+STATE_MANIFEST_FILE_NAME = "state_manifest.json"
+GENERATION_DIR_PREFIX = "generation_"
+
+STATE_FIELDS = [
+    pa.field("record_id", pa.string()),
+    pa.field("seq", pa.int64()),
+    pa.field("component", pa.int64()),
+]
+DOCUMENTS_SCHEMA = pa.schema(STATE_FIELDS + list(SCIELO_DOCUMENT_SCHEMA))
+KEYS_SCHEMA = pa.schema([pa.field("key", pa.string()), pa.field("record_id", pa.string())])
+MERGED_STATE_SCHEMA = pa.schema(STATE_FIELDS[1:] + list(MERGED_SCIELO_SCHEMA))
+
+EXPORT_BATCH_SIZE = 100_000
+
+
+def record_id(doc):
+    return f"{doc.get('collection')}/{doc.get('pid_v2')}"
+
+def document_keys(doc):
+    """Keys shared by any two documents that a merge strategy can link (DOI, PID or non-empty title)."""
+    keys = set()
+    for doi in {doc.get('doi', '')} | set(doc.get('doi_with_lang', {}).values()):
+        if doi:
+            keys.add(f"doi:{doi}")
+
+    if doc.get('pid_v2'):
+        keys.add(f"pid:{doc['pid_v2']}")
+
+    for t in doc.get('titles', []):
+        if t:
+            keys.add(f"title:{t}")
+
+    return keys
+
+def _read_table(path, schema):
+    if not path.exists():
+        return schema.empty_table()
+
+    return pq.read_table(path, schema=schema)
+
+def _generation_dir(state_path, manifest):
+    """Directory of the tables of the generation named by manifest (the state directory itself for states written before generations)."""
+    generation = (manifest or {}).get("generation")
+    if generation is None:
+        return state_path
+
+    return state_path / f"{GENERATION_DIR_PREFIX}{generation}"
+
+def _remove_other_generations(state_path, current_dir):
+    """Removes the tables of previous generations and of interrupted runs."""
+    for path in state_path.glob(f"{GENERATION_DIR_PREFIX}*"):
+        if path.is_dir() and path != current_dir:
+            shutil.rmtree(path)
+
+    # Tables of a state written before generations
+    for name in (DOCUMENTS_FILE_NAME, KEYS_FILE_NAME, MERGED_FILE_NAME):
+        (state_path / name).unlink(missing_ok=True)
+
+def load_state_manifest(state_dir):
+    manifest_path = Path(state_dir) / STATE_MANIFEST_FILE_NAME
+    if not manifest_path.exists():
+        return None
+
+    with open(manifest_path) as f:
+        return json.load(f)
+
+def _save_state_manifest(state_dir, manifest):
+    manifest_path = Path(state_dir) / STATE_MANIFEST_FILE_NAME
+    tmp_path = manifest_path.with_suffix(".json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    os.replace(tmp_path, manifest_path)
+
+def _stored_documents(documents, row_index, record_ids):
+    """Returns {record_id: (seq, component, document)} for the stored records among record_ids (row_index maps record_id to row)."""
+    rows = documents.take(pa.array([row_index[rid] for rid in record_ids if rid in row_index], type=pa.int64()))
+    return {
+        rid: (seq, component, doc)
+        for rid, seq, component, doc in zip(
+            rows["record_id"].to_pylist(),
+            rows["seq"].to_pylist(),
+            rows["component"].to_pylist(),
+            table_to_documents(rows),
+        )
+    }
+
+def _collect_changes(doc_chunks, documents, next_seq):
+    """Returns the new or updated documents as {record_id: (seq, document)}, and the counts of each kind."""
+    changed = {}
+    stats = {"new": 0, "updated": 0, "unchanged": 0}
+    row_index = {rid: i for i, rid in enumerate(documents["record_id"].to_pylist())}
+
+    for chunk in doc_chunks:
+        incoming = {}
+        for doc in chunk:
+            incoming[record_id(doc)] = doc
+
+        stored = _stored_documents(documents, row_index, incoming)
+        for rid, doc in incoming.items():
+            if rid in stored:
+                seq, _, stored_doc = stored[rid]
+                if stored_doc == doc:
+                    changed.pop(rid, None)
+                    stats["unchanged"] += 1
+                    continue
+
+                stats["updated"] += 1
+            elif rid in changed:
+                seq = changed[rid][0]
+            else:
+                seq = next_seq
+                next_seq += 1
+                stats["new"] += 1
+
+            changed[rid] = (seq, doc)
+
+    return changed, stats, next_seq
+
+def _affected_components(documents, keys, changed):
+    """Components holding a previous version of a changed record or sharing a key with a changed record."""
+    changed_keys = set()
+    for _, doc in changed.values():
+        changed_keys.update(document_keys(doc))
+
+    linked_ids = keys.filter(pc.is_in(keys["key"], value_set=pa.array(list(changed_keys), type=pa.string())))["record_id"]
+    candidate_ids = pa.concat_arrays([
+        pa.array(list(changed), type=pa.string()),
+        linked_ids.combine_chunks() if linked_ids.num_chunks else pa.array([], type=pa.string()),
+    ])
+
+    rows = documents.filter(pc.is_in(documents["record_id"], value_set=pc.unique(candidate_ids)))
+    return pc.unique(rows["component"]).to_pylist()
+
+def merge_scielo_incremental(doc_chunks, state_dir, audit_log_path=None, strategies=("doi", "pid", "title"), audit_pairs=False, num_cores=1):
+    """
+    Ingests new or updated SciELO documents into the merge state at state_dir and re-merges only the affected
+    components. Returns the statistics of the run.
+    """
+    if "fuzzy_title" in strategies:
+        # Fuzzy links are not reachable through exact keys, so affected components could be missed
+        raise ValueError("The fuzzy_title strategy is not available in the incremental merge")
+
+    state_path = Path(state_dir)
+    state_path.mkdir(parents=True, exist_ok=True)
+
+    manifest = load_state_manifest(state_path) or {"strategies": list(strategies), "next_seq": 0, "next_component": 0}
+    if manifest["strategies"] != list(strategies):
+        raise ValueError(
+            f"State at {state_dir} was built with strategies {manifest['strategies']}; "
+            f"rebuild it from an empty state directory to use {list(strategies)}"
+        )
+
+    current_dir = _generation_dir(state_path, manifest)
+    documents = _read_table(current_dir / DOCUMENTS_FILE_NAME, DOCUMENTS_SCHEMA)
+    keys = _read_table(current_dir / KEYS_FILE_NAME, KEYS_SCHEMA)
+    merged = _read_table(current_dir / MERGED_FILE_NAME, MERGED_STATE_SCHEMA)
+
+    changed, stats, next_seq = _collect_changes(doc_chunks, documents, manifest["next_seq"])
+    logger.info(f"Incoming SciELO records: {stats['new']} new, {stats['updated']} updated, {stats['unchanged']} unchanged.")
+
+    affected = _affected_components(documents, keys, changed) if changed else []
+    affected_set = pa.array(affected, type=pa.int64())
+    changed_ids = pa.array(list(changed), type=pa.string())
+
+    # Documents to merge again: the unchanged members of the affected components plus the changed documents
+    kept_members = documents.filter(
+        pc.and_(
+            pc.is_in(documents["component"], value_set=affected_set),
+            pc.invert(pc.is_in(documents["record_id"], value_set=changed_ids)),
+        )
+    )
+    members = list(zip(
+        kept_members["seq"].to_pylist(),
+        kept_members["record_id"].to_pylist(),
+        table_to_documents(kept_members),
+    ))
+    members.extend((seq, rid, doc) for rid, (seq, doc) in changed.items())
+    members.sort(key=lambda m: m[0])
+
+    member_docs = [doc for _, _, doc in members]
+    labels = merge_labels(member_docs, audit_log_path, strategies, audit_pairs, num_cores).tolist() if members else []
+
+    groups = {}
+    for i, root in enumerate(labels):
+        groups.setdefault(root, []).append(i)
+
+    next_component = manifest["next_component"]
+    member_components = [None] * len(members)
+    merged_rows, merged_seqs, merged_components = [], [], []
+    for indices in groups.values():
+        for i in indices:
+            member_components[i] = next_component
+
+        merged_rows.append(consolidate_group([member_docs[i] for i in indices]))
+        merged_seqs.append(members[indices[0]][0])
+        merged_components.append(next_component)
+        next_component += 1
+
+    # Replace the affected components and the previous versions of the changed records
+    new_documents = documents_to_table(member_docs)
+    new_documents = new_documents.add_column(0, "component", pa.array(member_components, type=pa.int64()))
+    new_documents = new_documents.add_column(0, "seq", pa.array([m[0] for m in members], type=pa.int64()))
+    new_documents = new_documents.add_column(0, "record_id", pa.array([m[1] for m in members], type=pa.string()))
+
+    documents = pa.concat_tables([
+        documents.filter(
+            pc.invert(pc.or_(
+                pc.is_in(documents["component"], value_set=affected_set),
+                pc.is_in(documents["record_id"], value_set=changed_ids),
+            ))
+        ),
+        new_documents,
+    ])
+
+    new_keys = [(key, rid) for rid, (_, doc) in changed.items() for key in sorted(document_keys(doc))]
+    keys = pa.concat_tables([
+        keys.filter(pc.invert(pc.is_in(keys["record_id"], value_set=changed_ids))),
+        pa.table({"key": [k for k, _ in new_keys], "record_id": [r for _, r in new_keys]}, schema=KEYS_SCHEMA),
+    ])
+
+    new_merged = merged_documents_to_table(merged_rows)
+    new_merged = new_merged.add_column(0, "component", pa.array(merged_components, type=pa.int64()))
+    new_merged = new_merged.add_column(0, "seq", pa.array(merged_seqs, type=pa.int64()))
+    merged = pa.concat_tables([
+        merged.filter(pc.invert(pc.is_in(merged["component"], value_set=affected_set))),
+        new_merged,
+    ])
+
+    generation = manifest.get("generation", -1) + 1
+    generation_dir = _generation_dir(state_path, {"generation": generation})
+    if generation_dir.exists():
+        shutil.rmtree(generation_dir)
+    generation_dir.mkdir()
+
+    pq.write_table(documents, generation_dir / DOCUMENTS_FILE_NAME)
+    pq.write_table(keys, generation_dir / KEYS_FILE_NAME)
+    pq.write_table(merged, generation_dir / MERGED_FILE_NAME)
+
+    stats.update({
+        "affected_components": len(affected),
+        "emitted_components": len(merged_rows),
+        "components": merged.num_rows,
+    })
+    manifest.update({
+        "next_seq": next_seq,
+        "next_component": next_component,
+        "generation": generation,
+        "updated_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "last_run": stats,
+    })
+    _save_state_manifest(state_path, manifest)
+    _remove_other_generations(state_path, generation_dir)
+
+    logger.info(
+        f"Re-merged {len(affected)} affected components into {len(merged_rows)} components "
+        f"({merged.num_rows} merged SciELO records in total)."
+    )
+    return stats
+
+def export_merged_state(state_dir, output_path, fmt=None):
+    """Writes the merged SciELO records of the state to output_path (JSONL or Parquet), in first-ingestion order."""
+    state_path = Path(state_dir)
+    merged = _read_table(_generation_dir(state_path, load_state_manifest(state_path)) / MERGED_FILE_NAME, MERGED_STATE_SCHEMA)
+    merged = merged.sort_by("seq")
+
+    def batches():
+        for offset in range(0, merged.num_rows, EXPORT_BATCH_SIZE):
+            yield merged_table_to_documents(merged.slice(offset, EXPORT_BATCH_SIZE))
+
+    return write_merged_scielo(batches(), output_path, fmt)
@@ -109,3 +109,5 @@ CSV_METADATA_COLUMNS = [
     "is_qualis",
     "is_journal_oa",
 ]
+
+YEARLY_CITATIONS_FIRST_YEAR = 2012
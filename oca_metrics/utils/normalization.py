@@ -1,29 +1,43 @@
+from functools import lru_cache
 from typing import Any
 
 import unicodedata
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 
 from oca_metrics.utils.constants import OPENALEX_URL_PREFIX
 
 
-def stz_doi(value):
-    if not value:
-        return ""
+STZ_CACHE_SIZE = 1 << 16
+
+# Characters removed by str.strip() among ASCII, so Arrow's ASCII trim matches it exactly
+ASCII_WHITESPACE = "".join(chr(c) for c in range(128) if chr(c).isspace())
+
+DOI_PREFIXES = ("https://doi.org/", "http://doi.org/", "doi:")
+
 
-    doi = str(value).strip().lower()
+@lru_cache(maxsize=STZ_CACHE_SIZE)
+def _stz_doi(value: str) -> str:
+    doi = value.strip().lower()
     doi = doi.replace("https://doi.org/", "").replace("http://doi.org/", "")
     doi = doi.replace("doi:", "").strip()
 
     return doi if doi else ""
 
 
-def stz_title(value):
+def stz_doi(value):
     if not value:
         return ""
 
+    return _stz_doi(str(value))
+
+
+@lru_cache(maxsize=STZ_CACHE_SIZE)
+def _stz_title(value: str) -> str:
     # Remove accents
-    normalized = unicodedata.normalize("NFKD", str(value))
+    normalized = unicodedata.normalize("NFKD", value)
     without_accents = "".join(
         c for c in normalized if not unicodedata.combining(c)
     )
@@ -34,6 +48,114 @@ def stz_title(value):
     return title if title else ""
 
 
+def stz_title(value):
+    if not value:
+        return ""
+
+    return _stz_title(str(value))
+
+
+def _is_unassigned(char: str) -> bool:
+    return unicodedata.category(char) == "Cn"
+
+
+@lru_cache(maxsize=None)
+def _code_point_class(predicate) -> str:
+    """RE2 character class of the code points for which predicate (e.g. unicodedata.combining) is true."""
+    ranges = []
+    for code in range(0x110000):
+        if predicate(chr(code)):
+            if ranges and ranges[-1][1] == code - 1:
+                ranges[-1][1] = code
+            else:
+                ranges.append([code, code])
+
+    return "[" + "".join(f"\\x{{{start:X}}}-\\x{{{end:X}}}" for start, end in ranges) + "]"
+
+
+def _as_string_array(values):
+    if isinstance(values, pd.Series):
+        return pa.array(values, type=pa.string(), from_pandas=True)
+
+    if isinstance(values, pa.ChunkedArray):
+        values = values.combine_chunks()
+
+    if not isinstance(values, pa.Array):
+        values = pa.array(values, type=pa.string())
+
+    if not pa.types.is_string(values.type):
+        values = values.cast(pa.string())
+
+    return values
+
+
+def _finish_batch(result, values, fallback, scalar_fn, like):
+    """
+    Fills nulls with "", recomputes the fallback rows with the scalar function and returns the result
+    as a pandas Series (with the index of like) or as an Arrow array.
+    """
+    result = pc.fill_null(result, "")
+
+    fallback = pc.fill_null(fallback, False)
+    if pc.any(fallback).as_py():
+        positions = np.flatnonzero(fallback.to_numpy(zero_copy_only=False))
+        fixed = [scalar_fn(v) for v in values.take(pa.array(positions)).to_pylist()]
+        result = pc.replace_with_mask(result, fallback, pa.array(fixed, type=pa.string()))
+
+    if isinstance(like, pd.Series):
+        return pd.Series(result.to_pylist(), index=like.index, name=like.name, dtype=object)
+
+    return result
+
+
+def stz_doi_batch(values):
+    """
+    `stz_doi` over a string array (Arrow array, chunked array, pandas Series or list), with nulls mapped to "".
+    ASCII values are normalized with Arrow kernels; other values (where Python's case mapping and whitespace
+    rules may differ from Arrow's) go through the memoized scalar function, so the result is always identical.
+    """
+    strings = _as_string_array(values)
+
+    doi = pc.ascii_lower(pc.ascii_trim(strings, ASCII_WHITESPACE))
+    for prefix in DOI_PREFIXES:
+        doi = pc.replace_substring(doi, prefix, "")
+    doi = pc.ascii_trim(doi, ASCII_WHITESPACE)
+
+    return _finish_batch(doi, strings, pc.invert(pc.string_is_ascii(strings)), stz_doi, values)
+
+
+def stz_title_batch(values):
+    """
+    `stz_title` over a string array (Arrow array, chunked array, pandas Series or list), with nulls mapped to "".
+    Non-ASCII values go through Arrow's NFKD normalization and a regex that removes the combining characters;
+    values that end up ASCII are then lowercased and stripped with Arrow kernels. Values that stay non-ASCII or
+    hold code points unknown to Python's Unicode database (Arrow may ship a newer one) go through the memoized
+    scalar function, so the result is always identical.
+    """
+    strings = _as_string_array(values)
+
+    fallback = np.zeros(len(strings), dtype=bool)
+    title = strings
+    non_ascii = pc.fill_null(pc.invert(pc.string_is_ascii(strings)), False)
+    if pc.any(non_ascii).as_py():
+        positions = np.flatnonzero(non_ascii.to_numpy(zero_copy_only=False))
+        subset = strings.take(pa.array(positions))
+
+        normalized = pc.utf8_normalize(subset, "NFKD")
+        normalized = pc.replace_substring_regex(normalized, _code_point_class(unicodedata.combining), "")
+        fallback[positions] = pc.or_(
+            pc.invert(pc.string_is_ascii(normalized)),
+            pc.match_substring_regex(subset, _code_point_class(_is_unassigned)),
+        ).to_numpy(zero_copy_only=False)
+
+        title = pc.replace_with_mask(strings, non_ascii, normalized)
+
+    title = pc.replace_substring(title, " ", "")
+    title = pc.ascii_trim(pc.ascii_lower(title), ASCII_WHITESPACE)
+
+    return _finish_batch(title, strings, pa.array(fallback), stz_title, values)
+
+
 def extract_year(value):
     if not value:
         return None
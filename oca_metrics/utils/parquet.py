@@ -1,12 +1,17 @@
-from typing import Any, List, Sequence, Set
+from pathlib import Path
+from typing import Any, List, Optional, Sequence, Set, Union
 
 import json
+import numpy as np
 import pandas as pd
 import re
 
 
 YEARLY_CITATIONS_PATTERN = re.compile(r"^citations_\d{4}$")
 SQL_IDENTIFIER_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+YEAR_PARTITION_PATTERN = re.compile(r"^publication_year=(\d+)$")
+
+PARALLEL_MANIFEST_FILE_NAME = "integration_manifest.json"
 
 
 def extract_yearly_citation_columns(columns: Sequence[str]) -> List[str]:
@@ -14,6 +19,65 @@ def extract_yearly_citation_columns(columns: Sequence[str]) -> List[str]:
     return sorted(yearly_cols, key=lambda c: int(c.split("_")[1]))
 
 
+def build_year_partition_name(year: int) -> str:
+    return f"publication_year={int(year)}"
+
+
+def extract_partition_year(path: Union[str, Path]) -> Optional[int]:
+    for part in reversed(Path(path).parts):
+        match = YEAR_PARTITION_PATTERN.match(part)
+        if match:
+            return int(match.group(1))
+
+    return None
+
+
+def list_parquet_files(
+    base_dir: Union[str, Path],
+    start_year: Optional[int] = None,
+    end_year: Optional[int] = None,
+) -> List[Path]:
+    """
+    Lists non-empty Parquet files under base_dir, skipping `publication_year=YYYY` partitions outside the year range.
+    Files that are not inside a year partition are always kept.
+    """
+    base_dir = Path(base_dir)
+    files = []
+    for p in base_dir.rglob("*.parquet"):
+        if not p.is_file() or p.stat().st_size == 0:
+            continue
+
+        year = extract_partition_year(p.relative_to(base_dir).parent)
+        if year is not None:
+            if start_year is not None and year < start_year:
+                continue
+            if end_year is not None and year > end_year:
+                continue
+
+        files.append(p)
+
+    return sorted(files)
+
+
+def load_parallel_manifest(output_dir: Union[str, Path]) -> Optional[dict]:
+    """The manifest written by the parallel integration in output_dir, or None if there is none."""
+    manifest_path = Path(output_dir) / PARALLEL_MANIFEST_FILE_NAME
+    if not manifest_path.exists():
+        return None
+
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def list_manifest_fragments(output_dir: Union[str, Path]) -> Optional[List[Path]]:
+    """Paths of the fragments listed in the parallel integration manifest of output_dir, or None if there is none."""
+    manifest = load_parallel_manifest(output_dir)
+    if manifest is None:
+        return None
+
+    return [Path(output_dir) / fragment["path"] for fragment in manifest["fragments"]]
+
+
 def get_valid_level_column(level: str, table_columns: Sequence[str]) -> str:
     if not SQL_IDENTIFIER_PATTERN.match(level):
         raise ValueError(f"Invalid level column name: {level}")
@@ -25,19 +89,28 @@ def get_valid_level_column(level: str, table_columns: Sequence[str]) -> str:
 
 
 def parse_merged_languages(payload: Any) -> Set[str]:
+    """
+    Languages of the works of a merged record. payload is the `oa_individual_works` value: a list of work structs
+    (as read from the typed column) or the JSON object keyed by work ID written by earlier versions.
+    """
     if payload is None or (isinstance(payload, float) and pd.isna(payload)):
         return set()
 
-    try:
-        data = payload if isinstance(payload, dict) else json.loads(payload)
-    except Exception:
-        return set()
+    if isinstance(payload, (list, tuple, np.ndarray)):
+        works = list(payload)
+    else:
+        try:
+            data = payload if isinstance(payload, dict) else json.loads(payload)
+        except Exception:
+            return set()
 
-    if not isinstance(data, dict):
-        return set()
+        if not isinstance(data, dict):
+            return set()
+
+        works = data.values()
 
     langs = set()
-    for value in data.values():
+    for value in works:
         if isinstance(value, dict):
             lang = value.get("language")
             if lang:
@@ -118,6 +118,78 @@ class TestParquetAdapter(unittest.TestCase):
         self.assertEqual(s2['is_journal_multilingual'], 0)
         self.assertEqual(s2['is_journal_oa'], 0)
 
+    def test_multilingual_flag_from_typed_individual_works(self):
+        import os
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        works_type = pa.list_(pa.struct([("work_id", pa.string()), ("language", pa.string())]))
+        table = pa.table({
+            'publication_year': [2024, 2024, 2024],
+            'journal_id': ['S1', 'S2', 'S2'],
+            'field': ['Medicine', 'Medicine', 'Medicine'],
+            'is_merged': [True, True, False],
+            'oa_individual_works': pa.array([
+                [{"work_id": "W1", "language": "en"}, {"work_id": "W2", "language": "PT "}],
+                [{"work_id": "W3", "language": "en"}, {"work_id": "W4", "language": "en"}, {"work_id": "W5", "language": ""}],
+                None,
+            ], type=works_type),
+        })
+        path = "test_metrics_typed.parquet"
+        pq.write_table(table, path)
+        try:
+            df = ParquetAdapter(path)._compute_multilingual_flag_by_scielo_merge(2024, 'field', 'Medicine')
+        finally:
+            os.remove(path)
+
+        flags = dict(zip(df['journal_id'], df['is_journal_multilingual']))
+        self.assertEqual(flags, {'S1': 1, 'S2': 0})
+
+    def test_multilingual_flag_errors_degrade_to_empty_flags(self):
+        import os
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # Typed works without a language field: the query cannot be bound, only the flags are lost
+        works_type = pa.list_(pa.struct([("work_id", pa.string())]))
+        table = pa.table({
+            'publication_year': [2024],
+            'journal_id': ['S1'],
+            'field': ['Medicine'],
+            'is_merged': [True],
+            'oa_individual_works': pa.array([[{"work_id": "W1"}]], type=works_type),
+        })
+        path = "test_metrics_typed_no_language.parquet"
+        pq.write_table(table, path)
+        try:
+            adapter = ParquetAdapter(path)
+            with self.assertLogs("oca_metrics.adapters.parquet", level="WARNING"):
+                flags = adapter._compute_multilingual_flag_by_scielo_merge(2024, 'field', 'Medicine')
+        finally:
+            os.remove(path)
+
+        self.assertTrue(flags.empty)
+        self.assertEqual(list(flags.columns), ["journal_id", "is_journal_multilingual"])
+
+    def test_reads_fragments_listed_in_manifest(self):
+        import shutil
+        import tempfile
+
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            df = pd.read_parquet(self.parquet_path)
+            df.iloc[:3].to_parquet(f"{tmp_dir}/merged_2024-a.parquet")
+            df.iloc[3:].to_parquet(f"{tmp_dir}/merged_2023.parquet")
+            # A fragment left by an interrupted incremental run, not listed in the manifest
+            df.iloc[:3].to_parquet(f"{tmp_dir}/merged_2024-b.parquet")
+            with open(f"{tmp_dir}/integration_manifest.json", "w") as f:
+                json.dump({"fragments": [{"path": "merged_2024-a.parquet"}, {"path": "merged_2023.parquet"}]}, f)
+
+            adapter = ParquetAdapter(tmp_dir)
+            self.assertEqual(adapter.con.execute(f"SELECT COUNT(*) FROM {adapter.table_name}").fetchone()[0], 5)
+        finally:
+            shutil.rmtree(tmp_dir)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+
+from oca_metrics.preparation.articlemeta import (
+    diff_docs,
+    extract_article_doc,
+)
+from oca_metrics.preparation.scielo import _transform_with_xylose
+
+
+def make_record(**overrides):
+    record = {
+        "collection": "scl",
+        "article": {
+            "v880": [{"_": "S0101-01012024000100001"}],
+            "v40": [{"_": "pt"}],
+            "v237": [{"_": "10.1590/S0101-01012024000100001"}],
+            "v12": [
+                {"l": "pt", "_": "Título &amp; subtítulo do artigo"},
+                {"l": "en", "_": "  "},
+                {"l": "en", "t": "Article title"},
+                {"l": "es", "_": "Título del artículo"},
+                {"_": "Sem idioma"},
+            ],
+            "v71": [{"_": "oa"}],
+        },
+        "title": {
+            "v100": [{"_": " Revista de Teste "}],
+            "v400": [{"_": "0101-0101"}],
+            "v35": [{"_": "PRINT"}],
+        },
+    }
+    for key, value in overrides.items():
+        target, field = key.split("__")
+        if value is None:
+            record[target].pop(field, None) if target != "record" else record.pop(field, None)
+        elif target == "record":
+            record[field] = value
+        else:
+            record[target][field] = value
+
+    return record
+
+
+RECORD_VARIANTS = {
+    "base": {},
+    "lang_dois": {"article__v337": [{"l": "en", "d": "10.1590/S0101-01012024000100001.en"}, {"l": "pt", "d": "10.1590/S0101-01012024000100001"}, {"l": "es", "d": "invalid"}]},
+    "lang_dois_only": {"article__v237": None, "article__v337": [{"l": "en", "d": "https://doi.org/10.1590/ABC"}]},
+    "top_level_doi": {"article__v237": None, "record__doi": "10.1590/TOP"},
+    "invalid_doi": {"article__v237": [{"_": "not a doi"}]},
+    "v992_collection": {"record__collection": None, "article__v992": [{"_": "mex"}]},
+    "title_v992_collection": {"record__collection": None, "title__v992": "cub"},
+    "unknown_doc_type": {"article__v71": [{"_": "zz"}]},
+    "missing_doc_type": {"article__v71": None},
+    "electronic_v935": {"title__v35": [{"_": "ONLIN"}], "title__v935": [{"_": "1111-1111"}]},
+    "print_v935_same": {"title__v935": [{"_": "0101-0101"}]},
+    "v435": {"title__v435": [{"t": "PRINT", "_": "2222-2222"}, {"t": "ONLIN", "_": "3333-3333 "}]},
+    "no_journal_title": {"title__v100": None},
+    "no_titles": {"article__v12": None},
+}
+
+
+class TestArticleMetaExtractor(unittest.TestCase):
+    def test_parity_with_xylose(self):
+        for name, overrides in RECORD_VARIANTS.items():
+            with self.subTest(name):
+                record = make_record(**overrides)
+                self.assertEqual(diff_docs(extract_article_doc(record, 2024), _transform_with_xylose(record, 2024)), {})
+
+    def test_extracted_fields(self):
+        doc = extract_article_doc(make_record(**RECORD_VARIANTS["v435"]), 2024)
+        self.assertEqual(doc["doi"], "10.1590/s0101-01012024000100001")
+        self.assertEqual(doc["doi_with_lang"], {"pt": "10.1590/s0101-01012024000100001"})
+        self.assertEqual(doc["titles"], ["titulo&subtitulodoartigo", "titulodelarticulo"])
+        self.assertEqual(doc["document_type"], "research-article")
+        self.assertEqual(doc["journal_title"], "Revista de Teste")
+        self.assertEqual(doc["journal_issns"], ["0101-0101", "2222-2222", "3333-3333"])
+
+        self.assertIsNone(extract_article_doc(make_record(**RECORD_VARIANTS["invalid_doi"]), 2024))
+
+    def test_diff_docs(self):
+        doc = extract_article_doc(make_record(), 2024)
+        other = dict(doc, journal_title="Other")
+        self.assertEqual(diff_docs(doc, other), {"journal_title": ("Revista de Teste", "Other")})
+        self.assertEqual(diff_docs(doc, None), {"document": (True, False)})
+        self.assertEqual(diff_docs(None, None), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,261 @@
+from pathlib import Path
+
+import gzip
+import orjson
+import pandas as pd
+import pyarrow as pa
+import pytest
+import shutil
+
+from oca_metrics.preparation import extract
+from oca_metrics.preparation.openalex_fields import (
+    OPENALEX_FIELDS,
+    FieldSpec,
+    compile_extractor,
+)
+from oca_metrics.preparation.extract import (
+    compact_extraction,
+    decode_work,
+    load_processed_dates,
+    load_processed_ids,
+    process_chunk,
+    run_extraction,
+)
+from oca_metrics.utils.normalization import stz_doi
+from oca_metrics.utils.parquet import list_parquet_files
+
+
+FIXTURE = Path(__file__).parent / "fixtures/openalex/sample.jsonl.gz"
+
+
+def _fixture_lines():
+    with gzip.open(FIXTURE, "rb") as f:
+        return f.readlines()
+
+
+def test_process_chunk_schema_decoding_matches_full_parse(monkeypatch):
+    lines = _fixture_lines()
+    fast = process_chunk(lines, 2010, 2025)
+
+    extractor = compile_extractor(OPENALEX_FIELDS)
+    monkeypatch.setattr(extract, "compile_extractor", lambda fields: extractor._replace(decoder=None))
+    full = process_chunk(lines, 2010, 2025)
+
+    assert len(fast) == 50
+    assert fast == full
+    assert all(r["doi_stz"] == stz_doi(r["doi"]) for r in fast)
+
+
+def test_process_chunk_rejects_non_articles_before_parsing():
+    lines = [
+        orjson.dumps({"id": "W1", "type": "book", "title": "An \"article\" about books", "publication_year": 2020}),
+        b"not json at all",
+    ]
+    assert process_chunk(lines, 2010, 2025) == []
+
+
+def test_decode_work_falls_back_when_line_does_not_fit_schema():
+    decoder = compile_extractor(OPENALEX_FIELDS).decoder
+    if decoder is None:
+        pytest.skip("msgspec is not installed")
+
+    src, typed = decode_work(orjson.dumps({"id": "W1", "type": "article", "language": 5, "authorships": [{"x": 1}]}), decoder)
+    assert not typed
+    assert src["language"] == 5
+    assert "authorships" in src
+
+    src, typed = decode_work(orjson.dumps({"id": "W1", "type": "article", "authorships": [{"x": 1}]}), decoder)
+    assert typed
+    assert "authorships" not in src
+
+
+def test_process_chunk_coerces_values_outside_the_spec_types():
+    work = orjson.loads(_fixture_lines()[0])
+    work["language"] = 5
+    work["publication_year"] = 2020
+
+    [res] = process_chunk([orjson.dumps(work)], 2010, 2025)
+    assert res["language"] == "5"
+
+
+def test_custom_field_spec_adds_columns():
+    fields = OPENALEX_FIELDS + (
+        FieldSpec("title", "work.title"),
+        FieldSpec("source_name", "journal.display_name"),
+        FieldSpec("citations_window_1y", type="int", derive="citation_window(counts, pub_year, 1)"),
+    )
+    extractor = compile_extractor(fields)
+    assert extractor.schema.field("title").type == pa.string()
+    assert extractor.schema.field("citations_window_1y").type == pa.int64()
+
+    lines = _fixture_lines()
+    work = orjson.loads(lines[0])
+    [res] = process_chunk(lines[:1], 2010, 2025, fields)
+    assert res["title"] == work["title"]
+    assert res["source_name"] == work["primary_location"]["source"]["display_name"]
+    assert res["citations_window_1y"] == sum(
+        c["cited_by_count"] for c in work["counts_by_year"] if c["year"] == work["publication_year"] + 1
+    )
+
+
+def test_compile_extractor_rejects_invalid_specs():
+    with pytest.raises(ValueError):
+        compile_extractor((FieldSpec("doi", "work.doi"), FieldSpec("doi", "work.ids.doi")))
+
+    with pytest.raises(ValueError):
+        compile_extractor((FieldSpec("title", "authorships.title"),))
+
+    with pytest.raises(ValueError):
+        compile_extractor((FieldSpec("counts", "work.counts"),))
+
+
+def _prepare_snapshot(tmp_path, dates=("2024-01-01",)):
+    base_dir = tmp_path / "oa_input"
+    for date_str in dates:
+        folder = base_dir / f"updated_date={date_str}"
+        folder.mkdir(parents=True)
+        shutil.copy(FIXTURE, folder / "part_000.gz")
+
+    return base_dir
+
+
+def test_run_extraction_flat_layout(tmp_path):
+    base_dir = _prepare_snapshot(tmp_path)
+    output_dir = tmp_path / "oa_parquet"
+
+    run_extraction(base_dir, output_dir, start_year=2010, end_year=2025, num_cores=1)
+
+    files = sorted(output_dir.glob("*.parquet"))
+    assert [f.name for f in files] == ["metrics_2024-01-01_part_0.parquet"]
+    assert len(pd.read_parquet(files[0])) == 50
+
+
+def test_run_extraction_partitioned_by_year(tmp_path):
+    base_dir = _prepare_snapshot(tmp_path)
+    output_dir = tmp_path / "oa_parquet"
+
+    run_extraction(base_dir, output_dir, start_year=2010, end_year=2025, num_cores=1, partition_by_year=True)
+
+    partitions = sorted(p.name for p in output_dir.iterdir() if p.is_dir())
+    assert partitions == ["publication_year=2019", "publication_year=2020", "publication_year=2021"]
+
+    df_2020 = pd.read_parquet(output_dir / "publication_year=2020" / "metrics_2024-01-01_part_0.parquet")
+    assert len(df_2020) == 21
+    assert set(df_2020["publication_year"]) == {2020}
+
+    assert len(load_processed_ids(output_dir)) == 50
+
+    # A second run finds the partitioned files and skips the date folder
+    run_extraction(base_dir, output_dir, start_year=2010, end_year=2025, num_cores=1, partition_by_year=True)
+    assert len(list(output_dir.rglob("*.parquet"))) == 3
+
+
+def _write_snapshot_part(folder, works):
+    folder.mkdir(parents=True)
+    with gzip.open(folder / "part_000.gz", "wb") as f:
+        for work in works:
+            f.write(orjson.dumps(work) + b"\n")
+
+
+def test_incremental_extraction_latest_version_wins(tmp_path):
+    with gzip.open(FIXTURE, "rb") as f:
+        works = [orjson.loads(line) for line in f]
+
+    base_dir = tmp_path / "oa_input"
+    output_dir = tmp_path / "oa_parquet"
+    _write_snapshot_part(base_dir / "updated_date=2024-01-01", works)
+
+    run_extraction(base_dir, output_dir, start_year=2010, end_year=2025, num_cores=1, partition_by_year=True, incremental=True)
+    assert load_processed_dates(output_dir) == {"2024-01-01"}
+
+    # Monthly refresh: one work got more citations, another moved to a different year
+    updated = [dict(works[0], cited_by_count=999), dict(works[1], publication_year=2018)]
+    _write_snapshot_part(base_dir / "updated_date=2024-02-01", updated)
+
+    run_extraction(base_dir, output_dir, start_year=2010, end_year=2025, num_cores=1, partition_by_year=True, incremental=True)
+    assert load_processed_dates(output_dir) == {"2024-01-01", "2024-02-01"}
+
+    df = pd.concat([pd.read_parquet(p) for p in list_parquet_files(output_dir)], ignore_index=True)
+    assert len(df) == 50
+    assert df["work_id"].is_unique
+    assert df.set_index("work_id").loc[works[0]["id"], "citations_total"] == 999
+    assert df.set_index("work_id").loc[works[1]["id"], "publication_year"] == 2018
+
+    # Nothing new to extract: the second folder is not read again
+    files_before = sorted(p.name for p in output_dir.rglob("*.parquet"))
+    run_extraction(base_dir, output_dir, start_year=2010, end_year=2025, num_cores=1, partition_by_year=True, incremental=True)
+    assert sorted(p.name for p in output_dir.rglob("*.parquet")) == files_before
+
+
+def test_incremental_extraction_retracts_works_filtered_out(tmp_path):
+    with gzip.open(FIXTURE, "rb") as f:
+        works = [orjson.loads(line) for line in f]
+
+    base_dir = tmp_path / "oa_input"
+    output_dir = tmp_path / "oa_parquet"
+    _write_snapshot_part(base_dir / "updated_date=2024-01-01", works)
+    run_extraction(base_dir, output_dir, start_year=2010, end_year=2025, num_cores=1, partition_by_year=True, incremental=True)
+
+    # The newest version of one work is no longer an article, so it writes no row
+    _write_snapshot_part(base_dir / "updated_date=2024-02-01", [dict(works[0], type="preprint")])
+    run_extraction(base_dir, output_dir, start_year=2010, end_year=2025, num_cores=1, partition_by_year=True, incremental=True)
+
+    assert [p.name for p in output_dir.glob("tombstones_*.arrow")] == ["tombstones_2024-02-01_part_0.arrow"]
+
+    df = pd.concat([pd.read_parquet(p) for p in list_parquet_files(output_dir)], ignore_index=True)
+    assert len(df) == 49
+    assert works[0]["id"] not in set(df["work_id"])
+
+
+def test_process_chunk_returns_rejected_ids():
+    lines = _fixture_lines()
+    work = orjson.loads(lines[0])
+    rejected_lines = [orjson.dumps(dict(work, type="preprint")), orjson.dumps(dict(work, id="https://openalex.org/W1", publication_year=1900))]
+
+    results, rejected = process_chunk(lines + rejected_lines, 2010, 2025, return_rejected=True)
+
+    assert len(results) == 50
+    assert rejected == [work["id"], "https://openalex.org/W1"]
+
+
+def test_compact_extraction_keeps_newest_version(tmp_path):
+    pd.DataFrame({"work_id": ["W1", "W2"], "citations_total": [1, 2]}).to_parquet(tmp_path / "metrics_2024-01-01_part_0.parquet")
+    pd.DataFrame({"work_id": ["W1"], "citations_total": [10]}).to_parquet(tmp_path / "metrics_2024-02-01_part_0.parquet")
+
+    assert compact_extraction(tmp_path) == 1
+
+    df = pd.read_parquet(tmp_path / "metrics_2024-01-01_part_0.parquet")
+    assert df["work_id"].tolist() == ["W2"]
+
+
+def test_compact_extraction_reads_only_files_holding_new_works(tmp_path, monkeypatch):
+    with gzip.open(FIXTURE, "rb") as f:
+        works = [orjson.loads(line) for line in f]
+
+    base_dir = tmp_path / "oa_input"
+    output_dir = tmp_path / "oa_parquet"
+    _write_snapshot_part(base_dir / "updated_date=2024-01-01", works)
+    run_extraction(base_dir, output_dir, start_year=2010, end_year=2025, num_cores=1, partition_by_year=True, incremental=True)
+    assert all(p.with_suffix(".work_ids.npy").exists() for p in list_parquet_files(output_dir))
+
+    old_file = next(p for p in list_parquet_files(output_dir) if works[1]["id"] in pd.read_parquet(p)["work_id"].tolist())
+
+    _write_snapshot_part(base_dir / "updated_date=2024-02-01", [dict(works[1], publication_year=2018)])
+    read_paths = []
+    read_table = extract.pq.read_table
+
+    def recording_read_table(source, *args, **kwargs):
+        if isinstance(source, (str, Path)):
+            read_paths.append(Path(source))
+        return read_table(source, *args, **kwargs)
+
+    monkeypatch.setattr(extract.pq, "read_table", recording_read_table)
+    run_extraction(base_dir, output_dir, start_year=2010, end_year=2025, num_cores=1, partition_by_year=True, incremental=True)
+
+    assert {p.name for p in read_paths} <= {"metrics_2024-01-01_part_0.parquet", "metrics_2024-02-01_part_0.parquet"}
+    assert len(list(output_dir.rglob("metrics_2024-01-01_*.parquet"))) > 1
+    assert {p.parent for p in read_paths if p.name.startswith("metrics_2024-01-01")} == {old_file.parent}
+
+    df = pd.concat([pd.read_parquet(p) for p in list_parquet_files(output_dir)], ignore_index=True)
+    assert len(df) == 50
+    assert df.set_index("work_id").loc[works[1]["id"], "publication_year"] == 2018
@@ -1,11 +1,27 @@
+from unittest import mock
+
+import json
 import pandas as pd
 import pathlib
 import unittest
 
+from oca_metrics.preparation import integration
+
 from oca_metrics.preparation.integration import (
+    _files_by_year,
+    _get_scl_doi_table,
+    _match_openalex_works,
+    _scl_doi_table_from_columns,
+    integrate_scielo_columns,
+    integrate_scielo_openalex,
+    integrate_scielo_parallel,
     match_scielo_with_openalex,
     generate_merged_parquet,
 )
+from oca_metrics.preparation.scielo_io import (
+    read_scielo_columns,
+    write_merged_scielo,
+)
 
 
 class TestIntegration(unittest.TestCase):
@@ -106,11 +122,436 @@ class TestIntegration(unittest.TestCase):
         self.assertEqual(merged_row['citations_total'], 15)
         self.assertIn('https://openalex.org/W1', merged_row['all_work_ids'])
         self.assertIn('https://openalex.org/W2', merged_row['all_work_ids'])
+        self.assertEqual(
+            [(w['work_id'], w['language'], w['total_citations'], w['citations_2024']) for w in merged_row['oa_individual_works']],
+            [('https://openalex.org/W1', 'en', 10, 1), ('https://openalex.org/W2', 'pt', 5, 1)],
+        )
         
         # Check SciELO record without match
         unmatched_scl = df_final[df_final['work_id'] == 'scielo:S0002'].iloc[0]
         self.assertEqual(unmatched_scl['citations_total'], 0)
         self.assertEqual(unmatched_scl['publication_year'], 2024)
 
+    def test_integration_prunes_year_partitions(self):
+        partitioned_dir = self.tmp_dir / "oa_partitioned"
+        df_oa = pd.read_parquet(self.oa_parquet_dir / "oa.parquet")
+
+        (partitioned_dir / "publication_year=2024").mkdir(parents=True)
+        df_oa.to_parquet(partitioned_dir / "publication_year=2024" / "part_0.parquet")
+
+        df_old = df_oa.copy()
+        df_old["work_id"] = ["https://openalex.org/W91", "https://openalex.org/W92", "https://openalex.org/W93"]
+        df_old["publication_year"] = 2019
+        (partitioned_dir / "publication_year=2019").mkdir(parents=True)
+        df_old.to_parquet(partitioned_dir / "publication_year=2019" / "part_0.parquet")
+
+        scl_oa_merged, unified_schema = match_scielo_with_openalex(
+            self.scl_docs,
+            str(partitioned_dir),
+            start_year=2024,
+            end_year=2024,
+        )
+        self.assertEqual(len(scl_oa_merged[0]['oa_metrics']['work_ids']), 2)
+
+        generate_merged_parquet(
+            scl_oa_merged,
+            str(partitioned_dir),
+            str(self.output_parquet),
+            unified_schema,
+            start_year=2024,
+            end_year=2024,
+        )
+        df_final = pd.read_parquet(self.output_parquet)
+        self.assertEqual(len(df_final), 3)
+        self.assertEqual(set(df_final['publication_year']), {2024})
+
+
+    def test_default_years_keep_works_outside_match_range(self):
+        # A 2010 work with the DOI of article 2: outside the default match range, but still part of the dataset
+        df_old = pd.read_parquet(self.oa_parquet_dir / "oa.parquet").head(1).copy()
+        df_old["work_id"] = ["https://openalex.org/W10"]
+        df_old["doi"] = ["https://doi.org/10.1001/999"]
+        df_old["publication_year"] = 2010
+        df_old.to_parquet(self.oa_parquet_dir / "oa_old.parquet")
+
+        scl_oa_merged, unified_schema = match_scielo_with_openalex(self.scl_docs, str(self.oa_parquet_dir))
+        self.assertFalse(scl_oa_merged[1]['has_oa_match'])
+
+        generate_merged_parquet(scl_oa_merged, str(self.oa_parquet_dir), str(self.output_parquet), unified_schema)
+        expected = pd.read_parquet(self.output_parquet).sort_values("work_id").reset_index(drop=True)
+        self.assertIn("https://openalex.org/W10", set(expected["work_id"]))
+
+        single_pass_output = self.tmp_dir / "single_pass.parquet"
+        integrate_scielo_openalex(self.scl_docs, str(self.oa_parquet_dir), str(single_pass_output), work_dir=str(self.tmp_dir))
+        actual = pd.read_parquet(single_pass_output).sort_values("work_id").reset_index(drop=True)
+        pd.testing.assert_frame_equal(actual, expected)
+
+        scielo_path = self.tmp_dir / "scielo.jsonl"
+        write_merged_scielo([self.scl_docs], scielo_path)
+        streaming_output = self.tmp_dir / "streaming.parquet"
+        integrate_scielo_columns(read_scielo_columns(scielo_path), str(self.oa_parquet_dir), str(streaming_output))
+        actual = pd.read_parquet(streaming_output).sort_values("work_id").reset_index(drop=True)
+        pd.testing.assert_frame_equal(actual, expected)
+
+    def test_match_uses_precomputed_doi_stz_with_mixed_files(self):
+        df_new = pd.read_parquet(self.oa_parquet_dir / "oa.parquet").head(1).copy()
+        df_new["work_id"] = ["https://openalex.org/W4"]
+        df_new["doi"] = ["https://doi.org/10.1001/999"]
+        df_new["doi_stz"] = ["10.1001/999"]
+        df_new.to_parquet(self.oa_parquet_dir / "oa_new.parquet")
+
+        scl_oa_merged, unified_schema = match_scielo_with_openalex(self.scl_docs, str(self.oa_parquet_dir), start_year=2020)
+
+        self.assertIn("doi_stz", unified_schema.names)
+        # W1/W2 come from the file without doi_stz, W4 from the one with it
+        self.assertEqual(len(scl_oa_merged[0]['oa_metrics']['work_ids']), 2)
+        self.assertEqual(scl_oa_merged[1]['oa_metrics']['work_ids'], ["https://openalex.org/W4"])
+
+    def test_match_table_is_columnar_and_deduplicated(self):
+        scl_docs = self.scl_docs + [{'collection': ['scl'], 'pid_v2': ['S0003'], 'doi': '10.1001/2', 'doi_with_lang': {}}]
+        scl_dois = _get_scl_doi_table(scl_docs)
+        # A DOI shared by two articles belongs to the last one
+        self.assertEqual(
+            sorted(zip(scl_dois["doi"].to_pylist(), scl_dois["scl_idx"].to_pylist())),
+            [("10.1001/1", 0), ("10.1001/2", 2), ("10.1001/999", 1)],
+        )
+
+        # The same work read twice keeps its last row
+        df_dup = pd.read_parquet(self.oa_parquet_dir / "oa.parquet").head(1).copy()
+        df_dup["citations_total"] = [99]
+        df_dup.to_parquet(self.oa_parquet_dir / "oa_z.parquet")
+
+        files = sorted(self.oa_parquet_dir.glob("*.parquet"))
+        matches = _match_openalex_works(files, scl_dois, ["work_id", "doi", "publication_year", "citations_total"], 2020, 2024)
+        self.assertEqual(matches.column_names, ["scl_idx", "work_id", "doi", "publication_year", "citations_total"])
+        self.assertEqual(matches["scl_idx"].to_pylist(), [0, 2])
+        self.assertEqual(matches["work_id"].to_pylist(), ["https://openalex.org/W1", "https://openalex.org/W2"])
+        self.assertEqual(matches["citations_total"].to_pylist(), [99, 5])
+
+    def test_merged_parquet_consolidates_across_batches(self):
+        # W2 is read first (another file), so it carries the consolidated row of the W1/W2 article
+        df_oa = pd.read_parquet(self.oa_parquet_dir / "oa.parquet")
+        (self.oa_parquet_dir / "oa.parquet").unlink()
+        df_oa.iloc[[1]].to_parquet(self.oa_parquet_dir / "a.parquet")
+        df_w3 = df_oa.iloc[[0, 2]].copy()
+        df_w3["citations_2024"] = [None, None]
+        df_w3.to_parquet(self.oa_parquet_dir / "b.parquet")
+
+        scl_oa_merged, unified_schema = match_scielo_with_openalex(self.scl_docs, str(self.oa_parquet_dir), start_year=2020)
+        generate_merged_parquet(scl_oa_merged, str(self.oa_parquet_dir), str(self.output_parquet), unified_schema)
+
+        rows = pd.read_parquet(self.output_parquet).set_index("work_id")
+        self.assertEqual(list(rows.index), ["https://openalex.org/W2", "https://openalex.org/W3", "scielo:S0002"])
+
+        merged = rows.loc["https://openalex.org/W2"]
+        self.assertEqual(merged["citations_total"], 15)
+        self.assertEqual(merged["citations_2024"], 1)
+        self.assertEqual(list(merged["all_work_ids"]), ["https://openalex.org/W1", "https://openalex.org/W2"])
+        self.assertEqual(list(merged["scielo_pid_v2"]), ["S0001"])
+        self.assertTrue(merged["is_merged"])
+
+        unmatched = rows.loc["https://openalex.org/W3"]
+        self.assertEqual(list(unmatched["all_work_ids"]), ["https://openalex.org/W3"])
+        self.assertEqual(unmatched["citations_2024"], 0)
+        self.assertFalse(unmatched["is_merged"])
+        self.assertTrue(pd.isna(unmatched["oa_individual_works"]))
+
+    def test_single_pass_matches_two_pass(self):
+        df_new = pd.read_parquet(self.oa_parquet_dir / "oa.parquet").head(1).copy()
+        df_new["work_id"] = ["https://openalex.org/W4"]
+        df_new["doi"] = ["https://doi.org/10.1001/999"]
+        df_new["doi_stz"] = ["10.1001/999"]
+        df_new.to_parquet(self.oa_parquet_dir / "oa_new.parquet")
+
+        scl_oa_merged, unified_schema = match_scielo_with_openalex(self.scl_docs, str(self.oa_parquet_dir), start_year=2020)
+        generate_merged_parquet(scl_oa_merged, str(self.oa_parquet_dir), str(self.output_parquet), unified_schema, start_year=2020)
+        expected = pd.read_parquet(self.output_parquet).sort_values("work_id").reset_index(drop=True)
+
+        single_pass_output = self.tmp_dir / "single_pass.parquet"
+        # A side store of one row spills every matched row to its own fragment
+        single_pass_merged = integrate_scielo_openalex(
+            self.scl_docs, str(self.oa_parquet_dir), str(single_pass_output), start_year=2020, work_dir=str(self.tmp_dir), max_buffered_rows=1,
+        )
+        actual = pd.read_parquet(single_pass_output).sort_values("work_id").reset_index(drop=True)
+
+        self.assertEqual(single_pass_merged, scl_oa_merged)
+        pd.testing.assert_frame_equal(actual, expected)
+        self.assertEqual([p.name for p in self.tmp_dir.iterdir() if p.name.startswith("oca_integrate_")], [])
+
+    def test_streaming_matches_two_pass(self):
+        scl_oa_merged, unified_schema = match_scielo_with_openalex(self.scl_docs, str(self.oa_parquet_dir), start_year=2020)
+        generate_merged_parquet(scl_oa_merged, str(self.oa_parquet_dir), str(self.output_parquet), unified_schema, start_year=2020)
+        expected = pd.read_parquet(self.output_parquet)
+
+        scielo_path = self.tmp_dir / "scielo.jsonl"
+        write_merged_scielo([self.scl_docs], scielo_path)
+        scl_table = read_scielo_columns(scielo_path, start_year=2020, batch_size=1)
+        self.assertEqual(
+            _scl_doi_table_from_columns(scl_table).sort_by("doi").to_pylist(),
+            _get_scl_doi_table(self.scl_docs).sort_by("doi").to_pylist(),
+        )
+
+        streaming_output = self.tmp_dir / "streaming.parquet"
+        stats = integrate_scielo_columns(scl_table, str(self.oa_parquet_dir), str(streaming_output), start_year=2020)
+
+        self.assertEqual(stats, {
+            "scielo_articles": 2,
+            "matched_articles": 1,
+            "matches": 2,
+            "match_keys": {"doi": {"articles": 1, "rate": 0.5, "available": True}},
+        })
+        pd.testing.assert_frame_equal(pd.read_parquet(streaming_output), expected)
+
+    def test_individual_works_json_on_request(self):
+        scl_oa_merged, unified_schema = match_scielo_with_openalex(self.scl_docs, str(self.oa_parquet_dir), start_year=2020)
+        generate_merged_parquet(
+            scl_oa_merged, str(self.oa_parquet_dir), str(self.output_parquet), unified_schema, start_year=2020, individual_works_json=True,
+        )
+
+        df_final = pd.read_parquet(self.output_parquet)
+        merged_row = df_final[df_final['is_merged'] == True].iloc[0]
+        self.assertEqual(
+            json.loads(merged_row['oa_individual_works']),
+            scl_oa_merged[0]['oa_metrics']['individual_works'],
+        )
+
+    def test_parallel_years_match_two_pass(self):
+        # W1 (2024) and W2 (2023) of article 1 fall in different year partitions
+        df_oa = pd.read_parquet(self.oa_parquet_dir / "oa.parquet")
+        df_oa.loc[1, "publication_year"] = 2023
+        (self.oa_parquet_dir / "oa.parquet").unlink()
+        for year, df_year in df_oa.groupby("publication_year"):
+            partition = self.oa_parquet_dir / f"publication_year={year}"
+            partition.mkdir()
+            df_year.reset_index(drop=True).to_parquet(partition / "oa.parquet")
+
+        scl_oa_merged, unified_schema = match_scielo_with_openalex(self.scl_docs, str(self.oa_parquet_dir), start_year=2022, end_year=2024)
+        generate_merged_parquet(scl_oa_merged, str(self.oa_parquet_dir), str(self.output_parquet), unified_schema, start_year=2022, end_year=2024)
+        expected = pd.read_parquet(self.output_parquet).sort_values("work_id").reset_index(drop=True)
+
+        scielo_path = self.tmp_dir / "scielo.jsonl"
+        write_merged_scielo([self.scl_docs], scielo_path)
+        output_dir = self.tmp_dir / "parallel"
+        manifest = integrate_scielo_parallel(
+            read_scielo_columns(scielo_path), str(self.oa_parquet_dir), str(output_dir),
+            start_year=2022, end_year=2024, num_workers=2, work_dir=str(self.tmp_dir),
+        )
+
+        self.assertEqual(
+            [(f["path"], f["rows"]) for f in manifest["fragments"]],
+            # The consolidated record keeps the first member row read (W2, in the 2023 partition)
+            [("merged_2023.parquet", 1), ("merged_2024.parquet", 1), ("merged_scielo_unmatched.parquet", 1)],
+        )
+        self.assertEqual(manifest["cross_year_groups"], 1)
+        self.assertEqual(json.loads((output_dir / "integration_manifest.json").read_text())["rows"], 3)
+
+        actual = pd.concat([pd.read_parquet(output_dir / f["path"]) for f in manifest["fragments"]])
+        pd.testing.assert_frame_equal(actual.sort_values("work_id").reset_index(drop=True), expected)
+
+    def test_parallel_buckets_flat_files_by_year_statistics(self):
+        df_oa = pd.read_parquet(self.oa_parquet_dir / "oa.parquet")
+        df_oa.loc[1, "publication_year"] = 2023
+        (self.oa_parquet_dir / "oa.parquet").unlink()
+        df_oa.iloc[[0]].to_parquet(self.oa_parquet_dir / "a_2024.parquet")
+        df_oa.iloc[[1, 2]].to_parquet(self.oa_parquet_dir / "b_2023_2024.parquet")
+
+        files = sorted(self.oa_parquet_dir.glob("*.parquet"))
+        year_files = _files_by_year(self.oa_parquet_dir, files, 2022, 2024)
+        self.assertEqual({y: [pathlib.Path(f).name for f in fs] for y, fs in year_files.items()}, {
+            2022: [],
+            2023: ["b_2023_2024.parquet"],
+            2024: ["a_2024.parquet", "b_2023_2024.parquet"],
+        })
+
+        scl_oa_merged, unified_schema = match_scielo_with_openalex(self.scl_docs, str(self.oa_parquet_dir), start_year=2022, end_year=2024)
+        generate_merged_parquet(scl_oa_merged, str(self.oa_parquet_dir), str(self.output_parquet), unified_schema, start_year=2022, end_year=2024)
+        expected = pd.read_parquet(self.output_parquet).sort_values("work_id").reset_index(drop=True)
+
+        scielo_path = self.tmp_dir / "scielo.jsonl"
+        write_merged_scielo([self.scl_docs], scielo_path)
+        output_dir = self.tmp_dir / "parallel"
+        manifest = integrate_scielo_parallel(
+            read_scielo_columns(scielo_path), str(self.oa_parquet_dir), str(output_dir),
+            start_year=2022, end_year=2024, num_workers=1, work_dir=str(self.tmp_dir),
+        )
+        actual = pd.concat([pd.read_parquet(output_dir / f["path"]) for f in manifest["fragments"]])
+        pd.testing.assert_frame_equal(actual.sort_values("work_id").reset_index(drop=True), expected)
+
+    def test_parallel_without_files_in_range_writes_scielo_articles(self):
+        # The flat file only holds 2024 works, outside the range
+        scl_docs = [dict(d, publication_year=2020) for d in self.scl_docs]
+        scielo_path = self.tmp_dir / "scielo.jsonl"
+        write_merged_scielo([scl_docs], scielo_path)
+
+        output_dir = self.tmp_dir / "parallel"
+        manifest = integrate_scielo_parallel(
+            read_scielo_columns(scielo_path), str(self.oa_parquet_dir), str(output_dir),
+            start_year=2020, end_year=2022, num_workers=1, work_dir=str(self.tmp_dir),
+        )
+
+        self.assertEqual(manifest["matches"], 0)
+        self.assertEqual([f["publication_year"] for f in manifest["fragments"]], [None])
+        actual = pd.read_parquet(output_dir / manifest["fragments"][0]["path"])
+        self.assertEqual(sorted(actual["work_id"]), ["scielo:S0001", "scielo:S0002"])
+
+    def test_incremental_parallel_rebuilds_affected_years(self):
+        # W4 (2022) is not matched; W1 (2024) and W2 (2023) are consolidated in the 2023 fragment
+        df_oa = pd.read_parquet(self.oa_parquet_dir / "oa.parquet")
+        df_oa.loc[1, "publication_year"] = 2023
+        df_extra = df_oa.iloc[[2]].assign(work_id="https://openalex.org/W4", publication_year=2022)
+        df_oa = pd.concat([df_oa, df_extra], ignore_index=True)
+        (self.oa_parquet_dir / "oa.parquet").unlink()
+        for year, df_year in df_oa.groupby("publication_year"):
+            (self.oa_parquet_dir / f"publication_year={year}").mkdir()
+            df_year.reset_index(drop=True).to_parquet(self.oa_parquet_dir / f"publication_year={year}" / "oa.parquet")
+
+        output_dir = self.tmp_dir / "incremental"
+        state_dir = self.tmp_dir / "state"
+
+        # A file of the user that only looks like a fragment
+        output_dir.mkdir()
+        user_file = output_dir / "merged_notes.parquet"
+        pd.DataFrame({"note": ["keep"]}).to_parquet(user_file)
+
+        def run_incremental(scl_docs):
+            scielo_path = self.tmp_dir / "scielo.jsonl"
+            write_merged_scielo([scl_docs], scielo_path)
+            return integrate_scielo_parallel(
+                read_scielo_columns(scielo_path), str(self.oa_parquet_dir), str(output_dir),
+                start_year=2022, end_year=2024, num_workers=1, state_dir=str(state_dir),
+            )
+
+        def assert_matches_two_pass(manifest, scl_docs):
+            scl_oa_merged, unified_schema = match_scielo_with_openalex(scl_docs, str(self.oa_parquet_dir), start_year=2022, end_year=2024)
+            generate_merged_parquet(scl_oa_merged, str(self.oa_parquet_dir), str(self.output_parquet), unified_schema, start_year=2022, end_year=2024)
+            expected = pd.read_parquet(self.output_parquet).sort_values("work_id").reset_index(drop=True)
+
+            actual = pd.concat([pd.read_parquet(output_dir / f["path"]) for f in manifest["fragments"]])
+            pd.testing.assert_frame_equal(actual.sort_values("work_id").reset_index(drop=True), expected)
+            fragment_files = sorted(p.name for p in output_dir.glob("merged_*.parquet") if p != user_file)
+            self.assertEqual(fragment_files, sorted(f["path"] for f in manifest["fragments"]))
+
+        self.assertEqual(run_incremental(self.scl_docs)["rebuilt_years"], [2022, 2023, 2024])
+        manifest = run_incremental(self.scl_docs)
+        self.assertEqual(manifest["rebuilt_years"], [])
+        assert_matches_two_pass(manifest, self.scl_docs)
+
+        # New citations of the unmatched 2022 work only affect its year
+        df_2022 = pd.read_parquet(self.oa_parquet_dir / "publication_year=2022" / "oa.parquet")
+        df_2022["citations_total"] = 20
+        df_2022.to_parquet(self.oa_parquet_dir / "publication_year=2022" / "oa.parquet")
+        manifest = run_incremental(self.scl_docs)
+        self.assertEqual(manifest["rebuilt_years"], [2022])
+        assert_matches_two_pass(manifest, self.scl_docs)
+
+        # Without its Portuguese DOI, article 1 no longer consolidates W2: both of its years change, 2022 does not
+        scl_docs = [dict(self.scl_docs[0], doi_with_lang={"en": "10.1001/1"}), self.scl_docs[1]]
+        manifest = run_incremental(scl_docs)
+        self.assertEqual(manifest["rebuilt_years"], [2023, 2024])
+        assert_matches_two_pass(manifest, scl_docs)
+        self.assertTrue(user_file.exists())
+
+    def test_checkpointed_generate_resumes_after_failure(self):
+        # One work per file, so that each file is a committed fragment
+        df_oa = pd.read_parquet(self.oa_parquet_dir / "oa.parquet")
+        (self.oa_parquet_dir / "oa.parquet").unlink()
+        for i in range(len(df_oa)):
+            df_oa.iloc[[i]].reset_index(drop=True).to_parquet(self.oa_parquet_dir / f"oa_{i}.parquet")
+
+        scl_oa_merged, unified_schema = match_scielo_with_openalex(self.scl_docs, str(self.oa_parquet_dir), start_year=2020)
+        generate_merged_parquet(scl_oa_merged, str(self.oa_parquet_dir), str(self.output_parquet), unified_schema)
+        expected = pd.read_parquet(self.output_parquet)
+
+        checkpoint_dir = self.tmp_dir / "checkpoint"
+        output_file = self.tmp_dir / "checkpointed.parquet"
+        consolidate_batch = integration._consolidate_batch
+        calls = []
+
+        def failing_consolidate_batch(*args):
+            calls.append(1)
+            if len(calls) == 3:
+                raise RuntimeError("interrupted")
+            return consolidate_batch(*args)
+
+        with mock.patch.object(integration, "CHECKPOINT_FRAGMENT_ROWS", 1):
+            with mock.patch.object(integration, "_consolidate_batch", failing_consolidate_batch):
+                with self.assertRaises(RuntimeError):
+                    generate_merged_parquet(scl_oa_merged, str(self.oa_parquet_dir), str(output_file), unified_schema, checkpoint_dir=str(checkpoint_dir))
+
+            progress = json.loads((checkpoint_dir / "generate_progress.json").read_text())
+            # W1 was committed with its consolidated row; W2 (same survivor) was read but not committed
+            self.assertEqual([f["rows"] for f in progress["fragments"]], [1])
+            self.assertEqual(progress["position"], {"file": 0, "batch": 1})
+            self.assertFalse(output_file.exists())
+
+            generate_merged_parquet(scl_oa_merged, str(self.oa_parquet_dir), str(output_file), unified_schema, checkpoint_dir=str(checkpoint_dir), resume=True)
+
+        pd.testing.assert_frame_equal(pd.read_parquet(output_file), expected)
+        self.assertEqual(list(checkpoint_dir.iterdir()), [])
+
+    def test_secondary_match_keys_cascade(self):
+        df_oa = pd.read_parquet(self.oa_parquet_dir / "oa.parquet")
+        df_oa["title_stz"] = ["title2", None, None]
+        df_oa["journal_issn_l"] = "1234-5678"
+        df_extra = pd.DataFrame({
+            "work_id": [f"https://openalex.org/W{i}" for i in (4, 6, 7)],
+            "doi": None,
+            # W1 (already matched by DOI) shares W4's title; W6 and W7 share a title, so it identifies neither
+            "title_stz": ["title2", "editorial", "editorial"],
+            "journal_issn_l": "1234-5678",
+        })
+        df_oa = pd.concat([df_oa, df_extra], ignore_index=True)
+        df_oa["publication_year"] = 2024
+        df_oa.to_parquet(self.oa_parquet_dir / "oa.parquet")
+
+        scl_docs = [
+            dict(self.scl_docs[0], journal_issns=["1234-5678"]),
+            dict(self.scl_docs[1], titles=["title2"], journal_issns=["1234-5678 "]),
+            {"collection": ["scl"], "pid_v2": ["S0004"], "doi": "", "publication_year": 2024, "titles": ["editorial"], "journal_issns": ["1234-5678"]},
+        ]
+
+        scl_oa_merged, _ = match_scielo_with_openalex(scl_docs, str(self.oa_parquet_dir), start_year=2020, match_keys=("doi", "title_year_issn"))
+        self.assertEqual(
+            [(d["oa_metrics"] or {}).get("work_ids") for d in scl_oa_merged],
+            [
+                ["https://openalex.org/W1", "https://openalex.org/W2"],
+                ["https://openalex.org/W4"],
+                None,
+            ],
+        )
+
+        scielo_path = self.tmp_dir / "scielo.parquet"
+        write_merged_scielo([scl_docs], scielo_path)
+        scl_table = read_scielo_columns(scielo_path, columns=("collection", "pid_v2", "publication_year", "doi", "doi_with_lang", "titles", "journal_issns"))
+        stats = integrate_scielo_columns(scl_table, str(self.oa_parquet_dir), str(self.output_parquet), start_year=2020, match_keys=("doi", "title_year_issn"))
+        self.assertEqual(stats["match_keys"], {
+            "doi": {"articles": 1, "rate": 1 / 3, "available": True},
+            "title_year_issn": {"articles": 1, "rate": 1 / 3, "available": True},
+        })
+        self.assertEqual(sorted(pd.read_parquet(self.output_parquet)["work_id"]), [
+            "https://openalex.org/W1", "https://openalex.org/W3", "https://openalex.org/W4",
+            "https://openalex.org/W6", "https://openalex.org/W7", "scielo:S0004",
+        ])
+
+    def test_doi_key_skips_works_matched_by_an_earlier_key(self):
+        df_oa = pd.read_parquet(self.oa_parquet_dir / "oa.parquet")
+        # W1 carries the DOI of article 1 but the title of article 2
+        df_oa["title_stz"] = ["title2", None, None]
+        df_oa["journal_issn_l"] = "1234-5678"
+        df_oa.to_parquet(self.oa_parquet_dir / "oa.parquet")
+
+        scl_docs = [
+            dict(self.scl_docs[0], journal_issns=["1234-5678"]),
+            dict(self.scl_docs[1], titles=["title2"], journal_issns=["1234-5678"]),
+        ]
+        scl_oa_merged, _ = match_scielo_with_openalex(scl_docs, str(self.oa_parquet_dir), start_year=2020, match_keys=("title_year_issn", "doi"))
+
+        # Each work belongs to one article only
+        self.assertEqual(
+            [d["oa_metrics"]["work_ids"] for d in scl_oa_merged],
+            [["https://openalex.org/W2"], ["https://openalex.org/W1"]],
+        )
+
+
 if __name__ == '__main__':
     unittest.main()
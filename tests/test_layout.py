@@ -0,0 +1,118 @@
+import json
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from oca_metrics.adapters.parquet import ParquetAdapter
+from oca_metrics.preparation.layout import (
+    pruning_report,
+    write_clustered_layout,
+)
+
+
+# DuckDB row groups hold a multiple of 2048 rows
+ROWS = 10 * 2048
+
+
+def _write_merged(path):
+    rows = []
+    for i in range(ROWS):
+        year = 2020 + (i * 7) % 3
+        field = ["Medicine", "Physics", "Sociology", "History"][(i * 5) % 4]
+        rows.append({
+            "work_id": f"W{i}",
+            "publication_year": year,
+            "domain": "Health" if field == "Medicine" else "Other",
+            "field": field,
+            "subfield": f"{field} sub",
+            "topic": f"{field} topic {i % 3}",
+            "journal_id": f"S{i % 11}",
+            "journal_issn_l": None,
+            "is_journal_oa": i % 2,
+            "citations_total": i % 17,
+            "citations_window_2y": i % 5,
+        })
+
+    pd.DataFrame(rows).to_parquet(path, row_group_size=ROWS // 4)
+
+
+def test_clustered_layout_sorts_rows_and_improves_pruning(tmp_path):
+    source = tmp_path / "merged.parquet"
+    _write_merged(source)
+    clustered = tmp_path / "clustered.parquet"
+
+    assert write_clustered_layout(source, clustered, row_group_size=2048) == ROWS
+
+    original = pd.read_parquet(source)
+    table = pd.read_parquet(clustered)
+    assert sorted(table["work_id"]) == sorted(original["work_id"])
+    keys = list(zip(table["publication_year"], table["domain"], table["field"], table["subfield"], table["topic"], table["journal_id"]))
+    assert keys == sorted(keys)
+    metadata = pq.ParquetFile(clustered).metadata
+    assert metadata.num_row_groups == 10
+    field_index = metadata.schema.names.index("field")
+    assert all(metadata.row_group(rg).column(field_index).bloom_filter_length for rg in range(metadata.num_row_groups))
+
+    before = pruning_report(source)
+    after = pruning_report(clustered)
+    assert before["levels"]["field"]["pruned_fraction"] == 0.0
+    assert after["levels"]["field"]["queries"] == before["levels"]["field"]["queries"] == 12
+    assert after["levels"]["field"]["row_groups_read_mean"] < 3
+    assert after["levels"]["field"]["pruned_fraction"] > 0.7
+
+
+def test_year_partitions_are_read_by_the_adapter(tmp_path):
+    source = tmp_path / "merged.parquet"
+    _write_merged(source)
+    partitioned = tmp_path / "clustered"
+
+    write_clustered_layout(source, partitioned, row_group_size=2048, partition_by_year=True)
+
+    assert sorted(p.name for p in partitioned.iterdir()) == ["publication_year=2020", "publication_year=2021", "publication_year=2022"]
+
+    expected = ParquetAdapter(str(source)).compute_baseline(2021, "field", "Physics", [2])
+    actual = ParquetAdapter(str(partitioned)).compute_baseline(2021, "field", "Physics", [2])
+    pd.testing.assert_series_equal(actual, expected)
+
+    report = pruning_report(partitioned)
+    assert report["files"] == 3 and report["rows"] == ROWS
+    assert report["levels"]["field"]["pruned_fraction"] > 0.5
+
+
+def test_layout_reads_only_the_fragments_of_a_parallel_manifest(tmp_path):
+    # A quote in the path must not break the SQL
+    output_dir = tmp_path / "o'clock"
+    output_dir.mkdir()
+    _write_merged(output_dir / "merged_2020-new.parquet")
+    _write_merged(output_dir / "merged_2020-old.parquet")
+    (output_dir / "integration_manifest.json").write_text(json.dumps({"fragments": [{"path": "merged_2020-new.parquet", "rows": ROWS}]}))
+
+    clustered = output_dir / "clustered.parquet"
+    assert write_clustered_layout(output_dir, clustered, row_group_size=2048) == ROWS
+
+    report = pruning_report(output_dir)
+    assert report["files"] == 1 and report["rows"] == ROWS
+
+
+def test_partitioned_layout_replaces_only_earlier_layout_outputs(tmp_path):
+    source = tmp_path / "merged.parquet"
+    _write_merged(source)
+    partitioned = tmp_path / "clustered"
+
+    write_clustered_layout(source, partitioned, row_group_size=2048, partition_by_year=True)
+    assert write_clustered_layout(source, partitioned, row_group_size=2048, partition_by_year=True) == ROWS
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["clustered", "merged.parquet"]
+
+    # The input itself, a directory holding it, or a directory with other files are never replaced
+    with pytest.raises(ValueError):
+        write_clustered_layout(partitioned, partitioned, partition_by_year=True)
+    with pytest.raises(ValueError):
+        write_clustered_layout(source, tmp_path, partition_by_year=True)
+
+    data_root = tmp_path / "data"
+    data_root.mkdir()
+    (data_root / "notes.txt").write_text("keep")
+    with pytest.raises(ValueError):
+        write_clustered_layout(source, data_root, partition_by_year=True)
+    assert (data_root / "notes.txt").exists()
+    assert len(pd.read_parquet(partitioned)) == ROWS
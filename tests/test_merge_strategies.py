@@ -1,6 +1,66 @@
+from itertools import combinations
+
+import json
+import random
+import tempfile
 import unittest
 
-from oca_metrics.preparation.scielo import merge_scielo_documents
+from oca_metrics.preparation.scielo import (
+    GENERIC_TITLES,
+    MIN_TITLE_LENGTH,
+    _connected_components,
+    _lsh_candidates,
+    _minhash_signatures,
+    merge_scielo_documents,
+)
+
+
+def pairwise_components(docs, strategies):
+    """Reference implementation: compares every pair of documents."""
+    def same_journal(d1, d2):
+        return bool(set(d1["journal_issns"]) & set(d2["journal_issns"])) or bool(d1["journal_title"] and d1["journal_title"] == d2["journal_title"])
+
+    def dois(d):
+        return ({d["doi"]} | set(d["doi_with_lang"].values())) - {""}
+
+    def linked(d1, d2):
+        common_titles = set(d1["titles"]) & set(d2["titles"])
+        if "doi" in strategies and dois(d1) & dois(d2) and common_titles:
+            return True
+
+        same_year = d1["publication_year"] == d2["publication_year"]
+        if "pid" in strategies and d1["pid_v2"] == d2["pid_v2"] and same_year and same_journal(d1, d2) and common_titles:
+            return True
+
+        valid_titles = {t for t in common_titles if t and t not in GENERIC_TITLES and len(t) >= MIN_TITLE_LENGTH}
+        return "title" in strategies and bool(valid_titles) and same_year and same_journal(d1, d2)
+
+    labels = list(range(len(docs)))
+    for i, j in combinations(range(len(docs)), 2):
+        if linked(docs[i], docs[j]):
+            old, new = max(labels[i], labels[j]), min(labels[i], labels[j])
+            labels = [new if label == old else label for label in labels]
+
+    return sorted(sorted(docs[i]["collection"] for i in range(len(docs)) if labels[i] == root) for root in set(labels))
+
+
+def random_docs(n, seed):
+    rnd = random.Random(seed)
+    titles = [f"alongtitlethatislong{i}" for i in range(n // 10 + 1)] + ["editorial", "short", ""]
+    return [
+        {
+            # Unique collection per document, used to compare the merged groups
+            "collection": f"c{i:03d}",
+            "pid_v2": f"P{rnd.randrange(n // 10 + 1)}",
+            "publication_year": rnd.choice([2020, 2021]),
+            "doi": rnd.choice(["", f"10.1/{rnd.randrange(n // 4 + 1)}"]),
+            "doi_with_lang": {lang: f"10.1/{rnd.randrange(n // 4 + 1)}" for lang in rnd.sample(["en", "es"], rnd.randrange(3))},
+            "titles": sorted(set(rnd.sample(titles, rnd.randrange(3)))),
+            "journal_title": rnd.choice(["", "J1", "J2"]),
+            "journal_issns": sorted(set(rnd.sample(["1111-1111", "2222-2222", ""], rnd.randrange(3)))),
+        }
+        for i in range(n)
+    ]
 
 
 class TestMergeStrategies(unittest.TestCase):
@@ -61,5 +121,94 @@ class TestMergeStrategies(unittest.TestCase):
         self.assertEqual(len(merged), 2)
 
 
+class TestKeyGroupedMerge(unittest.TestCase):
+    def test_matches_pairwise_reference(self):
+        for seed in range(30):
+            docs = random_docs(60, seed)
+            for strategies in [("doi", "pid", "title"), ("doi",), ("pid",), ("title",)]:
+                with self.subTest(seed=seed, strategies=strategies):
+                    merged = merge_scielo_documents(docs, strategies=strategies)
+                    self.assertEqual(sorted(m["collection"] for m in merged), pairwise_components(docs, strategies))
+
+    def test_year_sharded_merge_matches_sequential(self):
+        docs = [dict(d, publication_year=2018 + i % 4) for i, d in enumerate(random_docs(200, 7))]
+        for strategies in [("doi", "pid", "title"), ("pid", "title")]:
+            with self.subTest(strategies=strategies):
+                self.assertEqual(
+                    merge_scielo_documents(docs, strategies=strategies, num_cores=2),
+                    merge_scielo_documents(docs, strategies=strategies),
+                )
+
+    def test_shared_pid_bucket(self):
+        docs = [
+            {"collection": "scl", "pid_v2": "S1", "publication_year": 2020, "doi": "", "titles": [f"alongtitlethatislong{i % 3}"], "journal_title": "J", "journal_issns": []}
+            for i in range(300)
+        ]
+        merged = merge_scielo_documents(docs, strategies=("pid",))
+        self.assertEqual(len(merged), 3)
+        self.assertEqual([m["titles"] for m in merged], [["alongtitlethatislong0"], ["alongtitlethatislong1"], ["alongtitlethatislong2"]])
+
+    def test_connected_components(self):
+        labels = _connected_components(6, [5, 3, 4], [3, 1, 5])
+        self.assertEqual(labels.tolist(), [0, 1, 2, 1, 1, 1])
+        self.assertEqual(_connected_components(3, [], []).tolist(), [0, 1, 2])
+
+    def test_audit_log_modes(self):
+        docs = [
+            {"collection": "scl", "pid_v2": f"PID{i}", "publication_year": 2024, "doi": "10.1/x", "titles": [title], "journal_title": "J", "journal_issns": []}
+            for i, title in enumerate(["t1", "t1", "t2"])
+        ]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            merge_scielo_documents(docs, audit_log_path=f"{tmp_dir}/summary.jsonl", strategies=("doi",))
+            with open(f"{tmp_dir}/summary.jsonl") as f:
+                entries = [json.loads(line) for line in f]
+            self.assertEqual(entries, [{"doi": "10.1/x", "pids": ["PID0", "PID1", "PID2"], "merged_pids": ["PID0", "PID1"], "merged": True, "reason": "doi_match"}])
+
+            merge_scielo_documents(docs, audit_log_path=f"{tmp_dir}/pairs.jsonl", strategies=("doi",), audit_pairs=True)
+            with open(f"{tmp_dir}/pairs.jsonl") as f:
+                entries = [json.loads(line) for line in f]
+            self.assertEqual([(e["pid1"], e["pid2"], e["merged"]) for e in entries], [("PID0", "PID1", True), ("PID0", "PID2", False), ("PID1", "PID2", False)])
+
+
+class TestFuzzyTitleMerge(unittest.TestCase):
+    def make_doc(self, pid, title, year=2020, journal_issns=("1111-1111",)):
+        return {"collection": "scl", "pid_v2": pid, "publication_year": year, "doi": "", "doi_with_lang": {}, "titles": [title], "journal_title": "", "journal_issns": list(journal_issns)}
+
+    def test_near_duplicate_titles_merge(self):
+        docs = [
+            self.make_doc("P1", "prevalencia de obesidade em escolares do ensino fundamental"),
+            self.make_doc("P2", "prevalencia de obesidade em escolares do ensino fundamntal"),
+            self.make_doc("P3", "fatores associados ao consumo de alcool entre adolescentes"),
+        ]
+        self.assertEqual(len(merge_scielo_documents(docs, strategies=("title",))), 3)
+
+        merged = merge_scielo_documents(docs, strategies=("fuzzy_title",))
+        self.assertEqual([m["pid_v2"] for m in merged], [["P1", "P2"], ["P3"]])
+
+    def test_near_duplicate_titles_require_same_year_and_journal(self):
+        title = "prevalencia de obesidade em escolares do ensino fundamental"
+        typo = "prevalencia de obesidade em escolares do ensino fundamntal"
+        for other in [self.make_doc("P2", typo, year=2021), self.make_doc("P2", typo, journal_issns=["2222-2222"])]:
+            with self.subTest(other=other):
+                merged = merge_scielo_documents([self.make_doc("P1", title), other], strategies=("fuzzy_title",))
+                self.assertEqual(len(merged), 2)
+
+    def test_generic_and_short_titles_are_ignored(self):
+        docs = [self.make_doc("P1", "editorial"), self.make_doc("P2", "editorials"), self.make_doc("P3", "short title a"), self.make_doc("P4", "short title b")]
+        self.assertEqual(len(merge_scielo_documents(docs, strategies=("fuzzy_title",))), 4)
+
+    def test_signatures_and_candidates(self):
+        titles = ["a" * 40 + "b" * 40, "a" * 40 + "b" * 39 + "c", "x" * 40 + "y" * 40, "a" * 40 + "b" * 40]
+        signatures = _minhash_signatures(titles)
+        self.assertEqual(signatures.shape, (4, 64))
+        self.assertEqual(signatures[0].tolist(), signatures[3].tolist())
+        self.assertLess((signatures[0] == signatures[2]).mean(), 0.2)
+
+        pairs = _lsh_candidates(signatures).tolist()
+        self.assertIn([0, 3], pairs)
+        self.assertNotIn([0, 2], pairs)
+        self.assertEqual(_lsh_candidates(signatures, max_bucket_size=1).tolist(), [])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,3 +1,5 @@
+import pandas as pd
+import pyarrow as pa
 import unittest
 
 from oca_metrics.utils.normalization import (
@@ -9,7 +11,9 @@ from oca_metrics.utils.normalization import (
     stz_openalex_journal_id,
     stz_text,
     stz_doi,
+    stz_doi_batch,
     stz_title,
+    stz_title_batch,
 )
 
 
@@ -28,6 +32,25 @@ class TestNormalization(unittest.TestCase):
         self.assertEqual(stz_title(""), "")
         self.assertEqual(stz_title(None), "")
 
+    def test_batch_normalization_matches_scalar(self):
+        # Every code point (in runs of 8, surrogates excluded), around spaces, accents and DOI prefixes
+        runs = ["".join(chr(c) for c in range(start, start + 8) if not 0xD800 <= c <= 0xDFFF) for start in range(0, 0x110000, 8)]
+        titles = [f" Título {run} x " for run in runs] + ["Título com Acentuação", "Multiple   Spaces", "", None, "ﬁ ÉTUDE", "\x1c A \x1f"]
+        dois = [f" HTTPS://doi.org/10.1/{run}X " for run in runs] + ["doi:10.1590/ABC", "http://doi.org/10.1/İ", " ", "", None]
+
+        self.assertEqual(stz_title_batch(titles).to_pylist(), [stz_title(t) for t in titles])
+        self.assertEqual(stz_doi_batch(dois).to_pylist(), [stz_doi(d) for d in dois])
+
+    def test_batch_normalization_input_types(self):
+        series = pd.Series(["https://doi.org/10.1/A", None], index=[3, 7], name="doi")
+        result = stz_doi_batch(series)
+        self.assertIsInstance(result, pd.Series)
+        self.assertEqual(result.to_dict(), {3: "10.1/a", 7: ""})
+
+        chunked = pa.chunked_array([["Título A"], [None, "B b"]])
+        self.assertEqual(stz_title_batch(chunked).to_pylist(), ["tituloa", "", "bb"])
+        self.assertEqual(stz_title_batch(pa.array([], type=pa.string())).to_pylist(), [])
+
     def test_extract_year(self):
         self.assertEqual(extract_year("2024"), 2024)
         self.assertEqual(extract_year(2023), 2023)
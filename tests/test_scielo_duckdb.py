@@ -0,0 +1,62 @@
+import json
+import tempfile
+import unittest
+
+from oca_metrics.preparation.scielo import merge_scielo_documents
+from oca_metrics.preparation.scielo_duckdb import merge_scielo_documents_duckdb
+from oca_metrics.preparation.scielo_io import read_merged_scielo
+from tests.test_merge_strategies import random_docs
+
+
+class TestDuckDBMerge(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp_dir = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def merge_duckdb(self, docs, chunk_size=40, **kwargs):
+        output = f"{self.tmp_dir}/merged.jsonl"
+        chunks = [docs[i:i + chunk_size] for i in range(0, len(docs), chunk_size)]
+        total = merge_scielo_documents_duckdb(chunks, output, work_dir=self.tmp_dir, **kwargs)
+        with open(output) as f:
+            merged = [json.loads(line) for line in f]
+
+        self.assertEqual(total, len(merged))
+        return merged
+
+    def test_matches_in_memory_merge(self):
+        for seed in range(5):
+            docs = random_docs(120, seed)
+            for i, d in enumerate(docs):
+                d["document_type"] = ["", "research-article", "editorial"][i % 3]
+            for strategies in [("doi", "pid", "title"), ("doi",), ("pid",), ("title",), ()]:
+                with self.subTest(seed=seed, strategies=strategies):
+                    expected = json.loads(json.dumps(merge_scielo_documents(docs, strategies=strategies)))
+                    self.assertEqual(self.merge_duckdb(docs, strategies=strategies), expected)
+
+    def test_audit_log_matches_in_memory_summaries(self):
+        docs = random_docs(120, 3)
+        self.merge_duckdb(docs, audit_log_path=f"{self.tmp_dir}/duckdb_audit.jsonl", memory_limit="256MB")
+        merge_scielo_documents(docs, audit_log_path=f"{self.tmp_dir}/memory_audit.jsonl")
+
+        with open(f"{self.tmp_dir}/duckdb_audit.jsonl") as f1, open(f"{self.tmp_dir}/memory_audit.jsonl") as f2:
+            duckdb_entries = sorted(f1.read().splitlines())
+            memory_entries = sorted(f2.read().splitlines())
+
+        self.assertTrue(duckdb_entries)
+        self.assertEqual(duckdb_entries, memory_entries)
+
+    def test_parquet_output(self):
+        docs = [dict(d, document_type="research-article") for d in random_docs(80, 4)]
+        output = f"{self.tmp_dir}/merged.parquet"
+        merge_scielo_documents_duckdb([docs[:40], docs[40:]], output, work_dir=self.tmp_dir)
+        self.assertEqual(read_merged_scielo(output), json.loads(json.dumps(merge_scielo_documents(docs))))
+
+    def test_empty_input(self):
+        self.assertEqual(self.merge_duckdb([]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import json
+import tempfile
+import unittest
+
+import pyarrow.parquet as pq
+
+from oca_metrics.preparation.scielo_io import (
+    INTEGRATION_COLUMNS,
+    MERGED_SCIELO_SCHEMA,
+    read_merged_scielo,
+    read_scielo_columns,
+    write_merged_scielo,
+)
+
+
+MERGED_DOCS = [
+    {
+        "collection": ["scl"],
+        "pid_v2": ["S0101-01012020000100001"],
+        "publication_year": 2020,
+        "doi_with_lang": {"pt": "10.1590/a", "en": "10.1590/a.en"},
+        "doi": "10.1590/a",
+        "titles": ["tituloa", "titlea"],
+        "document_type": "research-article",
+        "journal_title": "Revista A",
+        "journal_issns": ["0101-0101"],
+    },
+    {
+        "collection": ["mex", "scl"],
+        "pid_v2": ["S0202-02022022000100002", "S0202-02022022000100003"],
+        "publication_year": 2022,
+        "doi_with_lang": {},
+        "doi": "",
+        "titles": [],
+        "document_type": "",
+        "journal_title": "",
+        "journal_issns": [],
+    },
+    {
+        "collection": ["scl"],
+        "pid_v2": ["S0303-03032024000100004"],
+        "publication_year": 2024,
+        "doi_with_lang": {None: "10.1590/c"},
+        "doi": "10.1590/c",
+        "titles": ["tituloc"],
+        "document_type": "editorial",
+        "journal_title": "Revista C",
+        "journal_issns": ["0303-0303", "0404-0404"],
+    },
+]
+
+
+class TestMergedScieloIO(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp_dir = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_parquet_and_jsonl_round_trips_match(self):
+        jsonl_path = f"{self.tmp_dir}/merged.jsonl"
+        parquet_path = f"{self.tmp_dir}/merged.parquet"
+
+        self.assertEqual(write_merged_scielo([MERGED_DOCS[:2], [], MERGED_DOCS[2:]], jsonl_path), 3)
+        self.assertEqual(write_merged_scielo([MERGED_DOCS[:2], [], MERGED_DOCS[2:]], parquet_path), 3)
+
+        self.assertEqual(pq.read_schema(parquet_path), MERGED_SCIELO_SCHEMA)
+
+        expected = json.loads(json.dumps(MERGED_DOCS))
+        self.assertEqual(read_merged_scielo(jsonl_path), expected)
+        self.assertEqual(read_merged_scielo(parquet_path), expected)
+
+    def test_year_range_is_applied_to_both_formats(self):
+        for name in ("merged.jsonl", "merged.parquet"):
+            path = f"{self.tmp_dir}/{name}"
+            write_merged_scielo([MERGED_DOCS], path)
+            with self.subTest(name):
+                docs = read_merged_scielo(path, start_year=2021, end_year=2023)
+                self.assertEqual([d["publication_year"] for d in docs], [2022])
+
+    def test_explicit_format(self):
+        path = f"{self.tmp_dir}/merged.data"
+        write_merged_scielo([MERGED_DOCS], path, fmt="parquet")
+        self.assertEqual(len(read_merged_scielo(path, fmt="parquet")), 3)
+
+        with self.assertRaises(ValueError):
+            read_merged_scielo(path, fmt="csv")
+
+    def test_column_store_matches_documents(self):
+        for name in ("merged.jsonl", "merged.parquet"):
+            path = f"{self.tmp_dir}/{name}"
+            write_merged_scielo([MERGED_DOCS], path)
+            with self.subTest(name):
+                table = read_scielo_columns(path, start_year=2021, batch_size=1)
+                self.assertEqual(table.column_names, list(INTEGRATION_COLUMNS))
+                self.assertEqual(table.num_rows, 2)
+
+                docs = read_merged_scielo(path, start_year=2021)
+                self.assertEqual(table["pid_v2"].to_pylist(), [d["pid_v2"] for d in docs])
+                self.assertEqual(
+                    [dict(value) for value in table["doi_with_lang"].to_pylist()],
+                    [d["doi_with_lang"] for d in docs],
+                )
+
+                self.assertEqual(read_scielo_columns(path, start_year=2030).num_rows, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,232 @@
+from concurrent.futures import Future
+from unittest import mock
+
+import bson
+import json
+import unittest
+
+from oca_metrics.preparation import scielo
+from oca_metrics.preparation.scielo import (
+    _iter_loaded_chunks,
+    _load_jsonl_range,
+    _parse_article_field,
+    _split_bson_ranges,
+    _split_jsonl_ranges,
+    _split_mongo_ranges,
+    load_bson_scl,
+    load_mongo_scl,
+    load_raw_scl,
+)
+
+
+def make_articlemeta_record(i, year=2024, doi=True):
+    article = {
+        "v880": [{"_": f"S0101-0101{year}00010{i:04d}"}],
+        "v40": [{"_": "pt"}],
+        "v12": [{"l": "pt", "_": f"Título do artigo {i}"}, {"l": "en", "_": f"Article title {i}"}],
+        "v71": [{"_": "oa"}],
+    }
+    if doi:
+        article["v237"] = [{"_": f"10.1590/S0101-0101{year}00010{i:04d}"}]
+        article["v337"] = [{"l": "en", "d": f"10.1590/S0101-0101{year}00010{i:04d}.en"}]
+
+    return {
+        "collection": "scl",
+        "publication_year": str(year),
+        "article": article,
+        "title": {"v100": [{"_": "Revista de Teste"}], "v400": [{"_": "0101-0101"}], "v35": [{"_": "PRINT"}]},
+    }
+
+
+def _matches(record, query):
+    for field, condition in query.items():
+        value = record.get(field)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+
+        for op, operand in condition.items():
+            if op == "$eq" and value != operand:
+                return False
+            if op == "$in" and value not in operand:
+                return False
+            if op == "$gte" and not value >= operand:
+                return False
+            if op == "$lt" and not value < operand:
+                return False
+
+    return True
+
+def _project(record, projection):
+    if projection is None:
+        return record
+
+    projected = {"_id": record["_id"]}
+    for path in projection:
+        source, target = record, projected
+        *parents, leaf = path.split(".")
+        for part in parents:
+            source = source.get(part, {})
+            target = target.setdefault(part, {})
+        if leaf in source:
+            target[leaf] = source[leaf]
+
+    return projected
+
+
+class FakeCursor(list):
+    def sort(self, key, direction=1):
+        return FakeCursor(sorted(self, key=lambda r: r[key], reverse=direction < 0))
+
+
+class FakeCollection:
+    """In-process stand-in for a pymongo collection, supporting the queries of the MongoDB loader."""
+    def __init__(self, records):
+        self.records = [dict(r, _id=bson.ObjectId()) for r in records]
+        self.queries = []
+
+    def find(self, query, projection=None, **kwargs):
+        self.queries.append((query, projection))
+        return FakeCursor(_project(r, projection) for r in self.records if _matches(r, query))
+
+    def count_documents(self, query):
+        return sum(1 for r in self.records if _matches(r, query))
+
+
+class TestSciELOLoaders(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp_dir = self._tmp.name
+
+        self.records = [make_articlemeta_record(i, year=2020 + i % 5, doi=i % 7 != 0) for i in range(60)]
+
+        self.jsonl_path = f"{self.tmp_dir}/articles.jsonl"
+        with open(self.jsonl_path, "w") as f:
+            for i, r in enumerate(self.records):
+                r = dict(r)
+                if i % 2:
+                    # Some dumps store the 'article' field as the repr of a Python dict
+                    r["article"] = repr(r["article"])
+                f.write(json.dumps(r) + "\n")
+
+        self.bson_path = f"{self.tmp_dir}/articles.bson"
+        with open(self.bson_path, "wb") as f:
+            for r in self.records:
+                f.write(bson.encode(r))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_split_ranges_cover_whole_file_on_record_boundaries(self):
+        ranges = _split_jsonl_ranges(self.jsonl_path, 1000)
+        self.assertGreater(len(ranges), 1)
+        with open(self.jsonl_path, "rb") as f:
+            data = f.read()
+        self.assertEqual(b"".join(data[s:e] for s, e in ranges), data)
+        self.assertTrue(all(data[e - 1:e] == b"\n" for _, e in ranges))
+
+        ranges = _split_bson_ranges(self.bson_path, 1000)
+        self.assertGreater(len(ranges), 1)
+        with open(self.bson_path, "rb") as f:
+            data = f.read()
+        decoded = [d for s, e in ranges for d in bson.decode_all(data[s:e])]
+        self.assertEqual(len(decoded), len(self.records))
+
+    def test_parallel_loaders_match_sequential_order(self):
+        expected = load_raw_scl(self.jsonl_path, 2021, 2023, num_cores=1)
+        self.assertEqual(len(expected), sum(1 for i in range(60) if 2021 <= 2020 + i % 5 <= 2023 and i % 7 != 0))
+
+        min_chunk = scielo.MIN_CHUNK_BYTES
+        scielo.MIN_CHUNK_BYTES = 1000
+        try:
+            self.assertEqual(load_raw_scl(self.jsonl_path, 2021, 2023, num_cores=2), expected)
+            self.assertEqual(load_bson_scl(self.bson_path, 2021, 2023, num_cores=2), expected)
+        finally:
+            scielo.MIN_CHUNK_BYTES = min_chunk
+
+        self.assertEqual(expected[0]["doi"], "10.1590/s0101-01012021000100001")
+        self.assertEqual(expected[0]["doi_with_lang"]["en"], "10.1590/s0101-01012021000100001.en")
+        self.assertIn("titulodoartigo1", expected[0]["titles"])
+
+    def test_parallel_loading_bounds_in_flight_chunks(self):
+        submitted = []
+
+        class RecordingExecutor:
+            def __init__(self, max_workers):
+                pass
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def submit(self, fn, *args):
+                submitted.append(args[1])
+                future = Future()
+                future.set_result(fn(*args))
+                return future
+
+        ranges = _split_jsonl_ranges(self.jsonl_path, 500)
+        self.assertGreater(len(ranges), 2 * scielo.IN_FLIGHT_CHUNKS_PER_CORE + 1)
+
+        with mock.patch.object(scielo, "ProcessPoolExecutor", RecordingExecutor):
+            chunks = _iter_loaded_chunks(_load_jsonl_range, self.jsonl_path, ranges, 2020, 2024, 2, "test")
+            next(chunks)
+            # The first chunk was consumed: one more range was submitted to refill the window
+            self.assertEqual(len(submitted), 2 * scielo.IN_FLIGHT_CHUNKS_PER_CORE + 1)
+            rest = list(chunks)
+
+        self.assertEqual(submitted, [start for start, _ in ranges])
+        self.assertEqual(len(rest), len(ranges) - 1)
+
+    def test_direct_and_xylose_extractors_match(self):
+        direct = load_raw_scl(self.jsonl_path, 2020, 2024, num_cores=1)
+        self.assertEqual(load_raw_scl(self.jsonl_path, 2020, 2024, num_cores=1, extractor="xylose"), direct)
+        with self.assertNoLogs("oca_metrics.preparation.scielo", level="WARNING"):
+            self.assertEqual(load_bson_scl(self.bson_path, 2020, 2024, num_cores=1, extractor="parity"), direct)
+
+        with self.assertRaises(ValueError):
+            load_raw_scl(self.jsonl_path, extractor="unknown")
+
+    def test_mongo_loader_matches_file_loaders(self):
+        collection = FakeCollection(self.records)
+        expected = load_raw_scl(self.jsonl_path, 2021, 2023, num_cores=1)
+
+        min_chunk = scielo.MIN_CHUNK_RECORDS
+        scielo.MIN_CHUNK_RECORDS = 7
+        try:
+            self.assertEqual(load_mongo_scl(start_year=2021, end_year=2023, num_cores=4, mongo_collection=collection), expected)
+        finally:
+            scielo.MIN_CHUNK_RECORDS = min_chunk
+
+        # Year filter and projection run on the server; each range adds an _id bound
+        range_queries = [(q, p) for q, p in collection.queries if p != {"_id": 1}]
+        self.assertGreater(len(range_queries), 1)
+        for query, projection in range_queries:
+            self.assertEqual(query["publication_year"], {"$in": ["2021", "2022", "2023", 2021, 2022, 2023]})
+            self.assertIn("article.v880", projection)
+            self.assertNotIn("article", projection)
+
+        collection.queries.clear()
+        self.assertEqual(load_mongo_scl(start_year=2021, end_year=2023, num_cores=1, extractor="xylose", mongo_collection=collection), expected)
+        self.assertIsNone(collection.queries[-1][1])
+
+    def test_split_mongo_ranges(self):
+        collection = FakeCollection(self.records)
+        ranges = _split_mongo_ranges(collection, 25)
+        ids = sorted(r["_id"] for r in collection.records)
+        self.assertEqual(ranges, [(None, ids[25]), (ids[25], ids[50]), (ids[50], None)])
+        self.assertEqual(_split_mongo_ranges(collection, 100), [(None, None)])
+        # Only the _id index is read: no filter, _id projection
+        self.assertEqual(collection.queries, [({}, {"_id": 1}), ({}, {"_id": 1})])
+
+    def test_parse_article_field_is_safe(self):
+        self.assertEqual(_parse_article_field('{"v880": [{"_": "S1"}]}'), {"v880": [{"_": "S1"}]})
+        self.assertEqual(_parse_article_field("{'v880': [{'_': 'S1'}], 'v1': None}"), {"v880": [{"_": "S1"}], "v1": None})
+        with self.assertRaises(ValueError):
+            _parse_article_field("__import__('os').getcwd()")
+
+
+if __name__ == "__main__":
+    unittest.main()
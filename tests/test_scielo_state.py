@@ -0,0 +1,110 @@
+from pathlib import Path
+from unittest import mock
+
+import json
+import tempfile
+import unittest
+
+from oca_metrics.preparation.scielo import merge_scielo_documents
+from oca_metrics.preparation import scielo_state
+from oca_metrics.preparation.scielo_io import read_merged_scielo
+from oca_metrics.preparation.scielo_state import (
+    export_merged_state,
+    load_state_manifest,
+    merge_scielo_incremental,
+)
+from tests.test_merge_strategies import random_docs
+
+
+def make_doc(pid, doi, title, year=2024):
+    return {
+        "collection": "scl",
+        "pid_v2": pid,
+        "publication_year": year,
+        "doi_with_lang": {},
+        "doi": doi,
+        "titles": [title],
+        "document_type": "research-article",
+        "journal_title": "Journal",
+        "journal_issns": ["1234-5678"],
+    }
+
+
+class TestIncrementalMerge(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp_dir = self._tmp.name
+        self.state_dir = f"{self.tmp_dir}/state"
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def export(self, name="merged.jsonl"):
+        export_merged_state(self.state_dir, f"{self.tmp_dir}/{name}")
+        return read_merged_scielo(f"{self.tmp_dir}/{name}")
+
+    def test_first_run_matches_full_merge(self):
+        docs = [dict(d, document_type="research-article") for d in random_docs(120, 5)]
+        stats = merge_scielo_incremental([docs[:60], docs[60:]], self.state_dir)
+
+        self.assertEqual(stats["new"], 120)
+        self.assertEqual(self.export(), json.loads(json.dumps(merge_scielo_documents(docs))))
+        self.assertEqual(self.export("merged.parquet"), self.export())
+
+    def test_updates_relink_and_split_components(self):
+        docs = [
+            make_doc("S1", "10.1/a", "sharedtitle"),
+            make_doc("S2", "10.1/a", "sharedtitle"),
+            make_doc("S3", "10.1/c", "othertitle"),
+        ]
+        merge_scielo_incremental([docs], self.state_dir, strategies=("doi",))
+        self.assertEqual([m["pid_v2"] for m in self.export()], [["S1", "S2"], ["S3"]])
+
+        # S2 now has its own DOI (splits the first group); S4 joins S3
+        update = [docs[0], make_doc("S2", "10.1/b", "sharedtitle"), docs[2], make_doc("S4", "10.1/c", "othertitle")]
+        stats = merge_scielo_incremental([update], self.state_dir, strategies=("doi",))
+
+        self.assertEqual((stats["new"], stats["updated"], stats["unchanged"]), (1, 1, 2))
+        self.assertEqual(stats["affected_components"], 2)
+        self.assertEqual([m["pid_v2"] for m in self.export()], [["S1"], ["S2"], ["S3", "S4"]])
+        self.assertEqual(self.export(), json.loads(json.dumps(merge_scielo_documents(update, strategies=("doi",)))))
+
+        stats = merge_scielo_incremental([update], self.state_dir, strategies=("doi",))
+        self.assertEqual((stats["new"], stats["updated"], stats["emitted_components"]), (0, 0, 0))
+        self.assertEqual(load_state_manifest(self.state_dir)["last_run"], stats)
+
+    def test_unrelated_components_are_not_remerged(self):
+        docs = [make_doc(f"S{i}", f"10.1/{i}", f"title{i}") for i in range(10)]
+        merge_scielo_incremental([docs], self.state_dir)
+
+        stats = merge_scielo_incremental([[make_doc("S10", "10.1/3", "title3")]], self.state_dir)
+        self.assertEqual(stats["affected_components"], 1)
+        self.assertEqual(stats["emitted_components"], 1)
+        self.assertEqual(len(self.export()), 10)
+
+    def test_interrupted_run_keeps_previous_generation(self):
+        docs = [make_doc("S1", "10.1/a", "t1"), make_doc("S2", "10.1/b", "t2")]
+        merge_scielo_incremental([docs], self.state_dir, strategies=("doi",))
+        before = self.export()
+
+        # The run fails after writing its tables but before the manifest names them
+        with mock.patch.object(scielo_state, "_save_state_manifest", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                merge_scielo_incremental([[make_doc("S3", "10.1/a", "t1")]], self.state_dir, strategies=("doi",))
+
+        self.assertEqual(load_state_manifest(self.state_dir)["generation"], 0)
+        self.assertEqual(self.export(), before)
+
+        stats = merge_scielo_incremental([[make_doc("S3", "10.1/a", "t1")]], self.state_dir, strategies=("doi",))
+        self.assertEqual((stats["new"], stats["affected_components"]), (1, 1))
+        self.assertEqual([m["pid_v2"] for m in self.export()], [["S1", "S3"], ["S2"]])
+        self.assertEqual(sorted(p.name for p in Path(self.state_dir, strategies=("doi",)).iterdir()), ["generation_1", "state_manifest.json"])
+
+    def test_strategies_must_match_state(self):
+        merge_scielo_incremental([[make_doc("S1", "10.1/a", "t")]], self.state_dir)
+        with self.assertRaises(ValueError):
+            merge_scielo_incremental([[make_doc("S1", "10.1/a", "t")]], self.state_dir, strategies=("doi",))
+
+
+if __name__ == "__main__":
+    unittest.main()
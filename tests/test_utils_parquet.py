@@ -1,11 +1,15 @@
 import json
+import numpy as np
 
 import pytest
 
 from oca_metrics.utils.parquet import (
+    build_year_partition_name,
+    extract_partition_year,
     extract_yearly_citation_columns,
     get_valid_level_column,
     is_multilingual_scielo_merge_record,
+    list_parquet_files,
     parse_merged_languages,
 )
 
@@ -49,5 +53,39 @@ def test_parse_merged_languages_and_multilingual_flag():
     assert is_multilingual_scielo_merge_record(0, payload) == 0
 
 
+def test_parse_merged_languages_from_work_structs():
+    payload = [
+        {"work_id": "W1", "language": "en"},
+        {"work_id": "W2", "language": "PT"},
+        {"work_id": "W3", "language": None},
+    ]
+    assert parse_merged_languages(payload) == {"en", "pt"}
+    assert parse_merged_languages(np.array(payload, dtype=object)) == {"en", "pt"}
+    assert is_multilingual_scielo_merge_record(True, payload) == 1
+
+
 def test_parse_merged_languages_invalid_payload():
     assert parse_merged_languages("not-json") == set()
+
+
+def test_list_parquet_files_prunes_year_partitions(tmp_path):
+    for name in ["publication_year=2019", "publication_year=2020", "publication_year=2021"]:
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "part_0.parquet").write_bytes(b"PAR1")
+
+    (tmp_path / "flat.parquet").write_bytes(b"PAR1")
+    (tmp_path / "metrics_2024-01-01_empty.parquet").touch()
+    (tmp_path / "manifest.json").write_text("{}")
+
+    files = list_parquet_files(tmp_path, start_year=2020, end_year=2020)
+    assert [f.relative_to(tmp_path).as_posix() for f in files] == [
+        "flat.parquet",
+        "publication_year=2020/part_0.parquet",
+    ]
+    assert len(list_parquet_files(tmp_path)) == 4
+
+
+def test_extract_partition_year():
+    assert extract_partition_year("out/publication_year=2021/part_0.parquet") == 2021
+    assert extract_partition_year("out/part_0.parquet") is None
+    assert build_year_partition_name(2021) == "publication_year=2021"